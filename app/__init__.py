@@ -7,8 +7,21 @@ def create_app():
     CORS(app, resources={r"/*": {"origins": "*"}})  # すべてのルートに対してCORSを有効化
     app.config.from_object(Config)
 
+    # ルートの読み込み時に出るログも取りこぼさないよう、先にログ出力を設定する
+    from app.log_pipeline import log_pipeline
+    log_pipeline.init_app(app)
+
     from app import routes
     app.register_blueprint(routes.bp)
+    app.extensions['warmup'] = routes.warmup
+    # 記事の定期同期・古い記事の削除は、ウォームアップを無効にしていても動かす
+    routes.start_article_sync()
+
+    from app.metrics import metrics
+    metrics.init_app(app)
+
+    from app.realtime import init_realtime
+    init_realtime(app, routes.event_hub)
 
     return app
 
@@ -0,0 +1,307 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    source TEXT,
+    published_at TEXT,
+    fetched_at REAL NOT NULL,
+    positive INTEGER
+);
+CREATE INDEX IF NOT EXISTS articles_published_at ON articles (published_at);
+CREATE INDEX IF NOT EXISTS articles_fetched_at ON articles (fetched_at);
+CREATE INDEX IF NOT EXISTS articles_unclassified ON articles (positive) WHERE positive IS NULL;
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(body, tokenize='unicode61');
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_articles (
+    query TEXT NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (query, article_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    claimed_at REAL NOT NULL
+);
+"""
+
+
+def normalize_query(query):
+    return unicodedata.normalize('NFKC', query or '').strip().lower()
+
+
+def bigrams(text):
+    """日本語向けに、文字の連続をバイグラム（2文字ずつずらした語）に分割する
+
+    記号や空白で区切られた部分ごとに作り、1文字だけの部分はそのまま1語とする。
+    """
+    tokens = []
+    run = []
+    for ch in normalize_query(text) + ' ':
+        if ch.isalnum():
+            run.append(ch)
+            continue
+        if len(run) == 1:
+            tokens.append(run[0])
+        else:
+            tokens.extend(run[i] + run[i + 1] for i in range(len(run) - 1))
+        run = []
+    return tokens
+
+
+def match_expression(query):
+    # 検索ワードの各部分をバイグラムの連続（フレーズ）として検索し、部分文字列の一致と同等にする
+    phrases = []
+    for term in normalize_query(query).split():
+        if len(term) < 2:
+            # 1文字の部分はバイグラムの索引では探せないため、LIKE で探す（like_patterns）
+            continue
+        tokens = bigrams(term)
+        if tokens:
+            phrases.append('"' + ' '.join(token.replace('"', '""') for token in tokens) + '"')
+    return ' AND '.join(phrases)
+
+
+def like_patterns(query):
+    # 全文検索の索引で探せない1文字の部分を、タイトル・概要への LIKE の条件にする
+    return ['%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            for term in normalize_query(query).split() if len(term) < 2]
+
+
+class ArticleStore:
+    """取得した記事を保存し、全文検索で検索ワードに答えるローカルの記事ストア
+
+    記事はURLで重複を除いて保存し、タイトルと概要をバイグラムにしてFTS5で索引する。
+    検索ワードごとに最後にNewsAPIへ問い合わせた時刻を記録し、fresh_seconds 以内であれば
+    ローカルの記事だけで答える。
+    """
+
+    def __init__(self, path, fresh_seconds=900, retention_days=7, max_articles=5000):
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self.retention_days = retention_days
+        self.max_articles = max_articles
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        # 削除した領域をSDカード上で解放できるようにする（新規作成時のみ有効）
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def ingest(self, query, articles):
+        # NewsAPIの応答を保存する。既知のURLは内容を更新し、判定結果は内容が変わった場合のみ破棄する
+        now = time.time()
+        query = normalize_query(query)
+        with self._transaction() as conn:
+            for article in articles:
+                url = article.get('url')
+                if not url:
+                    continue
+                title = article.get('title') or ''
+                description = article.get('description') or ''
+                row = conn.execute('SELECT id, title, description FROM articles WHERE url = ?', (url,)).fetchone()
+                if row is None:
+                    article_id = conn.execute(
+                        """INSERT INTO articles (url, title, description, source, published_at, fetched_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        (url, title, description, (article.get('source') or {}).get('name'),
+                         article.get('publishedAt'), now)
+                    ).lastrowid
+                    conn.execute('INSERT INTO articles_fts (rowid, body) VALUES (?, ?)',
+                                 (article_id, ' '.join(bigrams(title + ' ' + description))))
+                else:
+                    article_id = row['id']
+                    if (row['title'], row['description']) != (title, description):
+                        conn.execute(
+                            'UPDATE articles SET title = ?, description = ?, positive = NULL WHERE id = ?',
+                            (title, description, article_id)
+                        )
+                        conn.execute('UPDATE articles_fts SET body = ? WHERE rowid = ?',
+                                     (' '.join(bigrams(title + ' ' + description)), article_id))
+                    conn.execute('UPDATE articles SET fetched_at = ? WHERE id = ?', (now, article_id))
+                if query:
+                    conn.execute('INSERT OR IGNORE INTO query_articles (query, article_id) VALUES (?, ?)',
+                                 (query, article_id))
+            if query:
+                conn.execute('INSERT OR REPLACE INTO queries (query, fetched_at) VALUES (?, ?)', (query, now))
+
+    def is_fresh(self, query):
+        row = self._connection().execute(
+            'SELECT fetched_at FROM queries WHERE query = ?', (normalize_query(query),)
+        ).fetchone()
+        return row is not None and time.time() - row['fetched_at'] < self.fresh_seconds
+
+    def search(self, query, limit=20, domains=None):
+        """検索ワードに一致する記事を新しい順に返す（NewsAPIの articles と同じ形式）
+
+        このワードでNewsAPIから取得した記事と、全文検索で一致した記事を合わせる。
+        否定的と判定済みの記事は除く。
+        """
+        query = normalize_query(query)
+        expression = match_expression(query)
+        patterns = like_patterns(query)
+        conditions = ['a.id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH :match)'] if expression else []
+        conditions.extend(f"(a.title LIKE :like{i} ESCAPE '\\' OR a.description LIKE :like{i} ESCAPE '\\')"
+                          for i in range(len(patterns)))
+        sql = """
+            SELECT a.* FROM articles a
+            WHERE (a.id IN (SELECT article_id FROM query_articles WHERE query = :query)
+                   {text})
+              AND (a.positive IS NULL OR a.positive = 1)
+              {domain}
+            ORDER BY a.published_at DESC
+            LIMIT :limit
+        """.format(
+            text='OR (' + ' AND '.join(conditions) + ')' if conditions else '',
+            domain='AND (' + ' OR '.join(f'a.url LIKE :domain{i}' for i in range(len(domains))) + ')' if domains else ''
+        )
+        params = {'query': query, 'match': expression, 'limit': limit}
+        params.update({f'like{i}': pattern for i, pattern in enumerate(patterns)})
+        params.update({f'domain{i}': f'%{domain}%' for i, domain in enumerate(domains or ())})
+        rows = self._connection().execute(sql, params).fetchall()
+        return [{
+            'source': {'id': None, 'name': row['source']},
+            'title': row['title'],
+            'description': row['description'],
+            'url': row['url'],
+            'publishedAt': row['published_at'],
+            'positive': None if row['positive'] is None else bool(row['positive'])
+        } for row in rows]
+
+    def unclassified(self, limit=100):
+        rows = self._connection().execute(
+            'SELECT id, url, title, description FROM articles WHERE positive IS NULL LIMIT ?', (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_verdicts(self, verdicts):
+        # verdicts: [(記事ID, ポジティブかどうか), ...]
+        with self._transaction() as conn:
+            conn.executemany('UPDATE articles SET positive = ? WHERE id = ?',
+                             [(int(positive), article_id) for article_id, positive in verdicts])
+
+    def prune(self):
+        # 保存期間を過ぎた記事と、件数の上限を超えた古い記事を削除する
+        cutoff = time.time() - self.retention_days * 86400
+        with self._transaction() as conn:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS expired (id INTEGER PRIMARY KEY)')
+            conn.execute('DELETE FROM expired')
+            conn.execute('INSERT INTO expired SELECT id FROM articles WHERE fetched_at < ?', (cutoff,))
+            conn.execute(
+                """INSERT OR IGNORE INTO expired SELECT id FROM articles
+                   ORDER BY published_at DESC, id DESC LIMIT -1 OFFSET ?""",
+                (self.max_articles,)
+            )
+            removed = conn.execute('SELECT COUNT(*) FROM expired').fetchone()[0]
+            conn.execute('DELETE FROM articles_fts WHERE rowid IN (SELECT id FROM expired)')
+            conn.execute('DELETE FROM query_articles WHERE article_id IN (SELECT id FROM expired)')
+            conn.execute('DELETE FROM articles WHERE id IN (SELECT id FROM expired)')
+            conn.execute('DELETE FROM queries WHERE fetched_at < ?', (cutoff,))
+        if removed:
+            self._connection().execute('PRAGMA incremental_vacuum')
+            logger.info("保存期間・上限を超えた記事を%s件削除しました", removed)
+        return removed
+
+    def claim_sync(self, name, interval):
+        # 複数のワーカーのうち1つだけが定期同期を行うよう、前回から interval 秒経っていれば実行権を得る
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT claimed_at FROM sync_state WHERE name = ?', (name,)).fetchone()
+            if row is not None and now - row['claimed_at'] < interval:
+                return False
+            conn.execute('INSERT OR REPLACE INTO sync_state (name, claimed_at) VALUES (?, ?)', (name, now))
+            return True
+
+    def stats(self):
+        conn = self._connection()
+        return {
+            'articles': conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0],
+            'unclassified': conn.execute('SELECT COUNT(*) FROM articles WHERE positive IS NULL').fetchone()[0],
+            'queries': conn.execute('SELECT COUNT(*) FROM queries').fetchone()[0],
+        }
+
+
+class ArticleSync:
+    """既定の話題の記事を定期的に取得し、判定と古い記事の削除を行うバックグラウンド処理"""
+
+    def __init__(self, store, topics, interval, sync_topic, classify):
+        self.store = store
+        self.topics = topics
+        self.interval = interval
+        self.sync_topic = sync_topic
+        self.classify = classify
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='article-sync', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        for topic in self.topics:
+            try:
+                self.sync_topic(topic)
+            except Exception as e:
+                logger.error("記事の同期に失敗しました（%s）: %s", topic, e)
+        # 未判定の記事をまとめて判定しておく
+        while True:
+            pending = self.store.unclassified()
+            if not pending:
+                break
+            self.store.set_verdicts(zip((row['id'] for row in pending), self.classify(pending)))
+        self.store.prune()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.store.claim_sync('articles', self.interval):
+                    started = time.perf_counter()
+                    self.run_once()
+                    logger.info("記事の同期が完了しました（%.1fms）", (time.perf_counter() - started) * 1000)
+            except Exception:
+                # 判定の混雑などで失敗しても同期のスレッドは止めず、次の周期で再試行する
+                logger.exception("記事の同期に失敗しました")
+            self._stop.wait(self.interval)
@@ -0,0 +1,231 @@
+import logging
+import subprocess
+import threading
+import time
+from array import array
+
+try:
+    import audioop
+except ImportError:
+    audioop = None
+
+logger = logging.getLogger(__name__)
+
+
+def frame_rms(frame):
+    # 16bitリトルエンディアンPCMのRMS（音量）を求める
+    if audioop is not None:
+        return audioop.rms(frame, 2)
+    samples = array('h', frame)
+    if not samples:
+        return 0
+    return int((sum(s * s for s in samples) / len(samples)) ** 0.5)
+
+
+class RingBuffer:
+    """容量固定のバイトリングバッファ。溢れた場合は古いデータから上書きする"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self.overflowed = 0
+
+    def __len__(self):
+        return self._size
+
+    def write(self, data):
+        n = len(data)
+        if n >= self.capacity:
+            self.overflowed += self._size + n - self.capacity
+            self._buf[:] = data[-self.capacity:]
+            self._start = 0
+            self._size = self.capacity
+            return
+        end = (self._start + self._size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._buf[end:end + first] = data[:first]
+        self._buf[:n - first] = data[first:]
+        self._size += n
+        if self._size > self.capacity:
+            over = self._size - self.capacity
+            self.overflowed += over
+            self._start = (self._start + over) % self.capacity
+            self._size = self.capacity
+
+    def getvalue(self):
+        end = self._start + self._size
+        if end <= self.capacity:
+            return bytes(self._buf[self._start:end])
+        return bytes(self._buf[self._start:]) + bytes(self._buf[:end - self.capacity])
+
+
+class EnergyVAD:
+    """フレームごとの音量で発話区間を検出する簡易VAD
+
+    最初の calibration_ms で背景雑音レベルを推定し、その ratio 倍（最低 min_threshold）を
+    超えるフレームが続いたら発話開始、発話後に silence_ms 無音が続いたら発話終了とみなす。
+    """
+
+    def __init__(self, sample_rate, frame_ms=30, calibration_ms=300, silence_ms=700,
+                 min_speech_ms=150, min_threshold=300, ratio=3.0):
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.frame_ms = frame_ms
+        self.calibration_frames = max(1, calibration_ms // frame_ms)
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.speech_frames = max(1, min_speech_ms // frame_ms)
+        self.min_threshold = min_threshold
+        self.ratio = ratio
+        self.threshold = min_threshold
+        self.noise_level = None
+        self.speech_started = False
+        self.endpointed = False
+        self._frames = 0
+        self._noise_sum = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._pending = b''
+
+    def feed(self, data):
+        # 受け取ったPCMをフレームに区切って判定し、発話終了を検出したらTrueを返す
+        data = self._pending + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+        for offset in range(0, usable, self.frame_bytes):
+            if self._process(frame_rms(data[offset:offset + self.frame_bytes])):
+                return True
+        return False
+
+    def _process(self, rms):
+        self._frames += 1
+        if self._frames <= self.calibration_frames:
+            self._noise_sum += rms
+            if self._frames == self.calibration_frames:
+                self.noise_level = self._noise_sum / self.calibration_frames
+                self.threshold = max(self.min_threshold, self.noise_level * self.ratio)
+            return False
+
+        if rms >= self.threshold:
+            self._voiced_run += 1
+            self._silent_run = 0
+            if self._voiced_run >= self.speech_frames:
+                self.speech_started = True
+        else:
+            self._voiced_run = 0
+            self._silent_run += 1
+            if self.speech_started and self._silent_run >= self.silence_frames:
+                self.endpointed = True
+        return self.endpointed
+
+
+class StreamingRecorder:
+    """arecordの標準出力から生PCMを読み込み、メモリ上のリングバッファに溜める録音器
+
+    VADで発話の終了を検出すると録音を止め、on_endpoint(recorder) を呼び出す。
+    stop() を呼ばれる前にarecordが終了した場合は on_abort(recorder) を呼び出す。
+    """
+
+    def __init__(self, command, sample_rate, buffer_seconds, max_seconds, vad=None,
+                 on_endpoint=None, should_stop=None, stop_check_interval=0.25, chunk_bytes=4096, on_abort=None):
+        self.command = command
+        self.sample_rate = sample_rate
+        self.max_bytes = int(max_seconds * sample_rate) * 2
+        self.buffer = RingBuffer(int(buffer_seconds * sample_rate) * 2)
+        self.vad = vad
+        self.on_endpoint = on_endpoint
+        self.on_abort = on_abort
+        self.should_stop = should_stop
+        self.stop_check_interval = stop_check_interval
+        self.stop_reason = None
+        self.chunk_bytes = chunk_bytes
+        self.process = None
+        self.started_at = None
+        self.endpointed = threading.Event()
+        self.recognition = None  # 自動終端時に開始した音声認識のFuture
+        self._received = 0
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.started_at = time.monotonic()
+        self._reader = threading.Thread(target=self._read_loop, name='arecord-reader', daemon=True)
+        self._reader.start()
+        logger.info("ストリーミング録音を開始しました（PID: %s）", self.process.pid)
+
+    def _read_loop(self):
+        stdout = self.process.stdout
+        endpoint = False
+        next_stop_check = time.monotonic() + self.stop_check_interval
+        while True:
+            chunk = stdout.read1(self.chunk_bytes)
+            if not chunk:
+                break
+            with self._lock:
+                self.buffer.write(chunk)
+                self._received += len(chunk)
+            if self.vad is not None and self.vad.feed(chunk):
+                logger.info("発話の終了を検出しました")
+                self.stop_reason = 'vad'
+                endpoint = True
+                break
+            if self._received >= self.max_bytes:
+                logger.info("最大録音時間に達しました")
+                self.stop_reason = 'max_duration'
+                endpoint = True
+                break
+            # 別のプロセス（ワーカー）からの停止要求を一定間隔で確認する
+            if self.should_stop is not None and time.monotonic() >= next_stop_check:
+                next_stop_check = time.monotonic() + self.stop_check_interval
+                if self.should_stop():
+                    logger.info("停止要求を受け取りました")
+                    self.stop_reason = 'stop_requested'
+                    endpoint = True
+                    break
+
+        self._terminate()
+        if endpoint:
+            self.endpointed.set()
+            if self.on_endpoint is not None:
+                try:
+                    self.on_endpoint(self)
+                except Exception as e:
+                    logger.error("発話終了時の処理でエラーが発生しました: %s", e)
+        elif self.stop_reason is None:
+            # 発話の終了を検出する前・stop() を呼ばれる前にarecordが終了した
+            self.stop_reason = 'exited'
+            stderr = self.process.stderr.read().decode('utf-8', errors='replace')
+            logger.error("arecordが終了しました（終了コード: %s）: %s", self.process.returncode, stderr)
+            if self.on_abort is not None:
+                try:
+                    self.on_abort(self)
+                except Exception as e:
+                    logger.error("録音の中断時の処理でエラーが発生しました: %s", e)
+
+    def _terminate(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def stop(self):
+        # 録音を止め、リングバッファ内のPCMを返す
+        if self.stop_reason is None:
+            self.stop_reason = 'stopped'
+        if self.process is not None:
+            self._terminate()
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join(timeout=5)
+        return self.pcm()
+
+    def pcm(self):
+        with self._lock:
+            return self.buffer.getvalue()
+
+    def duration(self):
+        with self._lock:
+            return len(self.buffer) / 2 / self.sample_rate
@@ -0,0 +1,138 @@
+import logging
+
+from app.lazy import LazyModule
+from config import Config
+
+np = LazyModule('numpy')
+
+logger = logging.getLogger(__name__)
+
+
+def pcm_to_samples(pcm):
+    # 16bitリトルエンディアンPCMを浮動小数点のサンプル列に変換する
+    return np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+
+
+def samples_to_pcm(samples):
+    return np.clip(np.rint(samples), -32768, 32767).astype('<i2').tobytes()
+
+
+def remove_dc(samples):
+    # マイクの直流成分（オフセット）を取り除く
+    if not samples.size:
+        return samples
+    return samples - samples.mean()
+
+
+def frame_energies(samples, frame_len):
+    # フレーム単位のRMSを一括で求める（端数のサンプルは含めない）
+    n_frames = samples.size // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def trim_silence(samples, sample_rate, frame_ms=20, noise_ratio=3.0, padding_ms=200):
+    """前後の無音を取り除く
+
+    しきい値は録音ごとに、静かなフレーム（下位10%）の音量を雑音レベルとして決める。
+    小さな声でも削らないよう固定の下限は設けず、しきい値を超えるフレームが無ければ元の録音をそのまま返す。
+    """
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    energies = frame_energies(samples, frame_len)
+    if not energies.size:
+        return samples
+    noise_floor = float(np.percentile(energies, 10))
+    # 全体が発話の録音で雑音レベルを高く見積もりすぎないよう、最大音量の半分を上限にする
+    threshold = min(noise_floor * noise_ratio, float(energies.max()) * 0.5)
+    voiced = np.flatnonzero(energies > threshold)
+    if not voiced.size:
+        return samples
+    padding = sample_rate * padding_ms // 1000
+    start = max(0, int(voiced[0]) * frame_len - padding)
+    end = min(samples.size, (int(voiced[-1]) + 1) * frame_len + padding)
+    return samples[start:end]
+
+
+def normalize_peak(samples, target=0.9, max_gain=20.0):
+    # ピークが target（フルスケール比）になるよう増幅する。雑音を増幅しすぎないよう倍率に上限を設ける
+    if not samples.size:
+        return samples
+    peak = float(np.abs(samples).max())
+    if peak == 0:
+        return samples
+    return samples * min(max_gain, target * 32767 / peak)
+
+
+def lowpass_kernel(cutoff, taps=101):
+    # 窓関数法によるFIRローパスフィルタ（cutoff はサンプリング周波数に対する比）
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def resample(samples, sample_rate, target_rate, taps=101, block=16384):
+    """サンプリング周波数を変換する
+
+    ダウンサンプリング時はエイリアシング防止のFIRローパスをかけてから、
+    線形補間で目的の周波数のサンプル位置の値を求める。出力 block サンプルごとに、
+    必要な範囲の入力だけを畳み込むため、録音が長くても作業用のメモリは増えない。
+    """
+    if sample_rate == target_rate or not samples.size:
+        return samples
+    kernel = lowpass_kernel(0.5 * target_rate / sample_rate * 0.95, taps).astype(np.float32) \
+        if target_rate < sample_rate else None
+    half = taps // 2
+    n_out = int(samples.size * target_rate / sample_rate)
+    step = sample_rate / target_rate
+    output = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, block):
+        positions = np.arange(start, min(n_out, start + block)) * step
+        first = int(positions[0])
+        last = min(samples.size, int(positions[-1]) + 2)
+        if kernel is None:
+            segment = samples[first:last]
+        else:
+            # 前後 half サンプルを含めて畳み込み、[first, last) の位置の出力だけを取り出す
+            lo, hi = max(0, first - half), min(samples.size, last + half)
+            segment = np.convolve(samples[lo:hi], kernel)[first - lo + half:last - lo + half]
+        output[start:start + positions.size] = np.interp(positions - first, np.arange(segment.size), segment)
+    return output
+
+
+class AudioPreprocessor:
+    """音声認識の前処理: 直流成分の除去・前後の無音の除去・目的の周波数への変換・ピーク正規化
+
+    録音（44.1kHz）とアップロード（ffmpegで16kHzに変換済み）の両方に同じ処理をかける。
+    """
+
+    def __init__(self, target_rate=16000, padding_ms=200, enabled=True):
+        self.target_rate = target_rate
+        self.padding_ms = padding_ms
+        self.enabled = enabled
+
+    def process_pcm(self, pcm, sample_rate):
+        # 16bitモノラルPCMを前処理し、(PCM, サンプリング周波数) を返す
+        samples = remove_dc(pcm_to_samples(pcm))
+        samples = trim_silence(samples, sample_rate, padding_ms=self.padding_ms)
+        samples = resample(samples, sample_rate, self.target_rate)
+        samples = normalize_peak(samples)
+        return samples_to_pcm(samples), self.target_rate
+
+    def process(self, audio_data):
+        # sr.AudioData を受け取り、前処理した新しい AudioData を返す
+        if not self.enabled:
+            return audio_data
+        pcm = audio_data.get_raw_data(convert_width=2)
+        processed, rate = self.process_pcm(pcm, audio_data.sample_rate)
+        logger.info(
+            "音声を前処理しました: %.2f秒 (%sバイト) → %.2f秒 (%sバイト)",
+            len(pcm) / 2 / audio_data.sample_rate, len(pcm), len(processed) / 2 / rate, len(processed)
+        )
+        return type(audio_data)(processed, rate, 2)
+
+
+audio_preprocessor = AudioPreprocessor(
+    target_rate=Config.PREPROCESS_TARGET_RATE,
+    padding_ms=Config.PREPROCESS_PADDING_MS,
+    enabled=Config.PREPROCESS_ENABLED
+)
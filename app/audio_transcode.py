@@ -0,0 +1,133 @@
+import logging
+import subprocess
+import threading
+
+from app.lazy import LazyModule
+from config import Config
+
+sr = LazyModule('speech_recognition')
+
+logger = logging.getLogger(__name__)
+
+
+class TranscodeError(Exception):
+    pass
+
+
+class UploadTooLarge(TranscodeError):
+    pass
+
+
+class UnsupportedAudioFormat(TranscodeError):
+    pass
+
+
+# audio/l16 で受け付けるサンプルレートとチャンネル数（値はそのままffmpegの引数になる）
+L16_SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000)
+L16_CHANNELS = (1, 2)
+
+
+def ffmpeg_command(input_args=None, sample_rate=16000):
+    # 標準入力から読み込み、16bitモノラルの生PCMを標準出力へ書き出す
+    return [
+        Config.FFMPEG_PATH,
+        '-hide_banner',
+        '-loglevel', 'error',
+        *(input_args or []),
+        '-i', 'pipe:0',
+        '-f', 's16le',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate),
+        '-ac', '1',
+        'pipe:1'
+    ]
+
+
+def transcode_bytes(data, input_args=None, sample_rate=16000):
+    # メモリ上の音声データをffmpegのパイプで変換し、AudioDataとして返す
+    process = subprocess.Popen(
+        ffmpeg_command(input_args, sample_rate),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    pcm, stderr = process.communicate(data)
+    if process.returncode != 0:
+        raise TranscodeError(stderr.decode('utf-8', errors='replace'))
+    return sr.AudioData(pcm, sample_rate, 2)
+
+
+def transcode_stream(chunks, input_args=None, sample_rate=16000, max_bytes=None):
+    # 受信中の音声チャンクを順次ffmpegへ流し込み、届いた分から変換させる（max_bytes を超えたら打ち切る）
+    process = subprocess.Popen(
+        ffmpeg_command(input_args, sample_rate),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    output = bytearray()
+    errors = []
+
+    def read_stdout():
+        while True:
+            data = process.stdout.read1(65536)
+            if not data:
+                break
+            output.extend(data)
+
+    def read_stderr():
+        errors.append(process.stderr.read())
+
+    readers = [threading.Thread(target=read_stdout, daemon=True), threading.Thread(target=read_stderr, daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    received = 0
+    too_large = False
+    try:
+        for chunk in chunks:
+            if chunk:
+                received += len(chunk)
+                if max_bytes is not None and received > max_bytes:
+                    too_large = True
+                    process.kill()
+                    break
+                process.stdin.write(chunk)
+    except BrokenPipeError:
+        pass
+    except BaseException:
+        # 受信が途中で失敗した場合も、ffmpegと読み出しのスレッドを残さない
+        process.kill()
+        raise
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+        for reader in readers:
+            reader.join()
+
+    if too_large:
+        raise UploadTooLarge(f"音声データが上限（{max_bytes}バイト）を超えました")
+    logger.info("ストリーミング受信した音声を変換しました（受信 %s バイト）", received)
+    if process.returncode != 0:
+        raise TranscodeError(b''.join(errors).decode('utf-8', errors='replace'))
+    return sr.AudioData(bytes(output), sample_rate, 2)
+
+
+def raw_input_args(mimetype_params):
+    # Content-Type: audio/l16; rate=44100; channels=1 形式の生PCMをffmpegの入力引数に変換する
+    # 値はクライアントが指定するため、整数として解釈できて対応している値だけを受け付ける
+    rate = _parse_choice(mimetype_params.get('rate', '16000'), L16_SAMPLE_RATES, 'rate')
+    channels = _parse_choice(mimetype_params.get('channels', '1'), L16_CHANNELS, 'channels')
+    # audio/l16 はネットワークバイトオーダー（ビッグエンディアン, RFC 2586）。
+    # voice_input.py はリトルエンディアンのまま送るため endian=little を付ける
+    sample_format = 's16le' if mimetype_params.get('endian') == 'little' else 's16be'
+    return ['-f', sample_format, '-ar', str(rate), '-ac', str(channels)]
+
+
+def _parse_choice(value, choices, name):
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if parsed not in choices:
+        raise UnsupportedAudioFormat(f"audio/l16 の {name} に対応していない値が指定されました: {value!r}")
+    return parsed
@@ -0,0 +1,138 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['id', 'type', 'data', 'timestamp'])
+
+
+class Subscription:
+    # 購読者ごとの上限付きキュー。溢れた場合は古いイベントから捨てる
+    def __init__(self, hub, queue_size):
+        self.hub = hub
+        self.queue = deque(maxlen=queue_size)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def push(self, event):
+        with self.condition:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(event)
+            self.condition.notify()
+
+    def get(self, timeout):
+        # イベントが届くまでブロックし、timeout秒経っても届かなければNoneを返す
+        with self.condition:
+            if not self.queue:
+                self.condition.wait(timeout)
+            if self.queue:
+                return self.queue.popleft()
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """SSEなどの購読者へ型付きイベントを配信するpublish/subscribeハブ
+
+    直近のイベントを history_size 件保持し、Last-Event-ID 以降を再送できる。
+    store（DeviceStateStore）を渡すと、イベントは共有のSQLiteに追記し、各ワーカーの中継スレッドが
+    通し番号の順に読み出して配信する。別のワーカーで発行されたイベント（発話終了・認識結果など）も
+    すべてのワーカーの購読者に届く。このワーカーでの発行は中継スレッドをすぐに起こすので待たされない。
+    """
+
+    def __init__(self, history_size=100, queue_size=64, store=None, poll_interval=0.1):
+        self.queue_size = queue_size
+        self.store = store
+        self.poll_interval = poll_interval
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._relay_pid = None
+        self._last_id = 0
+
+    def publish(self, event_type, data=None, dedupe_key=None):
+        # dedupe_key は、同じ入力を複数のワーカーが受け取るイベント（GPIOのタッチ）を1件にまとめるための鍵
+        if self.store is not None:
+            self._ensure_relay()
+            appended = self.store.append_event(event_type, data, self._history.maxlen, dedupe_key)
+            if appended is None:
+                return None
+            self._wake.set()
+            return Event(appended[0], event_type, data, appended[1])
+        with self._lock:
+            event = Event(next(self._ids), event_type, data, time.time())
+        self._deliver(event)
+        return event
+
+    def _deliver(self, event):
+        with self._lock:
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        with metrics.stage('sse_fanout'):
+            for subscription in subscribers:
+                subscription.push(event)
+
+    def _ensure_relay(self):
+        # 中継スレッドはプロセスごとに1つ（fork したワーカーでは起動し直す）
+        with self._lock:
+            if self._relay_pid == os.getpid():
+                return
+            self._relay_pid = os.getpid()
+            # 再送用の履歴は共有ストアの直近のイベントで埋め、それより後のイベントから配信する
+            self._history.clear()
+            self._last_id = max(0, self.store.last_event_id() - self._history.maxlen)
+            for event in self._read_events():
+                self._history.append(event)
+        threading.Thread(target=self._relay, name='event-relay', daemon=True).start()
+
+    def _read_events(self):
+        events = [Event(*row) for row in self.store.events_after(self._last_id)]
+        if events:
+            self._last_id = events[-1].id
+        return events
+
+    def _relay(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                for event in self._read_events():
+                    self._deliver(event)
+            except Exception:
+                logger.exception("共有ストアからのイベントの読み出しに失敗しました")
+
+    def subscribe(self, last_event_id=None):
+        if self.store is not None:
+            self._ensure_relay()
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event.id > last_event_id:
+                        subscription.queue.append(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,36 @@
+import importlib
+import threading
+import time
+
+# 遅延インポートしたモジュールごとの読み込み時間（秒）
+import_timings = {}
+
+
+class LazyModule:
+    """属性に初めてアクセスしたときに実際のインポートを行うモジュールの代理オブジェクト
+
+    nagisa のように読み込みに時間のかかるモジュールを、起動時ではなく
+    ウォームアップ時や最初に使うときまで遅らせるために使う。
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    import_timings[self._name] = time.perf_counter() - start
+                    self._module = module
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
@@ -0,0 +1,225 @@
+"""SDカードへの書き込みを抑えたログ出力
+
+ログ記録は QueueHandler でキューに積むだけにして、書式化と出力は QueueListener のスレッドで行う。
+メッセージは logger.info("...: %s", value) の形で渡し、文字列への変換も出力時まで遅らせる。
+
+    - 直近のログはメモリ上のリングバッファに保持し、/debug/logs で参照する
+    - ファイル・コンソールへは LOG_FILE_LEVEL・LOG_CONSOLE_LEVEL（既定は WARNING）以上のみ書き出す
+      （起動時間の計測など LOG_CONSOLE_LOGGERS のロガーは INFO でもコンソールに出す）
+    - 必要なときは POST /debug/logs/dump でリングバッファの内容をファイルに書き出す（毎回同じファイルを上書きする）
+    - WARNING 未満のログは、呼び出し箇所ごとに件数を制限する（SSEのループなど頻繁に通る箇所向け）
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from flask import abort, jsonify, request
+
+from config import Config
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DUMP_FILENAME = 'news-log-dump.log'
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def parse_levels(spec):
+    # "app.routes=DEBUG,werkzeug=WARNING" を {'app.routes': 10, 'werkzeug': 30} に変換する
+    levels = {}
+    for item in spec.split(','):
+        name, sep, level = item.strip().partition('=')
+        if sep and name.strip():
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return {name: level for name, level in levels.items() if isinstance(level, int)}
+
+
+class RateLimitFilter(logging.Filter):
+    """呼び出し箇所（logger名・ファイル・行番号）ごとのトークンバケットで、WARNING 未満のログを間引く
+
+    書式文字列ではなく呼び出し箇所をキーにするので、f-string で組み立てたメッセージでもバケットは増え続けない。
+    間引いた件数は、次に通したログの suppressed 属性に載せる。
+    """
+
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.suppressed_total = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                self.suppressed_total += 1
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class ConsoleFilter(logging.Filter):
+    # コンソールには level 以上のログと、指定したロガー（とその子）のログを出す
+    def __init__(self, level, names):
+        super().__init__()
+        self.level = level
+        self.names = tuple(names)
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        return any(record.name == name or record.name.startswith(name + '.') for name in self.names)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    # 標準の QueueHandler は積む前に呼び出し元のスレッドで書式化するため、そのまま積む
+    # （引数はログ出力時に文字列へ変換される。呼び出し後に書き換える可変オブジェクトは渡さないこと）
+    def prepare(self, record):
+        return record
+
+
+class RingBufferHandler(logging.Handler):
+    """直近 capacity 件のログを保持する。日時などの書式化は参照されたときにのみ行う"""
+
+    def __init__(self, capacity):
+        super().__init__()
+        self._records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        # 保持している間、例外のトレースバック（フレームとローカル変数）や引数のオブジェクトを
+        # 生かしておかないよう、受け取った時点で文字列にしてから積む（キューの書き出しスレッドで動く）
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                if not record.exc_text:
+                    record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+        except Exception:
+            self.handleError(record)
+            return
+        self._records.append(record)
+
+    def records(self, level=logging.NOTSET, name=None, limit=None):
+        selected = [record for record in list(self._records)
+                    if record.levelno >= level and (name is None or record.name.startswith(name))]
+        return selected[-limit:] if limit else selected
+
+    def to_dict(self, record):
+        entry = {
+            'time': record.created,
+            'logger': record.name,
+            'level': record.levelname,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'suppressed', None):
+            entry['suppressed'] = record.suppressed
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return entry
+
+
+class LogPipeline:
+    def __init__(self):
+        self.ring = None
+        self.rate_limit = None
+        self.listener = None
+        self._lock = threading.Lock()
+
+    def configure(self):
+        # ルートロガーのハンドラをキューへの投入だけに置き換える（複数回呼ばれても一度だけ行う）
+        with self._lock:
+            if self.listener is not None:
+                return self
+            formatter = logging.Formatter(LOG_FORMAT)
+            self.ring = RingBufferHandler(Config.LOG_RING_SIZE)
+            handlers = [self.ring]
+            console = logging.StreamHandler()
+            console.addFilter(ConsoleFilter(logging.getLevelName(Config.LOG_CONSOLE_LEVEL),
+                                            [name.strip() for name in Config.LOG_CONSOLE_LOGGERS.split(',') if name.strip()]))
+            console.setFormatter(formatter)
+            handlers.append(console)
+            if Config.LOG_FILE_PATH:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    Config.LOG_FILE_PATH, maxBytes=Config.LOG_FILE_MAX_BYTES, backupCount=2, encoding='utf-8', delay=True
+                )
+                file_handler.setLevel(Config.LOG_FILE_LEVEL)
+                file_handler.setFormatter(formatter)
+                handlers.append(file_handler)
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = LazyQueueHandler(log_queue)
+            self.rate_limit = RateLimitFilter(Config.LOG_RATE_PER_SECOND, Config.LOG_RATE_BURST)
+            queue_handler.addFilter(self.rate_limit)
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(queue_handler)
+            root.setLevel(Config.LOG_LEVEL)
+            for name, level in parse_levels(Config.LOG_LEVELS).items():
+                logging.getLogger(name).setLevel(level)
+
+            self.listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.listener.stop)
+        return self
+
+    def dump(self, path=None):
+        # リングバッファの内容をファイルに書き出す（必要なときだけディスクに書く）
+        # 呼ばれるたびに同じファイルを置き換えるので、何度ダンプしてもディスク上は1ファイルのまま
+        path = path or os.path.join(Config.LOG_DUMP_DIR, DUMP_FILENAME)
+        formatter = logging.Formatter(LOG_FORMAT)
+        records = self.ring.records()
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(formatter.format(record) + '\n')
+        os.replace(temp_path, path)
+        return path, len(records)
+
+    def init_app(self, app):
+        self.configure()
+        if not Config.LOG_DEBUG_ENDPOINT_ENABLED:
+            return
+        app.extensions['log_pipeline'] = self
+        app.add_url_rule('/debug/logs', 'debug_logs', self._logs_view)
+        app.add_url_rule('/debug/logs/dump', 'debug_logs_dump', self._dump_view, methods=['POST'])
+
+    @staticmethod
+    def _require_local():
+        # ログには端末IDや認識結果が含まれるため、サーバー自身からのアクセスにのみ応じる
+        if request.remote_addr not in LOOPBACK_ADDRESSES:
+            abort(403)
+
+    def _logs_view(self):
+        self._require_local()
+        level = logging.getLevelName(request.args.get('level', 'NOTSET').upper())
+        limit = request.args.get('limit', type=int) or 200
+        records = self.ring.records(level if isinstance(level, int) else logging.NOTSET,
+                                    request.args.get('logger'), limit)
+        return jsonify({
+            'records': [self.ring.to_dict(record) for record in records],
+            'suppressed_total': self.rate_limit.suppressed_total,
+        })
+
+    def _dump_view(self):
+        self._require_local()
+        path, count = self.dump()
+        return jsonify({'path': path, 'records': count})
+
+
+log_pipeline = LogPipeline()
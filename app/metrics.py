@@ -0,0 +1,212 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from flask import Response, g, has_request_context, request
+
+from config import Config
+
+# 処理段階ごとの所要時間（秒）のバケット。Raspberry Pi上の数ms〜数十秒の処理を想定
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL_TIMER = nullcontext()
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """ラベルの組ごとにバケット別の件数・合計・件数を保持するヒストグラム
+
+    observe はバケットの二分探索と加算のみで、累積値への変換は出力時に行う。
+    """
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [バケットごとの件数..., +Inf], 合計
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, ("le", le))} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {total!r}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe_stage(self.stage, time.perf_counter() - self.start, failed=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """処理段階の所要時間・リクエスト数を集計し、Prometheusのテキスト形式で出力する
+
+    無効な場合、stage() は何もしないコンテキストマネージャーを、timed() は元の関数を
+    そのまま返すため、計測のための処理は一切行われない。
+    """
+
+    def __init__(self, enabled=True, server_timing=False, prefix='news'):
+        self.enabled = enabled
+        self.server_timing = enabled and server_timing
+        self.stage_seconds = Histogram(
+            f'{prefix}_stage_duration_seconds', '処理段階ごとの所要時間', ('stage',))
+        self.stage_errors = Counter(
+            f'{prefix}_stage_errors_total', '例外で終了した処理段階の件数', ('stage',))
+        self.request_seconds = Histogram(
+            f'{prefix}_http_request_duration_seconds', 'HTTPリクエストの処理時間（レスポンスヘッダー送信まで）',
+            ('endpoint', 'method'))
+        self.requests = Counter(
+            f'{prefix}_http_requests_total', 'HTTPリクエスト数', ('endpoint', 'method', 'status'))
+        self.events = Counter(f'{prefix}_events_total', '発生したイベントの件数', ('event', 'result'))
+        self._metrics = [self.stage_seconds, self.stage_errors, self.request_seconds, self.requests, self.events]
+        self._gauges = []
+
+    def observe_stage(self, stage, seconds, failed=False):
+        self.stage_seconds.observe(seconds, stage)
+        if failed:
+            self.stage_errors.inc(stage)
+        if self.server_timing and has_request_context():
+            timings = g.setdefault('server_timing', {})
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def observe(self, stage, seconds):
+        # 計測済みの所要時間を記録する（with で囲めない処理向け）
+        if self.enabled:
+            self.observe_stage(stage, seconds)
+
+    def stage(self, stage):
+        # with metrics.stage('newsapi'): の形で処理時間を計測する
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def timed(self, stage, func):
+        # 関数の呼び出しごとに所要時間を計測するラッパーを返す（無効時は関数をそのまま返す）
+        if not self.enabled:
+            return func
+
+        def wrapper(*args, **kwargs):
+            with _StageTimer(self, stage):
+                return func(*args, **kwargs)
+        wrapper.__name__ = getattr(func, '__name__', stage)
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def count(self, event, result='ok'):
+        if self.enabled:
+            self.events.inc(event, result)
+
+    def add_gauges(self, prefix, help, collect):
+        # collect() が返す辞書の数値を {prefix}_{キー} のゲージとして出力する
+        self._gauges.append((prefix, help, collect))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, help, collect in self._gauges:
+            for key, value in sorted(collect().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# HELP {prefix}_{key} {help}')
+                    lines.append(f'# TYPE {prefix}_{key} gauge')
+                    lines.append(f'{prefix}_{key} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        # 有効な場合のみ、リクエストの計測フックと /metrics を登録する
+        if not self.enabled:
+            return
+        app.extensions['metrics'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    def _before_request(self):
+        g.metrics_request_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.get('metrics_request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.request_seconds.observe(elapsed, endpoint, request.method)
+        self.requests.inc(endpoint, request.method, str(response.status_code))
+        if self.server_timing:
+            timings = g.get('server_timing', {})
+            entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings.items()]
+            entries.append(f'total;dur={elapsed * 1000:.1f}')
+            response.headers.add('Server-Timing', ', '.join(entries))
+        return response
+
+    def _metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics(enabled=Config.METRICS_ENABLED, server_timing=Config.SERVER_TIMING_ENABLED)
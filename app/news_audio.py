@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.tts_cache import concat_mp3, strip_id3
+
+logger = logging.getLogger(__name__)
+
+
+class NewsAudio:
+    """ニュース読み上げ音声の登録と、セグメントの並列合成・逐次配信
+
+    get_news で読み上げるセグメントを登録してIDを払い出し、
+    /api/news-audio/<id> で合成済みのセグメントから順に配信する。
+    store（DeviceStateStore）を渡すと登録したセグメントを共有のSQLiteにも保存し、
+    登録したのとは別のワーカーに届いた /api/news-audio/<id> にも応じられるようにする。
+    """
+
+    def __init__(self, tts_cache, workers, max_entries, lang='ja', store=None):
+        self.tts_cache = tts_cache
+        self.lang = lang
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+
+    def audio_id(self, segments):
+        # セグメントの内容から決まるIDなので、そのままETagとしても使える
+        digest = hashlib.sha1()
+        for segment in segments:
+            digest.update(self.tts_cache.key(segment, self.lang).encode('ascii'))
+        return digest.hexdigest()[:20]
+
+    def register(self, segments):
+        audio_id = self.audio_id(segments)
+        if self.store is not None:
+            self.store.save_audio_segments(audio_id, list(segments), self.max_entries)
+        self._remember(audio_id, segments)
+        # クライアントが取りに来る前に合成を始めておく
+        self.synthesize_async(segments)
+        return audio_id
+
+    def _remember(self, audio_id, segments):
+        with self._lock:
+            self._entries[audio_id] = list(segments)
+            self._entries.move_to_end(audio_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def segments(self, audio_id):
+        with self._lock:
+            segments = self._entries.get(audio_id)
+        if segments is None and self.store is not None:
+            # 別のワーカーが登録した音声
+            segments = self.store.load_audio_segments(audio_id)
+            if segments is not None:
+                self._remember(audio_id, segments)
+        return segments
+
+    def is_cached(self, segments):
+        return all(self.tts_cache.contains(segment, self.lang) for segment in segments)
+
+    def synthesize_async(self, segments):
+        futures = []
+        for segment in segments:
+            if self.tts_cache.contains(segment, self.lang):
+                # 合成済みのセグメントはスレッドプールの順番待ちに並ばせない
+                future = Future()
+                future.set_result(self.tts_cache.get(segment, self.lang))
+            else:
+                future = self._executor.submit(self.tts_cache.get, segment, self.lang)
+            futures.append(future)
+        return futures
+
+    def _results(self, futures, skipped=None):
+        # 合成に失敗したセグメントは飛ばして読み上げを続ける（すべて失敗した場合のみ例外を送出する）
+        # skipped にリストを渡すと、飛ばしたセグメントの番号を追加する
+        error = None
+        produced = False
+        for index, future in enumerate(futures):
+            try:
+                data = future.result()
+            except Exception as e:
+                logger.warning("音声セグメントの合成に失敗したため飛ばします: %s", e)
+                error = e
+                if skipped is not None:
+                    skipped.append(index)
+                continue
+            produced = True
+            yield data
+        if not produced and error is not None:
+            raise error
+
+    def wait(self, segments):
+        # 全セグメントの合成が終わるまで待つ
+        for _ in self._results(self.synthesize_async(segments)):
+            pass
+
+    def render(self, segments, skipped=None):
+        return concat_mp3(self._results(self.synthesize_async(segments), skipped))
+
+    def stream(self, segments, skipped=None):
+        # 全セグメントを並列に合成し、先頭から合成でき次第順に送り出す
+        futures = self.synthesize_async(segments)
+        try:
+            for data in self._results(futures, skipped):
+                yield strip_id3(data)
+        except Exception as e:
+            logger.error("音声ストリーミング中にエラーが発生しました: %s", e)
+            raise
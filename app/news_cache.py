@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(query, params):
+    # 検索ワードを正規化し、APIキー以外のパラメータと合わせてキーにする
+    normalized = unicodedata.normalize('NFKC', query or '').strip().lower()
+    extra = tuple(sorted((k, str(v)) for k, v in params.items() if k not in ('q', 'apiKey')))
+    return (normalized, extra)
+
+
+class _Flight:
+    # 同一キーへの同時リクエストを1回の上流呼び出しにまとめるための待ち合わせ
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class NewsCache:
+    """TTL + LRU のニュース検索結果キャッシュ
+
+    TTL切れから stale_ttl 秒以内のエントリは即座に返しつつ、バックグラウンドで更新する。
+    TTLの経過は clock（既定は time.monotonic）で測る。
+    """
+
+    def __init__(self, ttl, stale_ttl, max_entries, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'fallbacks': 0,
+        }
+
+    def get_or_fetch(self, key, fetch):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._flights:
+                        self._flights[key] = _Flight()
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                    return value
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self._stats['misses'] += 1
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._run_flight(key, fetch, flight)
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _run_flight(self, key, fetch, flight):
+        try:
+            flight.value = fetch()
+            self.put(key, flight.value)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _refresh(self, key, fetch):
+        with self._lock:
+            flight = self._flights[key]
+            self._stats['refreshes'] += 1
+        self._run_flight(key, fetch, flight)
+        if flight.error is not None:
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+            logger.warning("ニュースキャッシュのバックグラウンド更新に失敗しました: %s", flight.error)
+
+    def get_stale(self, key):
+        # 期限に関係なく保持しているエントリを返す（上流に障害があるときの代替用）
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._stats['fallbacks'] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['ttl'] = self.ttl
+            stats['stale_ttl'] = self.stale_ttl
+            return stats
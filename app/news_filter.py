@@ -0,0 +1,234 @@
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+from app.lazy import LazyModule
+from app.tokenizer_pool import TokenizerPool
+from config import Config
+
+# nagisaはインポート時にモデルを読み込むため、最初に使うとき（またはウォームアップ時）まで遅らせる
+nagisa = LazyModule('nagisa')
+
+
+class AhoCorasick:
+    """複数のキーワードを1回の走査で検出するAho-Corasickオートマトン"""
+
+    def __init__(self, words):
+        # goto[state] = {文字: 次の状態}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [False]
+        for word in words:
+            if word:
+                self._add(word)
+        self._build()
+
+    def _add(self, word):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(False)
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._output[state] = True
+
+    def _build(self):
+        # 幅優先で失敗遷移を構築
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                if self._output[self._fail[nxt]]:
+                    self._output[nxt] = True
+
+    def search(self, text):
+        # いずれかのキーワードが部分文字列として含まれていればTrue
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                return True
+        return False
+
+
+class NewsFilter:
+    """ネガティブワードを含む記事を除外するフィルタエンジン
+
+    部分文字列に一致しない記事は形態素解析を省略し、一致した記事のみを
+    まとめてnagisaで解析する。判定結果は記事のURL/タイトル単位でキャッシュする。
+    tokenizer（TokenizerPool）を渡すと、解析をワーカープロセスで行う。
+    """
+
+    def __init__(self, negative_words, cache_size=1024, tokenizer=None, workers=2):
+        self.negative_words = frozenset(negative_words)
+        self.tokenizer = tokenizer
+        self._matcher = AhoCorasick(self.negative_words)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._executor = None if tokenizer is not None else ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='news-filter')
+
+    @staticmethod
+    def article_key(article):
+        return (article.get('url') or '', article.get('title') or '')
+
+    @staticmethod
+    def article_text(article):
+        # タイトルと概要を結合してテキストを作成
+        return (article.get('title') or '') + ' ' + (article.get('description') or '')
+
+    def _get_cached(self, key):
+        with self._lock:
+            verdict = self._cache.get(key)
+            if verdict is not None:
+                self._cache.move_to_end(key)
+            return verdict
+
+    def _set_cached(self, key, verdict):
+        with self._lock:
+            self._cache[key] = verdict
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def tag_batch(self, texts):
+        # nagisaで複数テキストをまとめて形態素解析し、単語リストを返す
+        if self.tokenizer is not None:
+            return self.tokenizer.tag_batch(texts)
+        return [nagisa.tagging(text).words for text in texts]
+
+    def _submit_tagging(self, texts):
+        if self.tokenizer is not None:
+            return self.tokenizer.submit(texts)
+        return self._executor.submit(self.tag_batch, texts)
+
+    def is_positive_text(self, text):
+        # 記事と同じ判定（キャッシュを含む）を1つのテキストに対して行う
+        return self.verdicts([{'title': text}])[0]
+
+    def verdicts(self, articles):
+        # 各記事がポジティブかどうかの判定結果を記事の順序で返す
+        return self.submit(articles).result()
+
+    def submit(self, articles):
+        # 判定結果（記事の順序のリスト）の Future を返す。形態素解析の要らない記事だけなら完了済みで返す
+        results, pending = self._precheck(articles)
+        return self._judge(results, pending)
+
+    def _judge(self, results, pending):
+        # _precheck で判定できなかった記事をまとめて形態素解析に回し、results を埋めた Future を返す
+        future = Future()
+        if not pending:
+            future.set_result(results)
+            return future
+        tagging = self._submit_tagging([text for _, _, text in pending])
+
+        def on_tagged(done):
+            if future.cancelled():
+                return
+            try:
+                tagged = done.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            for (i, key, _), words in zip(pending, tagged):
+                verdict = not any(word in self.negative_words for word in words)
+                results[i] = verdict
+                self._set_cached(key, verdict)
+            try:
+                future.set_result(results)
+            except InvalidStateError:
+                # 待っている間に呼び出し側が取り消した
+                pass
+
+        # 呼び出し側が取り消した場合は、まだ始まっていない解析も取り消す
+        future.add_done_callback(lambda f: tagging.cancel() if f.cancelled() else None)
+        tagging.add_done_callback(on_tagged)
+        return future
+
+    def submit_each(self, articles):
+        # 記事ごとの判定結果の Future のリストを返す。形態素解析の要る記事は1つのバッチにまとめて submit する
+        # （形態素解析の要らない記事の Future は完了済み。解析待ちの記事がすべて取り消されたらバッチも取り消す）
+        futures = [Future() for _ in articles]
+        results, pending = self._precheck(articles)
+        for future, verdict in zip(futures, results):
+            if verdict is not None:
+                future.set_result(verdict)
+        if not pending:
+            return futures
+        waiting = {i: futures[i] for i, _, _ in pending}
+        batch = self._judge(list(results), pending)
+
+        def on_judged(done):
+            for i, future in waiting.items():
+                try:
+                    if done.cancelled():
+                        future.cancel()
+                    elif done.exception() is not None:
+                        future.set_exception(done.exception())
+                    else:
+                        future.set_result(done.result()[i])
+                except InvalidStateError:
+                    # 呼び出し側が取り消した
+                    pass
+
+        def on_cancelled(_):
+            if all(future.cancelled() for future in waiting.values()):
+                batch.cancel()
+
+        for future in waiting.values():
+            future.add_done_callback(on_cancelled)
+        batch.add_done_callback(on_judged)
+        return futures
+
+    def _precheck(self, articles):
+        # キャッシュ済み・ネガティブワードを部分文字列として含まない記事を先に判定する
+        results = [None] * len(articles)
+        pending = []
+        for i, article in enumerate(articles):
+            key = self.article_key(article)
+            verdict = self._get_cached(key)
+            if verdict is not None:
+                results[i] = verdict
+                continue
+            text = self.article_text(article)
+            if not self._matcher.search(text):
+                # ネガティブワードが部分文字列として存在しなければ形態素解析は不要
+                results[i] = True
+                self._set_cached(key, True)
+            else:
+                pending.append((i, key, text))
+        return results, pending
+
+    def filter(self, articles):
+        return [article for article, ok in zip(articles, self.verdicts(articles)) if ok]
+
+
+# TOKENIZER_WORKERS が0の場合は、従来どおりこのプロセスのスレッドで解析する
+tokenizer_pool = TokenizerPool(
+    workers=Config.TOKENIZER_WORKERS,
+    max_pending=Config.TOKENIZER_MAX_PENDING,
+    queue_timeout=Config.TOKENIZER_QUEUE_TIMEOUT,
+    start_method=Config.TOKENIZER_START_METHOD,
+    max_tasks_per_child=Config.TOKENIZER_MAX_TASKS_PER_CHILD
+) if Config.TOKENIZER_WORKERS > 0 else None
+
+news_filter = NewsFilter(
+    Config.NEGATIVE_WORDS,
+    cache_size=Config.NEWS_FILTER_CACHE_SIZE,
+    tokenizer=tokenizer_pool,
+    workers=Config.NEWS_FILTER_WORKERS
+)
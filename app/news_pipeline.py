@@ -0,0 +1,83 @@
+import logging
+import time
+from collections import deque
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class NewsPipeline:
+    """記事の取得・ポジティブ判定・音声合成を重ねて実行するパイプライン
+
+    取得した記事を先頭から filter_workers 件ずつのまとまりで news_filter.submit_each に回し
+    （形態素解析はまとまりごとに1バッチ）、判定待ちが filter_workers の2倍を超えないよう先読みする。
+    先頭から順に結果を確かめて、採用が決まった記事のタイトルはその場で音声合成を始める。
+    limit 件そろった時点で残りの判定は打ち切る（まだ始まっていないバッチは取り消され、以降は投入しない）。
+    on_accept を渡すと、記事の採用が決まるたびに on_accept(index, article) を呼ぶ。
+    """
+
+    def __init__(self, news_filter, news_audio, filter_workers, limit=3):
+        self.news_filter = news_filter
+        self.news_audio = news_audio
+        self.limit = limit
+        self.chunk_size = max(1, filter_workers)
+        self.window = self.chunk_size * 2
+
+    def _submit(self, articles):
+        # 記事ごとの判定の Future を返す（判定にかかった時間は記事ごとに完了時に記録する）
+        started = time.perf_counter()
+        futures = self.news_filter.submit_each(articles)
+        for future in futures:
+            future.add_done_callback(lambda f: metrics.observe('filter_article', time.perf_counter() - started))
+        return futures
+
+    def run(self, fetch, select_articles, title_segment, on_accept=None):
+        timings = {}
+        start = time.perf_counter()
+
+        news_data = fetch()
+        articles = select_articles(news_data['articles'])
+        timings['fetch'] = time.perf_counter() - start
+
+        filter_start = time.perf_counter()
+        accepted = []
+        examined = 0
+        first_accepted = None
+        pending = deque()
+        remaining = list(articles)
+
+        def fill():
+            # 判定待ちを window 件までに抑えつつ、chunk_size 件ずつ先読みで投入する
+            while remaining and len(pending) < self.window:
+                chunk = remaining[:self.chunk_size]
+                del remaining[:self.chunk_size]
+                pending.extend(zip(chunk, self._submit(chunk)))
+
+        fill()
+        while pending and len(accepted) < self.limit:
+            article, future = pending.popleft()
+            examined += 1
+            if future.result():
+                accepted.append(article)
+                if first_accepted is None:
+                    first_accepted = time.perf_counter() - start
+                # 残りの記事を判定している間に、このタイトルの音声合成を始めておく
+                self.news_audio.synthesize_async([title_segment(article['title'])])
+                if on_accept is not None:
+                    on_accept(len(accepted) - 1, article)
+            if len(accepted) < self.limit:
+                fill()
+        for _, future in pending:
+            future.cancel()
+        timings['filter'] = time.perf_counter() - filter_start
+        timings['first_accepted'] = first_accepted
+        timings['total'] = time.perf_counter() - start
+        metrics.observe('filter_total', timings['filter'])
+
+        logger.info(
+            "パイプライン完了: %s件中%s件を判定し%s件を採用 (取得 %.1fms, 判定 %.1fms)",
+            len(articles), examined, len(accepted), timings['fetch'] * 1000, timings['filter'] * 1000
+        )
+        return accepted, {'examined': examined, 'candidates': len(articles), 'timings': timings,
+                          'degraded': news_data.get('degraded', False)}
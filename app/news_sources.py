@@ -0,0 +1,156 @@
+import heapq
+import logging
+import re
+import unicodedata
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.lazy import LazyModule
+
+np = LazyModule('numpy')
+
+logger = logging.getLogger(__name__)
+
+# 見出しの末尾に付く「 - 媒体名」「 | 媒体名」
+_SOURCE_SUFFIX = re.compile(r'\s+[-|｜]\s+[^-|｜]+$')
+
+# 2^31-1。a*h+b が int64 に収まるよう、ハッシュ値と係数はこれ未満にする
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def make_session(pool_size):
+    # keep-aliveで接続を使い回すセッション（同時接続数ぶんのプールを持つ）
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def shingles(text, size=3):
+    # 媒体名・記号・空白を除いた文字列の size 文字ずつの断片
+    text = _SOURCE_SUFFIX.sub('', unicodedata.normalize('NFKC', text or ''))
+    chars = ''.join(ch for ch in text.lower() if ch.isalnum())
+    if len(chars) <= size:
+        return {chars} if chars else set()
+    return {chars[i:i + size] for i in range(len(chars) - size + 1)}
+
+
+class MinHashDeduper:
+    """見出しのMinHashで、別の媒体が配信したほぼ同じ記事をまとめる
+
+    シグネチャを bands 個の帯に分け、いずれかの帯が一致した記事だけを比較する（LSH）。
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm は bands で割り切れる必要があります")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.seed = seed
+        self._coefficients = None
+
+    def _get_coefficients(self):
+        # numpyの読み込みを最初に使うときまで遅らせる
+        if self._coefficients is None:
+            rng = np.random.default_rng(self.seed)
+            self._coefficients = (
+                rng.integers(1, _MERSENNE_PRIME, size=(self.num_perm, 1), dtype=np.int64),
+                rng.integers(0, _MERSENNE_PRIME, size=(self.num_perm, 1), dtype=np.int64)
+            )
+        return self._coefficients
+
+    def signature(self, text):
+        hashes = [zlib.crc32(s.encode('utf-8')) & _MERSENNE_PRIME for s in shingles(text, self.shingle_size)]
+        if not hashes:
+            hashes = [0]
+        a, b = self._get_coefficients()
+        values = np.array(hashes, dtype=np.int64)[None, :]
+        return ((a * values + b) % _MERSENNE_PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [(i, signature[i * rows:(i + 1) * rows].tobytes()) for i in range(self.bands)]
+
+    def add_if_unique(self, text, buckets):
+        # buckets に追加済みの見出しと似ていなければ追加して True を返す
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        for key in keys:
+            for other in buckets.get(key, ()):
+                if np.mean(signature == other) >= self.threshold:
+                    return False
+        for key in keys:
+            buckets.setdefault(key, []).append(signature)
+        return True
+
+
+def published_timestamp(article):
+    # NewsAPIの publishedAt はUTC（末尾の Z）。時差の書かれていない値もUTCとして扱い、
+    # サーバーのタイムゾーンによって並び順が変わらないようにする
+    try:
+        published = datetime.fromisoformat((article.get('publishedAt') or '').replace('Z', '+00:00'))
+    except ValueError:
+        return 0.0
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published.timestamp()
+
+
+def merge_top_k(article_lists, k, score, deduper=None):
+    """複数の取得結果をURLで重複を除いてまとめ、score の高い順に最大 k 件を返す
+
+    ヒープから高い順に取り出し、deduper が似た見出しと判定した記事は読み飛ばす。
+    """
+    seen_urls = set()
+    heap = []
+    for articles in article_lists:
+        for article in articles:
+            url = article.get('url')
+            if not url or url in seen_urls:
+                continue
+            seen_urls.add(url)
+            heap.append((-score(article), len(heap), article))
+    heapq.heapify(heap)
+    buckets = {}
+    selected = []
+    collapsed = 0
+    while heap and len(selected) < k:
+        _, _, article = heapq.heappop(heap)
+        if deduper is not None and not deduper.add_if_unique(article.get('title') or '', buckets):
+            collapsed += 1
+            continue
+        selected.append(article)
+    return selected, collapsed
+
+
+class NewsFanout:
+    """複数の媒体・ページへの問い合わせを並行して行う
+
+    所要時間は問い合わせの合計ではなく、最も遅い1件で決まる。
+    一部が失敗しても、成功した分の結果で続ける（全件失敗した場合のみ例外を送出する）。
+    """
+
+    def __init__(self, workers):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='news-fetch')
+
+    def fetch_all(self, requests_params, fetch_one):
+        futures = [self._executor.submit(fetch_one, params) for params in requests_params]
+        results = []
+        errors = []
+        for params, future in zip(requests_params, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error("ニュースの取得に失敗しました（%s p%s）: %s", params.get('domains'), params.get('page', 1), e)
+                errors.append(e)
+        if not results and errors:
+            raise errors[0]
+        return results
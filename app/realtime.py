@@ -0,0 +1,96 @@
+"""Socket.IOによる表示端末へのプッシュ配信
+
+EventHub に発行されたイベント（録音開始・発話終了・認識結果・採用された記事・音声の準備完了など）を
+/pipeline 名前空間の端末ごとのルームへ送る。端末は接続時に auth の device で端末IDを指定する。
+
+run.py（werkzeug）では threading モードで動かす。eventletのワーカーで動かす場合は
+SOCKETIO_ASYNC_MODE=eventlet gunicorn -k eventlet -w 1 'app:create_app()' のように起動する
+（イベントは共有ストアを通して全ワーカーに届くが、Socket.IOの接続はポーリングでワーカーをまたげないため、
+ワーカーを増やす場合はスティッキーセッションにする）。
+"""
+import logging
+import threading
+
+from flask import request
+
+from config import Config
+
+try:
+    from flask_socketio import Namespace, SocketIO, join_room
+except ImportError:
+    print("Flask-SocketIO is not available. Push channel is disabled.")
+    Namespace = SocketIO = join_room = None
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = '/pipeline'
+
+socketio = SocketIO() if SocketIO is not None else None
+
+
+class DeviceListeners:
+    # 接続中のSocket.IOクライアント（sid）と端末IDの対応
+    def __init__(self):
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def add(self, sid, device_id):
+        with self._lock:
+            self._devices[sid] = device_id
+
+    def remove(self, sid):
+        with self._lock:
+            self._devices.pop(sid, None)
+
+    def has(self, device_id):
+        with self._lock:
+            return device_id in self._devices.values()
+
+    def count(self):
+        with self._lock:
+            return len(self._devices)
+
+
+listeners = DeviceListeners()
+
+
+if Namespace is not None:
+    class PipelineNamespace(Namespace):
+        def on_connect(self, auth=None):
+            device_id = ((auth or {}).get('device') or request.args.get('device') or 'default')[:64]
+            join_room(device_id)
+            listeners.add(request.sid, device_id)
+            logger.info("Socket.IOクライアントが接続しました（端末: %s, 接続数: %s）", device_id, listeners.count())
+
+        def on_disconnect(self, reason=None):
+            listeners.remove(request.sid)
+            logger.info("Socket.IOクライアントが切断しました（接続数: %s）", listeners.count())
+
+
+def has_listeners(device_id):
+    return socketio is not None and listeners.has(device_id)
+
+
+def bridge_events(event_hub):
+    # EventHubのイベントを、対象の端末のルーム（端末IDの無いイベントは全端末）へ送り続ける
+    subscription = event_hub.subscribe()
+    while True:
+        event = subscription.get(timeout=Config.SSE_HEARTBEAT_INTERVAL)
+        if event is None:
+            continue
+        data = dict(event.data or {}, id=event.id, timestamp=event.timestamp)
+        device_id = data.get('device_id')
+        if device_id:
+            socketio.emit(event.type, data, namespace=NAMESPACE, to=device_id)
+        else:
+            socketio.emit(event.type, data, namespace=NAMESPACE)
+
+
+def init_realtime(app, event_hub):
+    if socketio is None or not Config.SOCKETIO_ENABLED:
+        return
+    socketio.init_app(app, async_mode=Config.SOCKETIO_ASYNC_MODE, cors_allowed_origins='*')
+    socketio.on_namespace(PipelineNamespace(NAMESPACE))
+    socketio.start_background_task(bridge_events, event_hub)
+    app.extensions['realtime'] = socketio
+    logger.info("Socket.IOを有効にしました（%s）", socketio.async_mode)
@@ -0,0 +1,166 @@
+import json
+import logging
+import socket
+import threading
+
+import requests
+
+from app.lazy import LazyModule
+from app.upstream import UpstreamError, stt_client
+from config import Config
+
+sr = LazyModule('speech_recognition')
+
+logger = logging.getLogger(__name__)
+
+
+class RecognizerBackend:
+    """音声認識バックエンドの共通インターフェース
+
+    recognize(audio_data) は sr.AudioData を受け取って認識結果の文字列を返す。
+    認識できなかった場合は sr.UnknownValueError、サービスの障害時は sr.RequestError を送出する。
+    途中結果を返せるバックエンドは、認識の途中で on_partial(text) を呼ぶ。
+    """
+
+    name = None
+
+    def recognize(self, audio_data, on_partial=None):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(RecognizerBackend):
+    name = 'google'
+
+    def __init__(self, language):
+        self.language = language
+
+    def recognize(self, audio_data, on_partial=None):
+        def recognize_google(timeout):
+            recognizer = sr.Recognizer()
+            recognizer.operation_timeout = timeout
+            return recognizer.recognize_google(audio_data, language=self.language, show_all=False)
+        try:
+            # 応答待ちのタイムアウトは RequestError ではなく socket.timeout のまま送出される
+            return stt_client.call(recognize_google, failures=(sr.RequestError, socket.timeout))
+        except UpstreamError as e:
+            raise sr.RequestError(str(e))
+
+
+class OfflineRecognizer(RecognizerBackend):
+    """Voskによる端末内での音声認識（ネットワーク不要）"""
+
+    name = 'offline'
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from vosk import Model
+                except ImportError:
+                    raise sr.RequestError("voskがインストールされていません")
+                if not self.model_path:
+                    raise sr.RequestError("VOSK_MODEL_PATHが設定されていません")
+                logger.info("Voskモデルを読み込みます: %s", self.model_path)
+                self._model = Model(self.model_path)
+            return self._model
+
+    def recognize(self, audio_data, on_partial=None):
+        from vosk import KaldiRecognizer
+
+        pcm = audio_data.get_raw_data(convert_width=2)
+        recognizer = KaldiRecognizer(self._get_model(), audio_data.sample_rate)
+        if on_partial is None:
+            recognizer.AcceptWaveform(pcm)
+        else:
+            # 0.5秒ずつ渡し、その時点までの認識結果を途中経過として知らせる
+            chunk = audio_data.sample_rate  # 16bit・0.5秒分のバイト数
+            segments = []
+            last = ''
+            for offset in range(0, len(pcm), chunk):
+                if recognizer.AcceptWaveform(pcm[offset:offset + chunk]):
+                    segments.append(json.loads(recognizer.Result()).get('text', ''))
+                    partial = ''
+                else:
+                    partial = json.loads(recognizer.PartialResult()).get('partial', '')
+                current = ''.join(segments + [partial]).replace(' ', '')
+                if current and current != last:
+                    on_partial(current)
+                    last = current
+        # 日本語モデルは単語ごとに空白区切りで返すため連結する
+        text = json.loads(recognizer.FinalResult()).get('text', '').replace(' ', '')
+        if on_partial is not None:
+            text = ''.join(segments).replace(' ', '') + text
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class HttpRecognizer(RecognizerBackend):
+    """WAVをPOSTして {"text": ...} を受け取る汎用HTTPバックエンド（ローカルの代替サーバー用）"""
+
+    name = 'http'
+
+    def __init__(self, url, language):
+        self.url = url
+        self.language = language
+
+    def recognize(self, audio_data, on_partial=None):
+        try:
+            response = stt_client.post(
+                self.url,
+                params={'lang': self.language},
+                data=audio_data.get_wav_data(convert_width=2),
+                headers={'Content-Type': 'audio/wav'}
+            )
+            response.raise_for_status()
+            text = response.json().get('text', '')
+        except requests.RequestException as e:
+            raise sr.RequestError(str(e))
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class StubRecognizer(RecognizerBackend):
+    """常に決まった文字列を返すテスト・ベンチマーク用のバックエンド"""
+
+    name = 'stub'
+
+    def __init__(self, text):
+        self.text = text
+
+    def recognize(self, audio_data, on_partial=None):
+        if not self.text:
+            raise sr.UnknownValueError()
+        return self.text
+
+
+_recognizers = {}
+_recognizers_lock = threading.Lock()
+
+
+def create_recognizer(backend):
+    if backend == 'google':
+        return GoogleRecognizer(Config.RECOGNIZER_LANGUAGE)
+    if backend == 'offline':
+        return OfflineRecognizer(Config.VOSK_MODEL_PATH)
+    if backend == 'http':
+        return HttpRecognizer(Config.STT_HTTP_URL, Config.RECOGNIZER_LANGUAGE)
+    if backend == 'stub':
+        return StubRecognizer(Config.STUB_RECOGNIZER_TEXT)
+    raise ValueError(f"不明な音声認識バックエンドです: {backend}")
+
+
+def get_recognizer(backend=None):
+    # Configで選択されたバックエンドを返す（インスタンスは使い回す）
+    backend = backend or Config.RECOGNIZER_BACKEND
+    with _recognizers_lock:
+        recognizer = _recognizers.get(backend)
+        if recognizer is None:
+            recognizer = _recognizers[backend] = create_recognizer(backend)
+        return recognizer
@@ -1,67 +1,135 @@
-from flask import Blueprint, render_template, jsonify, request, Response, stream_with_context
+from flask import Blueprint, render_template, jsonify, request, Response, stream_with_context, url_for, current_app
 from datetime import datetime
 import pytz
-import speech_recognition as sr
 import tempfile
 import os
 import logging
+import itertools
 import subprocess
 import requests
 from config import Config
-from gtts import gTTS
-import io
-import base64
-from werkzeug.utils import secure_filename
-import nagisa
-import time
-import random
-import wave
-from pydub import AudioSegment
+from app.lazy import LazyModule, import_timings
+from app.warmup import Warmup
+from app.metrics import metrics
+from app.news_filter import news_filter, tokenizer_pool
+from app.tokenizer_pool import TokenizerBusy
+from app.news_cache import NewsCache, make_cache_key
+from app.article_store import ArticleStore, ArticleSync, normalize_query
+from app.news_sources import MinHashDeduper, NewsFanout, merge_top_k, published_timestamp
+from app.upstream import Deadline, newsapi_client, stt_client, tts_client
+from app.tts_cache import TTSSegmentCache, get_synthesizer
+from app.news_audio import NewsAudio
+from app.news_pipeline import NewsPipeline
+from app.event_hub import EventHub, format_sse
+from app.touch_channel import TouchListener
+from app import realtime
+from app.audio_capture import StreamingRecorder, EnergyVAD
+from app.recognizers import get_recognizer
+from app.audio_preprocess import audio_preprocessor
+from app.state_store import DeviceStateStore, process_running
+from app.wav_repair import WavRepairError, repair_wav, open_pcm
+from app.audio_transcode import (TranscodeError, UnsupportedAudioFormat, UploadTooLarge, transcode_bytes,
+                                 transcode_stream, raw_input_args)
 import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-Text_Data = ""
-is_recording = False
-audio_file = None
-arecord_process = None
+# 読み込みに時間のかかるモジュールは起動後に遅延インポートする
+sr = LazyModule('speech_recognition')
 
-# Raspberry Pi環境でのみRPi.GPIOをインポート
-try:
-    import RPi.GPIO as GPIO
-except ImportError:
-    print("RPi.GPIO is not available. Running in development mode.")
-    GPIO = None
+# このワーカーが所有している録音（端末IDごと）。端末の状態そのものは state_store で共有する
+local_recorders = {}
+local_processes = {}
+recording_lock = threading.Lock()
+recognition_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='recognition')
+# Socket.IOで接続中の端末へ、認識結果に続けてニュースを送り届ける
+news_push_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='news-push')
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('main', __name__)
 
-# タッチセンサーが接続されているGPIOピン
-TOUCH_PIN = 17
-
-# タッチセンサーの状態を保持するグローバル変数
-touch_detected = False
-
-if GPIO:
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(TOUCH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-
-def touch_callback(channel):
-    global touch_detected
-    touch_detected = True
-    logger.info("タッチセンサーが検出されました")
-
-if GPIO:
-    try:
-        GPIO.add_event_detect(TOUCH_PIN, GPIO.RISING, callback=touch_callback, bouncetime=300)
-        logger.info("GPIOの設定が正常に完了しました")
-    except RuntimeError as e:
-        logger.error(f"GPIOの設定中にエラーが発生しました: {str(e)}")
-        logger.error("GPIO設定の詳細: PIN=%s, EDGE=RISING, CALLBACK=touch_callback, BOUNCETIME=300", TOUCH_PIN)
+state_store = DeviceStateStore(Config.STATE_DB_PATH)
+
+# イベントは state_store のSQLiteを通して配信し、どのワーカーで発行されたイベントも全ワーカーの購読者に届ける
+event_hub = EventHub(history_size=Config.SSE_HISTORY_SIZE, queue_size=Config.SSE_QUEUE_SIZE,
+                     store=state_store, poll_interval=Config.EVENT_RELAY_INTERVAL)
+
+# 媒体・ページごとの並行取得（NewsAPIへの接続は newsapi_client のセッションで使い回す）
+news_fanout = NewsFanout(workers=Config.NEWS_FETCH_WORKERS)
+news_deduper = MinHashDeduper(threshold=Config.NEWS_DEDUPE_THRESHOLD)
+
+news_cache = NewsCache(
+    ttl=Config.NEWS_CACHE_TTL,
+    stale_ttl=Config.NEWS_CACHE_STALE_TTL,
+    max_entries=Config.NEWS_CACHE_MAX_ENTRIES
+)
+
+tts_cache = TTSSegmentCache(
+    cache_dir=Config.TTS_CACHE_DIR,
+    max_disk_bytes=Config.TTS_CACHE_MAX_DISK_BYTES,
+    max_memory_bytes=Config.TTS_CACHE_MAX_MEMORY_BYTES,
+    synthesize=metrics.timed('tts_synthesize', get_synthesizer())
+)
+
+news_audio = NewsAudio(
+    tts_cache,
+    workers=Config.TTS_WORKERS,
+    max_entries=Config.NEWS_AUDIO_MAX_ENTRIES,
+    store=state_store
+)
+
+article_store = ArticleStore(
+    Config.ARTICLE_STORE_PATH,
+    fresh_seconds=Config.ARTICLE_STORE_FRESH_SECONDS,
+    retention_days=Config.ARTICLE_STORE_RETENTION_DAYS,
+    max_articles=Config.ARTICLE_STORE_MAX_ARTICLES
+) if Config.ARTICLE_STORE_ENABLED else None
+
+metrics.add_gauges('news_cache', 'ニュース記事キャッシュの統計', news_cache.stats)
+metrics.add_gauges('tts_cache', '音声セグメントキャッシュの統計', tts_cache.stats)
+if tokenizer_pool is not None:
+    metrics.add_gauges('tokenizer', '形態素解析のワーカープールの統計', tokenizer_pool.stats)
+for client in (newsapi_client, tts_client, stt_client):
+    metrics.add_gauges(f'upstream_{client.name}', f'{client.name} の呼び出しの統計', client.stats)
+
+news_pipeline = NewsPipeline(
+    news_filter,
+    news_audio,
+    # 判定のまとまりの大きさと先読みの量は、解析を並行して行える数（スレッドまたはワーカープロセス）に合わせる
+    filter_workers=max(Config.NEWS_FILTER_WORKERS, Config.TOKENIZER_WORKERS),
+    limit=3  # 最大3件に制限
+)
+
+def on_touch_event(event):
+    # タッチ入力サービス（touch_sensor.py）から届いたタッチをブラウザへ中継する
+    metrics.observe('touch_delivery', time.monotonic() - event['mono'])
+    metrics.count('touch', event.get('source', 'gpio'))
+    # 同じタッチはすべてのワーカーに届くため、最初に追記したワーカーの1件だけを配信する
+    event_hub.publish('touch_detected', {'source': event.get('source', 'gpio'), 'seq': event['seq']},
+                      dedupe_key=f"touch:{event['seq']}:{event.get('ts')}")
+    logger.info("タッチセンサーが検出されました（seq=%s）", event['seq'])
+
+# GPIOはタッチ入力サービスが専有し、Webアプリはソケット経由でイベントを受け取る
+touch_listener = TouchListener(Config.TOUCH_SOCKET_PATH, on_touch_event) if Config.TOUCH_SOCKET_PATH else None
+if touch_listener is not None:
+    touch_listener.start()
+
+def observe_touch_latency():
+    # タッチを受けて開始された録音なら、タッチから録音開始までの時間を記録する
+    seq = request.headers.get('X-Touch-Seq')
+    if touch_listener is None or not seq or not seq.isdigit():
+        return
+    event = touch_listener.get(int(seq))
+    if event is not None:
+        latency = time.monotonic() - event['mono']
+        metrics.observe('touch_to_recording', latency)
+        logger.info("タッチから録音開始までの時間: %.1fms（seq=%s）", latency * 1000, seq)
 
 @bp.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', socketio_enabled='realtime' in current_app.extensions)
 
 @bp.route('/api/time')
 def get_time():
@@ -71,286 +139,679 @@ def get_time():
 
 @bp.route('/events')
 def sse():
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    subscription = event_hub.subscribe(last_event_id)
+
     def event_stream():
-        global touch_detected
-        while True:
-            if check_for_touch_event():
-                logger.info("タッチイベントを検出しました。SSEイベントを送信します。")
-                yield f"data: touch_detected\n\n"
-                touch_detected = False  # イベントを送信したらフラグをリセット
-            time.sleep(0.1)  # 100ミリ秒ごとにチェック
+        try:
+            yield f"retry: {Config.SSE_RETRY_MS}\n\n"
+            while True:
+                # イベントが届くまでブロックし、一定時間届かなければハートビートを送る
+                event = subscription.get(timeout=Config.SSE_HEARTBEAT_INTERVAL)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            subscription.close()
+            logger.info("SSE接続が終了しました")
 
     logger.info("SSE接続が確立されました")
-    return Response(stream_with_context(event_stream()), content_type='text/event-stream')
+    response = Response(stream_with_context(event_stream()), content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-def check_for_touch_event():
-    global touch_detected
-    if GPIO:
-        return touch_detected
-    else:
-        # 開発環境では、ランダムにタッチイベントをシミュレート
-        return random.random() < 0.01  # 1%の確率でTrueを返す
+def get_device_id():
+    # 端末（キオスク）の識別子。ヘッダーまたはクエリで指定し、無ければ既定の端末とみなす
+    device_id = request.headers.get('X-Device-Id') or request.args.get('device') or 'default'
+    return device_id[:64]
 
 @bp.route('/api/touch-detected', methods=['POST'])
 def touch_detected_api():
-    global touch_detected, is_recording
-    touch_detected = True
-    is_recording = not is_recording
+    device_id = get_device_id()
+    is_recording = not state_store.get(device_id)['is_recording']
     status = "開始" if is_recording else "停止"
-    logger.info(f"タッチセンサーが検出されました (API経由) - 録音{status}")
+    event_hub.publish('touch_detected', {'source': 'api', 'device_id': device_id, 'is_recording': is_recording})
+    logger.info("タッチセンサーが検出されました (API経由) - 録音%s", status)
     return jsonify({'message': f'タッチ検出確認 - 録音{status}', 'is_recording': is_recording}), 200
 
+@bp.route('/api/devices', methods=['GET'])
+def list_devices():
+    return jsonify({'devices': state_store.list_devices()})
+
 @bp.route('/api/start-voice-input', methods=['POST'])
 def start_voice_input():
-    global is_recording, audio_file, arecord_process
-    logger.info("音声認識処理を開始")
+    device_id = get_device_id()
+    logger.info("音声認識処理を開始（端末: %s）", device_id)
+    reap_local_processes()
 
-    try:
-        # 一時ファイルの作成
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
-            audio_file = temp_audio.name
-            logger.info(f"一時音声ファイルを作成: {audio_file}")
-
-        sample_rate = 44100
-        channels = 1
-
-        command = [
-            'arecord',
-            '-f', 'S16_LE',
-            '-c', str(channels),
-            '-r', str(sample_rate),
-            audio_file
-        ]
-        
-        logger.info("音声録音を開始します")
-        arecord_process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        is_recording = True
-
-        return jsonify({'message': '音声録音を開始しました', 'success': True})
+    if Config.CAPTURE_MODE == 'stream':
+        return start_streaming_capture(device_id)
 
-    except Exception as e:
-        logger.error(f"音声録音エラー: {str(e)}")
-        return jsonify({'error': str(e), 'success': False}), 500
+    with recording_lock:
+        recording_id = begin_local_recording(device_id, 'file')
+        if recording_id is None:
+            logger.error("既に録音中です")
+            return jsonify({'error': '既に録音中です', 'success': False}), 409
+
+        try:
+            # 一時ファイルの作成
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
+                audio_file = temp_audio.name
+                logger.info("一時音声ファイルを作成: %s", audio_file)
+
+            sample_rate = 44100
+            channels = 1
+
+            command = [
+                Config.ARECORD_PATH,
+                '-f', 'S16_LE',
+                '-c', str(channels),
+                '-r', str(sample_rate),
+                audio_file
+            ]
+
+            logger.info("音声録音を開始します")
+            arecord_process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            local_processes[arecord_process.pid] = arecord_process
+            # 停止要求が別のワーカーに届いても止められるよう、PIDとファイルを共有ストアに記録する
+            state_store.update_recording(device_id, recording_id, arecord_pid=arecord_process.pid,
+                                         audio_file=audio_file)
+        except Exception as e:
+            logger.error(f"音声録音エラー: {str(e)}")
+            state_store.abort_recording(device_id, recording_id, str(e))
+            return jsonify({'error': str(e), 'success': False}), 500
+
+    observe_touch_latency()
+    event_hub.publish('recording_started', {'device_id': device_id})
+    return jsonify({'message': '音声録音を開始しました', 'success': True})
+
+def begin_local_recording(device_id, capture_mode):
+    # 停止されないまま残った録音（画面の再読み込み・停止要求の取りこぼし・arecordの終了）は引き継ぐ。
+    # recording_lock を持った状態で呼び、録音器を登録し終えるまで同じワーカーの開始要求を待たせる
+    return state_store.begin_recording(
+        device_id, capture_mode, os.getpid(),
+        max_age=Config.RECORD_MAX_SECONDS + Config.RECORDING_STALE_MARGIN,
+        local_active=has_local_recording
+    )
+
+def has_local_recording(row):
+    # このワーカーが持つ録音のarecordが動いているか
+    if row['capture_mode'] == 'stream':
+        recorder = local_recorders.get(row['device_id'])
+        return recorder is not None and recorder.process is not None and recorder.process.poll() is None
+    process = local_processes.get(row['arecord_pid'])
+    return process is not None and process.poll() is None
+
+def reap_local_processes():
+    # 他のワーカーが停止させたarecordプロセスを回収する
+    for pid, process in list(local_processes.items()):
+        if process.poll() is not None:
+            local_processes.pop(pid, None)
+
+def terminate_arecord(pid):
+    process = local_processes.pop(pid, None)
+    if process is not None:
+        os.kill(pid, signal.SIGTERM)
+        process.wait()
+        return
+    # 別のワーカーが起動したプロセスは終了をPIDで確認する
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    deadline = time.monotonic() + 5
+    while process_running(pid) and time.monotonic() < deadline:
+        time.sleep(0.02)
 
 @bp.route('/api/stop-voice-input', methods=['POST'])
 def stop_voice_input():
-    global is_recording, audio_file, Text_Data, arecord_process
-    logger.info("音声録音を停止します")
+    device_id = get_device_id()
+    logger.info("音声録音を停止します（端末: %s）", device_id)
+
+    # 停止権を得られるのは1つのリクエスト（ワーカー）だけ
+    recording = state_store.end_recording(device_id)
+    if recording is None:
+        logger.error("録音が開始されていません")
+        return jsonify({'error': '録音が開始されていません', 'success': False}), 400
+
+    if recording['capture_mode'] == 'stream':
+        return stop_streaming_capture(device_id, recording)
 
+    recording_id = recording['recording_id']
+    audio_file = recording['audio_file']
     try:
-        is_recording = False
         # arecordプロセスを終了
-        if arecord_process:
-            logger.info(f"arecordプロセス（PID: {arecord_process.pid}）を終了します")
-            os.kill(arecord_process.pid, signal.SIGTERM)
-            arecord_process.wait()
-            arecord_process = None
+        if recording['arecord_pid']:
+            logger.info("arecordプロセス（PID: %s）を終了します", recording['arecord_pid'])
+            terminate_arecord(recording['arecord_pid'])
+            if recording['updated_at']:
+                metrics.observe('arecord', time.time() - recording['updated_at'])
 
         logger.info("音声録音が完了しました")
 
-        # WAVファイルのヘッダーを確認
+        # 停止時に正しく書き込まれなかったWAVヘッダーのサイズを、ファイルの実際の長さに合わせて修復する
         try:
-            with wave.open(audio_file, 'rb') as wav_file:
-                logger.info(f"WAVファイル情報: チャンネル数={wav_file.getnchannels()}, サンプル幅={wav_file.getsampwidth()}, フレームレート={wav_file.getframerate()}, フレーム数={wav_file.getnframes()}")
-        except wave.Error as e:
-            logger.error(f"WAVファイルの読み込みエラー: {str(e)}")
-            # WAVファイルが破損している場合、pydubを使用して修復を試みる
-            try:
-                audio = AudioSegment.from_file(audio_file, format="raw", frame_rate=44100, channels=1, sample_width=2)
-                audio.export(audio_file, format="wav")
-                logger.info("WAVファイルを修復しました")
-            except Exception as e:
-                logger.error(f"WAVファイルの修復に失敗しました: {str(e)}")
-                return jsonify({'error': 'WAVファイルの修復に失敗しました', 'details': str(e)}), 500
-
-        # 音声認識の実行
-        recognizer = sr.Recognizer()
-        try:
-            with sr.AudioFile(audio_file) as source:
-                logger.info("音声データを読み込み中...")
-                recognizer.dynamic_energy_threshold = True
-                recognizer.energy_threshold = 300  # 感度を調整（デフォルトは300）
-                audio_data = recognizer.record(source)
-                logger.info("音声認識を実行中...")
-                
-                text = recognizer.recognize_google(audio_data, language='ja-JP', show_all=False)
-                # 認識したテキストをグローバル変数に保存
-                Text_Data = text
-                logger.info(f"認識結果を保存: {Text_Data}")
-
-                return jsonify({'text': text, 'success': True})
-        except sr.UnknownValueError:
-            logger.error("音声を認識できませんでした")
-            return jsonify({'error': '音声を認識できませんでした', 'success': False}), 400
-        except sr.RequestError as e:
-            logger.error(f"音声認識サービスエラー: {str(e)}")
-            return jsonify({'error': '音声認識サービスに接続できませんでした', 'success': False}), 500
-
+            with metrics.stage('wav_repair'):
+                info = repair_wav(audio_file)
+        except (WavRepairError, OSError, ValueError) as e:
+            logger.error(f"WAVファイルの修復に失敗しました: {str(e)}")
+            state_store.set_result(device_id, recording_id, error=str(e))
+            return jsonify({'error': 'WAVファイルの修復に失敗しました', 'details': str(e)}), 500
+        logger.debug("WAVファイル情報: チャンネル数=%s, サンプル幅=%s, フレームレート=%s, データサイズ=%s",
+                     info.channels, info.sample_width, info.sample_rate, info.data_size)
+        if info.repaired:
+            logger.info("WAVファイルのヘッダーを修復しました")
+
+        # 音声認識の実行（PCMはコピーせずにファイルのマップを参照する）
+        with open_pcm(audio_file) as (info, pcm):
+            logger.info("音声データを読み込み中...")
+            text = recognize_recording(device_id, recording_id, sr.AudioData(pcm, info.sample_rate, info.sample_width))
+        return jsonify({'text': text, 'success': True})
+
+    except sr.UnknownValueError:
+        logger.error("音声を認識できませんでした")
+        return jsonify({'error': '音声を認識できませんでした', 'success': False}), 400
+    except sr.RequestError as e:
+        logger.error(f"音声認識サービスエラー: {str(e)}")
+        return jsonify({'error': '音声認識サービスに接続できませんでした', 'success': False}), 500
     except Exception as e:
         logger.error(f"音声認識エラー: {str(e)}")
+        state_store.set_result(device_id, recording_id, error=str(e))
         return jsonify({'error': str(e), 'success': False}), 500
     finally:
         # 一時ファイルの削除
-        if os.path.exists(audio_file):
+        if audio_file and os.path.exists(audio_file):
             os.remove(audio_file)
-            logger.info(f"一時音声ファイルを削除: {audio_file}")
+            logger.info("一時音声ファイルを削除: %s", audio_file)
+
+def start_streaming_capture(device_id):
+    sample_rate = Config.RECORD_SAMPLE_RATE
+    command = [
+        Config.ARECORD_PATH,
+        '-q',
+        '-t', 'raw',
+        '-f', 'S16_LE',
+        '-c', '1',
+        '-r', str(sample_rate)
+    ]
+
+    with recording_lock:
+        recording_id = begin_local_recording(device_id, 'stream')
+        if recording_id is None:
+            logger.error("既に録音中です")
+            return jsonify({'error': '既に録音中です', 'success': False}), 409
+
+        vad = EnergyVAD(
+            sample_rate,
+            silence_ms=Config.VAD_SILENCE_MS,
+            min_threshold=Config.VAD_MIN_THRESHOLD
+        ) if Config.VAD_ENABLED else None
+        recorder = StreamingRecorder(
+            command,
+            sample_rate=sample_rate,
+            buffer_seconds=Config.RECORD_BUFFER_SECONDS,
+            max_seconds=Config.RECORD_MAX_SECONDS,
+            vad=vad,
+            on_endpoint=lambda r: on_utterance_endpointed(device_id, recording_id, r),
+            on_abort=lambda r: on_recording_aborted(device_id, recording_id, r),
+            should_stop=lambda: state_store.stop_requested(device_id, recording_id)
+        )
+        try:
+            recorder.start()
+        except Exception as e:
+            logger.error(f"音声録音エラー: {str(e)}")
+            state_store.abort_recording(device_id, recording_id, str(e))
+            return jsonify({'error': str(e), 'success': False}), 500
+        local_recorders[device_id] = recorder
+        # arecordが終了していれば、他のワーカーからも録音中のまま残った状態だと判断できるようにする
+        state_store.update_recording(device_id, recording_id, arecord_pid=recorder.process.pid)
+
+    observe_touch_latency()
+    event_hub.publish('recording_started', {'device_id': device_id})
+    return jsonify({'message': '音声録音を開始しました', 'success': True})
+
+def on_recording_aborted(device_id, recording_id, recorder):
+    # 発話の終了を検出する前にarecordが終了した場合は、録音中の状態を解除して次の録音を受け付ける
+    with recording_lock:
+        if local_recorders.get(device_id) is recorder:
+            local_recorders.pop(device_id, None)
+    state_store.abort_recording(device_id, recording_id, 'arecordが終了しました')
+
+def on_utterance_endpointed(device_id, recording_id, recorder):
+    # VADが発話の終了を検出した時点（または別ワーカーからの停止要求時）に、音声認識を始める
+    stop_requested = recorder.stop_reason == 'stop_requested'
+    with recording_lock:
+        if local_recorders.get(device_id) is not recorder:
+            return
+        audio_data = sr.AudioData(recorder.pcm(), recorder.sample_rate, 2)
+        metrics.observe('arecord', time.monotonic() - recorder.started_at)
+        recorder.recognition = recognition_executor.submit(recognize_recording, device_id, recording_id, audio_data)
+        if stop_requested:
+            local_recorders.pop(device_id, None)
+    logger.info("音声認識を開始します（録音時間: %.2f秒）", recorder.duration())
+    if not stop_requested:
+        event_hub.publish('utterance_endpointed', {'device_id': device_id, 'duration': recorder.duration()})
+
+def stop_streaming_capture(device_id, recording):
+    recording_id = recording['recording_id']
+    recorder = None
+    if recording['owner_pid'] == os.getpid():
+        with recording_lock:
+            recorder = local_recorders.pop(device_id, None)
+            recognition = recorder.recognition if recorder is not None else None
+
+    try:
+        if recorder is None:
+            # 録音は別のワーカーが持っているので、そのワーカーが認識結果を書き込むのを待つ
+            return recognition_result_response(
+                state_store.wait_for_result(device_id, recording_id, Config.RECOGNITION_WAIT_TIMEOUT)
+            )
+        if recognition is None:
+            pcm = recorder.stop()
+            metrics.observe('arecord', time.monotonic() - recorder.started_at)
+            logger.info("音声録音が完了しました（録音時間: %.2f秒）", recorder.duration())
+            text = recognize_recording(device_id, recording_id, sr.AudioData(pcm, recorder.sample_rate, 2))
+        else:
+            text = recognition.result()
+        return jsonify({'text': text, 'success': True})
+    except sr.UnknownValueError:
+        logger.error("音声を認識できませんでした")
+        return jsonify({'error': '音声を認識できませんでした', 'success': False}), 400
+    except sr.RequestError as e:
+        logger.error(f"音声認識サービスエラー: {str(e)}")
+        return jsonify({'error': '音声認識サービスに接続できませんでした', 'success': False}), 500
+    except Exception as e:
+        logger.error(f"音声認識エラー: {str(e)}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+def recognition_result_response(state):
+    if state is None:
+        logger.error("音声認識の完了待ちがタイムアウトしました")
+        return jsonify({'error': '音声認識がタイムアウトしました', 'success': False}), 504
+    if state['pipeline_status'] == 'recognized':
+        return jsonify({'text': state['last_text'], 'success': True})
+    if state['result_error'] == 'unknown_value':
+        return jsonify({'error': '音声を認識できませんでした', 'success': False}), 400
+    if state['result_error'] == 'request_error':
+        return jsonify({'error': '音声認識サービスに接続できませんでした', 'success': False}), 500
+    return jsonify({'error': state['result_error'], 'success': False}), 500
+
+def recognize_recording(device_id, recording_id, audio_data):
+    # 認識結果（または失敗）を共有ストアに書き込み、どのワーカーからも参照できるようにする
+    try:
+        if not audio_data.frame_data:
+            raise sr.UnknownValueError()
+        logger.info("音声認識を実行中...")
+        text = recognize_audio(audio_data, on_partial=partial_publisher(device_id))
+    except sr.UnknownValueError:
+        state_store.set_result(device_id, recording_id, error='unknown_value')
+        raise
+    except sr.RequestError:
+        state_store.set_result(device_id, recording_id, error='request_error')
+        raise
+    except Exception as e:
+        state_store.set_result(device_id, recording_id, error=str(e))
+        raise
+    state_store.set_result(device_id, recording_id, text=text)
+    logger.info("認識結果を保存: %s", text)
+    event_hub.publish('recognition_result', {'device_id': device_id, 'text': text})
+    schedule_news_push(device_id, text)
+    return text
+
+def partial_publisher(device_id):
+    # 認識の途中結果を表示端末へ知らせる（途中結果を返せるバックエンドのみ呼ばれる）
+    return lambda text: event_hub.publish('transcript_partial', {'device_id': device_id, 'text': text})
+
+def recognize_audio(audio_data, on_partial=None):
+    # 前処理した音声を認識し、所要時間と結果（成功・聞き取れず・サービスエラー）を集計する
+    result = 'error'
+    try:
+        # 前後の無音を除いて16kHzに変換し、送信・認識するデータを減らす
+        with metrics.stage('preprocess'):
+            audio_data = audio_preprocessor.process(audio_data)
+        if not audio_data.frame_data:
+            raise sr.UnknownValueError()
+        with metrics.stage('recognize'):
+            text = get_recognizer().recognize(audio_data, on_partial=on_partial)
+        result = 'ok'
+        return text
+    except sr.UnknownValueError:
+        result = 'unknown_value'
+        raise
+    except sr.RequestError:
+        result = 'request_error'
+        raise
+    finally:
+        metrics.count('recognition', result)
 
 @bp.route('/api/speech-to-text', methods=['POST'])
 def speech_to_text():
-    global Text_Data
+    device_id = get_device_id()
     logger.info("音声認識処理を開始")
 
-    if 'audio' not in request.files:
-        logger.error("音声ファイルが見つかりません")
-        return jsonify({'error': '音声ファイルが見つかりません'}), 400
-
-    audio_file = request.files['audio']
-    if not audio_file.filename:
-        logger.error("ファイル名が空です")
-        return jsonify({'error': '無効な音声ファイルです'}), 400
-
-    filename = secure_filename(audio_file.filename)
-    file_path = os.path.join(tempfile.gettempdir(), filename)
-    audio_file.save(file_path)
+    try:
+        if 'audio' in request.files:
+            audio_file = request.files['audio']
+            if not audio_file.filename:
+                logger.error("ファイル名が空です")
+                return jsonify({'error': '無効な音声ファイルです'}), 400
+            # アップロードされた音声をメモリ上でそのままffmpegに渡して変換する
+            data = audio_file.read(Config.SPEECH_UPLOAD_MAX_BYTES + 1)
+            if len(data) > Config.SPEECH_UPLOAD_MAX_BYTES:
+                raise UploadTooLarge(f"音声データが上限（{Config.SPEECH_UPLOAD_MAX_BYTES}バイト）を超えました")
+            with metrics.stage('ffmpeg'):
+                audio_data = transcode_bytes(data)
+        elif request.mimetype.startswith('audio/'):
+            # チャンク転送で送られてくる音声を、受信しながら変換する
+            input_args = raw_input_args(request.mimetype_params) if request.mimetype == 'audio/l16' else None
+            with metrics.stage('ffmpeg'):
+                audio_data = transcode_stream(iter(lambda: request.stream.read(8192), b''), input_args,
+                                              max_bytes=Config.SPEECH_UPLOAD_MAX_BYTES)
+        else:
+            logger.error("音声ファイルが見つかりません")
+            return jsonify({'error': '音声ファイルが見つかりません'}), 400
+    except UploadTooLarge as e:
+        logger.error("音声データが大きすぎます: %s", e)
+        return jsonify({'error': '音声データが大きすぎます'}), 413
+    except UnsupportedAudioFormat as e:
+        logger.error("対応していない音声形式です: %s", e)
+        return jsonify({'error': '対応していない音声形式です'}), 415
+    except TranscodeError as e:
+        logger.error(f"FFmpeg変換エラー: {str(e)}")
+        return jsonify({'error': 'FFmpeg変換エラー', 'details': str(e)}), 500
+    except Exception as e:
+        logger.error(f"予期せぬエラー: {str(e)}")
+        return jsonify({'error': f'予期せぬエラーが発生しました: {str(e)}'}), 500
 
+    # 音声認識の実行
     try:
-        # WebMファイルをWAVに変換
-        wav_path = os.path.join(tempfile.gettempdir(), "converted.wav")
-        command = [
-            'ffmpeg',
-            '-i', file_path,
-            '-acodec', 'pcm_s16le',
-            '-ar', '16000',
-            '-ac', '1',
-            wav_path
-        ]
-        
-        result = subprocess.run(command, capture_output=True, text=True)
-        if result.returncode != 0:
-            logger.error(f"FFmpeg変換エラー: {result.stderr}")
-            return jsonify({'error': 'FFmpeg変換エラー', 'details': result.stderr}), 500
-
-        # 変換されたファイルの存在確認
-        if not os.path.exists(wav_path):
-            logger.error(f"変換後のWAVファイルが見つかりません: {wav_path}")
-            return jsonify({'error': '音声ファイルの変換に失敗しました'}), 500
-
-        # 音声認識の実行
-        recognizer = sr.Recognizer()
-        try:
-            with sr.AudioFile(wav_path) as source:
-                logger.info("音声データを読み込み中...")
-                recognizer.dynamic_energy_threshold = True
-                recognizer.energy_threshold = 300  # 感度を調整（デフォルトは300）
-                audio_data = recognizer.record(source)
-                logger.info("音声認識を実行中...")
-                
-                text = recognizer.recognize_google(audio_data, language='ja-JP', show_all=False)
-                # 認識したテキストをグローバル変数に保存
-                Text_Data = text
-                logger.info(f"認識結果を保存: {Text_Data}")
-                
-                return jsonify({
-                    'text': text,
-                    'stored': True  # テキストが保存されたことを示すフラグ
-                })
-        except sr.UnknownValueError as e:
-            logger.error(f"音声認識エラー: {str(e)}")
-            return jsonify({'error': '音声を認識できませんでした'}), 400
-        except sr.RequestError as e:
-            logger.error(f"音声認識サービスエラー: {str(e)}")
-            return jsonify({'error': '音声認識サービスに接続できませんでした'}), 500
-        except Exception as e:
-            logger.error(f"予期せぬエラー: {str(e)}")
-            return jsonify({'error': f'予期せぬエラーが発生しました: {str(e)}'}), 500
+        logger.info("音声認識を実行中...")
+        text = recognize_audio(audio_data, on_partial=partial_publisher(device_id))
+        # 認識したテキストを端末の状態として保存
+        state_store.set_last_text(device_id, text)
+        logger.info("認識結果を保存: %s", text)
+        event_hub.publish('recognition_result', {'device_id': device_id, 'text': text})
+        schedule_news_push(device_id, text)
+
+        return jsonify({
+            'text': text,
+            'stored': True  # テキストが保存されたことを示すフラグ
+        })
+    except sr.UnknownValueError as e:
+        logger.error(f"音声認識エラー: {str(e)}")
+        return jsonify({'error': '音声を認識できませんでした'}), 400
+    except sr.RequestError as e:
+        logger.error(f"音声認識サービスエラー: {str(e)}")
+        return jsonify({'error': '音声認識サービスに接続できませんでした'}), 500
     except Exception as e:
         logger.error(f"予期せぬエラー: {str(e)}")
         return jsonify({'error': f'予期せぬエラーが発生しました: {str(e)}'}), 500
-    finally:
-        # 一時ファイルの削除
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            if os.path.exists(wav_path):
-                os.remove(wav_path)
-        except Exception as e:
-            logger.error(f"一時ファイルの削除中にエラー: {str(e)}")
 
 @bp.route('/api/get-text', methods=['GET'])
 def get_text():
-    global Text_Data
-    return jsonify({'text': Text_Data})
-
-def filter_positive_news(title, description):
-    # タイトルと概要を結合してテキストを作成
-    text = title + ' ' + description
-    
-    # nagisaを使用してテキストを形態素解析
-    words = nagisa.tagging(text)
-    
-    # ネガティブワードが含まれているかチェック
-    for word in words.words:
-        if word in Config.NEGATIVE_WORDS:
-            return False
-    
-    # ネガティブワードが含まれていなければTrue
-    return True
+    return jsonify({'text': state_store.get(get_device_id())['last_text']})
 
 @bp.route('/api/get-news', methods=['GET'])
 def get_news():
-    global Text_Data
-    logger.info(f"ニュース取得開始: 検索ワード '{Text_Data}'")
+    query = state_store.get(get_device_id())['last_text']
+    logger.info("ニュース取得開始: 検索ワード '%s'", query)
 
     api_key = Config.NEWS_API_KEY
     if not api_key:
         logger.error("NewsAPI keyが設定されていません")
         return jsonify({'error': 'NewsAPI keyが設定されていません'}), 500
 
-    url = 'https://newsapi.org/v2/everything'
-    
-    params = {
-        'q': Text_Data or '日本',  # 検索ワードが空の場合は'日本'をデフォルトとする
-        'sortBy': 'publishedAt',  # 公開日時で並び替え
-        'apiKey': api_key,
-        'domains': 'asahi.com',  # 朝日新聞のドメインを指定
-        'pageSize': 20  # 20件を取得（フィルタリング前）
-    }
+    params = build_news_params(query or DEFAULT_QUERY)  # 検索ワードが空の場合は'日本'をデフォルトとする
 
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        news_data = response.json()
-
-        if news_data['status'] == 'ok':
-            articles = news_data['articles']
-            filtered_articles = filter_asahi_articles(articles)
-            positive_articles = [
-                article for article in filtered_articles
-                if filter_positive_news(article['title'], article['description'])
-            ]
-            formatted_articles = format_articles(positive_articles[:3])  # 最大3件に制限
-            
-            logger.info(f"{len(formatted_articles)}件のポジティブな朝日新聞記事を取得しました")
-
-            # 音声データの生成
-            titles = [article['title'] for article in formatted_articles]
-            audio_data = generate_audio(titles)
-
-            return jsonify({
-                'articles': formatted_articles,
-                'audio': audio_data
-            })
-        else:
-            logger.error(f"NewsAPI エラー: {news_data['message']}")
-            return jsonify({'error': 'ニュースの取得に失敗しました'}), 500
-
+        positive_articles, report = run_news_pipeline(params, deadline=Deadline(Config.NEWS_DEADLINE_SECONDS))
+        formatted_articles = format_articles(positive_articles)
+
+        logger.info("%s件のポジティブな朝日新聞記事を取得しました", len(formatted_articles))
+
+        # 音声は /api/news-audio/<id> で別途配信する（合成はバックグラウンドで開始）
+        titles = [article['title'] for article in formatted_articles]
+        segments = playable_segments(titles)
+        audio_id = news_audio.register(segments) if segments else None
+
+        return jsonify({
+            'articles': formatted_articles,
+            'audio_url': url_for('main.get_news_audio', audio_id=audio_id) if audio_id else None,
+            'pipeline': {
+                'candidates': report['candidates'],
+                'examined': report['examined'],
+                'degraded': report['degraded'],
+                'timings_ms': {
+                    name: round(value * 1000, 1) for name, value in report['timings'].items() if value is not None
+                }
+            }
+        })
+
+    except NewsAPIError as e:
+        logger.error(f"NewsAPI エラー: {str(e)}")
+        return jsonify({'error': 'ニュースの取得に失敗しました'}), 500
     except requests.RequestException as e:
         logger.error(f"NewsAPI リクエストエラー: {str(e)}")
         return jsonify({'error': 'ニュースの取得中にエラーが発生しました'}), 500
+    except TokenizerBusy as e:
+        logger.error("記事の判定待ちがあふれました: %s", e)
+        return jsonify({'error': '混み合っています。しばらくしてから再度お試しください'}), 503
+
+@bp.route('/api/news-audio/<audio_id>', methods=['GET'])
+def get_news_audio(audio_id):
+    segments = news_audio.segments(audio_id)
+    if segments is None:
+        logger.error("音声IDが見つかりません: %s", audio_id)
+        return jsonify({'error': '音声が見つかりません'}), 404
+
+    # Range/条件付きリクエスト、または全セグメント合成済みの場合は一括で返す
+    if request.range or request.if_none_match or news_audio.is_cached(segments):
+        skipped = []
+        try:
+            audio_bytes = news_audio.render(segments, skipped)
+        except Exception as e:
+            logger.error("音声合成エラー: %s", e)
+            return audio_unavailable()
+        response = Response(audio_bytes, mimetype='audio/mpeg')
+        if skipped:
+            # 一部のセグメントを飛ばした音声は音声IDの内容と一致しないため、ETagを付けずキャッシュもさせない
+            logger.warning("音声 %s は %s 件のセグメントを飛ばして返します", audio_id, len(skipped))
+            response.cache_control.no_store = True
+        else:
+            response.set_etag(audio_id)
+            response.cache_control.public = True
+            response.cache_control.max_age = 3600
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(audio_bytes))
+
+    # 先頭のセグメントが合成でき次第、チャンク転送で送り始める。
+    # 先頭が届くまでは応答を返さず、すべてのセグメントが失敗した場合は 503 にする
+    chunks = news_audio.stream(segments)
+    try:
+        first_chunk = next(chunks)
+    except Exception:
+        return audio_unavailable()
+    response = Response(stream_with_context(itertools.chain([first_chunk], chunks)), mimetype='audio/mpeg')
+    # 送り始めた後に飛ばすセグメントがあるかは分からないため、ストリーミングした音声はキャッシュさせない
+    # （次回は合成済みとして一括の応答になり、そこでETagを付ける）
+    response.cache_control.no_store = True
+    return response
+
+def audio_unavailable():
+    response = jsonify({'error': '音声の生成に失敗しました'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+def schedule_news_push(device_id, query):
+    # Socket.IOで接続中の端末には、/api/get-news を待たずにニュースを送り始める
+    if realtime.has_listeners(device_id) and Config.NEWS_API_KEY:
+        news_push_executor.submit(push_news, device_id, query or DEFAULT_QUERY)
+
+def push_news(device_id, query):
+    # 採用が決まった記事から順に送り、記事がそろったら news_ready、読み上げ音声の合成が済んだら audio_ready を送る
+    event_hub.publish('news_started', {'device_id': device_id, 'query': query})
+
+    def on_accept(index, article):
+        event_hub.publish('article_accepted', {'device_id': device_id, 'index': index,
+                                               'article': format_articles([article])[0]})
 
-def filter_asahi_articles(articles):
-    # 朝日新聞の記事のみをフィルタリング
-    return [article for article in articles if 'asahi.com' in article.get('url', '')]
+    try:
+        positive_articles, report = run_news_pipeline(build_news_params(query), on_accept=on_accept,
+                                                      deadline=Deadline(Config.NEWS_DEADLINE_SECONDS))
+        formatted_articles = format_articles(positive_articles)
+        segments = playable_segments([article['title'] for article in formatted_articles])
+        audio_url = news_audio_url(news_audio.register(segments)) if segments else None
+        event_hub.publish('news_ready', {
+            'device_id': device_id,
+            'articles': formatted_articles,
+            'audio_url': audio_url,
+            'degraded': report['degraded'],
+            'timings_ms': {
+                name: round(value * 1000, 1) for name, value in report['timings'].items() if value is not None
+            }
+        })
+        if audio_url is not None:
+            news_audio.wait(segments)
+            event_hub.publish('audio_ready', {'device_id': device_id, 'audio_url': audio_url})
+    except Exception as e:
+        logger.error("ニュースの送信中にエラーが発生しました: %s", e)
+        event_hub.publish('news_error', {'device_id': device_id, 'error': 'ニュースの取得に失敗しました'})
+
+def news_audio_url(audio_id):
+    # リクエストの外（ニュースの送信スレッド）からも使うため url_for を使わずに組み立てる
+    return f'/api/news-audio/{audio_id}'
+
+def build_news_params(query):
+    return {
+        'q': query,
+        'sortBy': 'publishedAt',  # 公開日時で並び替え
+        'apiKey': Config.NEWS_API_KEY,
+        'domains': ','.join(Config.NEWS_SOURCES),  # 取得する媒体のドメイン（媒体ごとに並行して問い合わせる）
+        'pageSize': Config.NEWS_PAGE_SIZE  # 1回の問い合わせで取得する件数（フィルタリング前）
+    }
+
+def run_news_pipeline(params, on_accept=None, deadline=None):
+    # 取得・判定・音声合成を重ねて実行し、ポジティブな記事が3件そろった時点で判定を打ち切る
+    return news_pipeline.run(
+        lambda: fetch_news(params, deadline),
+        filter_source_articles,
+        title_segment,
+        on_accept=on_accept
+    )
+
+def fetch_news(params, deadline=None):
+    # NewsAPIが応答しない・遮断中の場合は、期限切れのキャッシュか保存済みの記事で答える
+    key = make_cache_key(params['q'], params)
+    try:
+        return news_cache.get_or_fetch(key, lambda: fetch_articles(params, deadline))
+    except (requests.RequestException, NewsAPIError) as e:
+        fallback = news_cache.get_stale(key)
+        source = 'stale_cache'
+        if fallback is None and article_store is not None:
+            articles = article_store.search(params['q'], limit=Config.NEWS_MAX_CANDIDATES,
+                                            domains=params['domains'].split(',') if params.get('domains') else None)
+            fallback = {'status': 'ok', 'totalResults': len(articles), 'articles': articles} if articles else None
+            source = 'article_store'
+        if fallback is None:
+            raise
+        logger.warning("NewsAPIから取得できないため、%sの記事で答えます: %s", source, e)
+        metrics.count('news_fallback', source)
+        return dict(fallback, degraded=source)
+
+def playable_segments(titles):
+    # 読み上げるセグメントを返す。音声合成サービスが遮断中の場合は、合成済みのタイトルだけで読み上げ文を組み立て直す
+    # （つなぎの文はタイトルと一緒に落とす）。読み上げられるタイトルが無ければ音声は返さない（空のリスト）
+    if not tts_client.breaker.is_open:
+        return build_audio_segments(titles)
+    cached_titles = [title for title in titles if news_audio.is_cached([title_segment(title)])]
+    if titles and not cached_titles:
+        logger.warning("音声合成サービスが遮断中で、合成済みのタイトルが無いため読み上げを省略します")
+        return []
+    segments = build_audio_segments(cached_titles)
+    if not news_audio.is_cached(segments):
+        logger.warning("音声合成サービスが遮断中で、定型文が合成されていないため読み上げを省略します")
+        return []
+    if len(cached_titles) < len(titles):
+        logger.warning("音声合成サービスが遮断中のため、合成済みの%s/%s件のタイトルだけで読み上げます",
+                       len(cached_titles), len(titles))
+    return segments
+
+def fetch_articles(params, deadline=None):
+    # 最近NewsAPIに問い合わせた検索ワードは、保存済みの記事だけで答える
+    if article_store is not None and article_store.is_fresh(params['q']):
+        with metrics.stage('article_store'):
+            articles = article_store.search(params['q'], limit=Config.NEWS_MAX_CANDIDATES,
+                                            domains=params['domains'].split(',') if params.get('domains') else None)
+        logger.info("保存済みの記事から%s件を取得しました: '%s'", len(articles), params['q'])
+        return {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+    return store_news_data(params, deadline)
+
+def store_news_data(params, deadline=None):
+    news_data = fetch_news_data(params, deadline)
+    if article_store is not None:
+        article_store.ingest(params['q'], news_data['articles'])
+    return news_data
+
+@bp.route('/api/news-cache-stats', methods=['GET'])
+def news_cache_stats():
+    stats = news_cache.stats()
+    if article_store is not None:
+        stats['article_store'] = article_store.stats()
+    return jsonify(stats)
+
+class NewsAPIError(Exception):
+    pass
+
+def fetch_news_page(params, deadline=None):
+    # NewsAPIへ1回問い合わせる（タイムアウト・再試行・遮断は newsapi_client が行う）
+    with metrics.stage('newsapi'):
+        response = newsapi_client.get(Config.NEWS_API_URL, params=params, deadline=deadline)
+        response.raise_for_status()
+        news_data = response.json()
+    if news_data['status'] != 'ok':
+        raise NewsAPIError(news_data.get('message', ''))
+    return news_data
+
+def fetch_news_data(params, deadline=None):
+    # 媒体ごと・ページごとの問い合わせを並行して行い、新しさと検索ワードとの一致で上位の記事にまとめる
+    # （キャッシュミス時のみ呼ばれる）
+    domains = params['domains'].split(',') if params.get('domains') else [None]
+    requests_params = []
+    for domain in domains:
+        for page in range(1, Config.NEWS_PAGES + 1):
+            page_params = dict(params, page=page)
+            if domain is None:
+                page_params.pop('domains', None)
+            else:
+                page_params['domains'] = domain
+            requests_params.append(page_params)
+    with metrics.stage('news_fanout'):
+        results = news_fanout.fetch_all(requests_params, lambda page_params: fetch_news_page(page_params, deadline))
+    query = normalize_query(params['q'])
+    bonus = Config.NEWS_TITLE_MATCH_BONUS_HOURS * 3600
+
+    def score(article):
+        matched = query and query in normalize_query(article.get('title'))
+        return published_timestamp(article) + (bonus if matched else 0)
+
+    with metrics.stage('news_merge'):
+        articles, collapsed = merge_top_k(
+            [result['articles'] for result in results], Config.NEWS_MAX_CANDIDATES, score, news_deduper
+        )
+    if collapsed:
+        logger.info("似た見出しの記事を%s件まとめました", collapsed)
+    return {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+
+def filter_source_articles(articles):
+    # 設定された媒体の記事のみをフィルタリング
+    return [article for article in articles
+            if any(domain in article.get('url', '') for domain in Config.NEWS_SOURCES)]
 
 def format_articles(articles):
     return [{
@@ -360,33 +821,83 @@ def format_articles(articles):
         'publishedAt': article['publishedAt']
     } for article in articles]
 
-def generate_audio(titles):
-    try:
-        if not titles:
-            text = "ポジティブなニュースはありませんでした。"
-        else:
-            # 最大3つのタイトルを使用
-            titles = titles[:3]
-            # タイトルを結合して1つの文章にする
-            text = "以下のポジティブなニュースをお伝えします。" + "。次に、".join(titles) + "。以上です。"
-        
-        logger.info(f"生成する音声テキスト: {text}")
-        
-        # 音声ファイルを生成
-        tts = gTTS(text=text, lang='ja')
-        
-        # 音声をバイトストリームとして保存
-        audio_stream = io.BytesIO()
-        tts.write_to_fp(audio_stream)
-        audio_stream.seek(0)
-        
-        # 音声データをBase64エンコード
-        audio_base64 = base64.b64encode(audio_stream.getvalue()).decode('utf-8')
-        
-        logger.info("音声データの生成が完了しました")
-        return audio_base64
-    
-    except Exception as e:
-        logger.error(f"音声合成エラー: {str(e)}")
-        return None
-
+# 検索ワードが空の場合の既定値
+DEFAULT_QUERY = '日本'
+
+# 音声の定型文
+NO_NEWS_TEXT = "ポジティブなニュースはありませんでした。"
+INTRO_TEXT = "以下のポジティブなニュースをお伝えします。"
+JOINER_TEXT = "次に、"
+CLOSING_TEXT = "以上です。"
+FIXED_PHRASES = [NO_NEWS_TEXT, INTRO_TEXT, JOINER_TEXT, CLOSING_TEXT]
+
+def title_segment(title):
+    return title + "。"
+
+def build_audio_segments(titles):
+    # 読み上げ文をセグメント（導入・各タイトル・つなぎ・締め）に分割する
+    if not titles:
+        return [NO_NEWS_TEXT]
+    segments = [INTRO_TEXT]
+    # 最大3つのタイトルを使用
+    for i, title in enumerate(titles[:3]):
+        if i > 0:
+            segments.append(JOINER_TEXT)
+        segments.append(title_segment(title))
+    segments.append(CLOSING_TEXT)
+    return segments
+
+def presynthesize_fixed_phrases():
+    tts_cache.prefetch(FIXED_PHRASES)
+    logger.info("定型文の音声を事前合成しました")
+
+def prefetch_default_news():
+    # 既定の検索ワードの記事を取得・判定し、採用されたタイトルの音声合成まで済ませておく
+    if not Config.NEWS_API_KEY:
+        logger.info("NewsAPI keyが未設定のため、ニュースの事前取得を省略します")
+        return
+    positive_articles, _ = run_news_pipeline(build_news_params(DEFAULT_QUERY))
+    titles = [article['title'] for article in positive_articles]
+    news_audio.render(build_audio_segments(titles))
+
+# 既定の話題の記事を定期的に取得・判定し、古い記事を削除する
+article_sync = ArticleSync(
+    article_store,
+    topics=Config.ARTICLE_SYNC_TOPICS,
+    interval=Config.ARTICLE_SYNC_INTERVAL,
+    sync_topic=lambda topic: store_news_data(build_news_params(topic)),
+    classify=news_filter.verdicts
+) if article_store is not None else None
+
+def start_article_sync():
+    # ウォームアップの有無にかかわらず create_app から呼ぶ（無効にしても保存済みの記事を古いままにしない）
+    if article_sync is None or not Config.NEWS_API_KEY:
+        logger.info("記事の定期同期は無効です")
+        return
+    article_sync.start()
+
+# サーバーが待ち受けを始めた後に実行する初期化処理
+warmup = Warmup()
+warmup.add_step('import_speech_recognition', sr.load)
+if tokenizer_pool is not None:
+    # 各ワーカープロセスでモデルを読み込む（このプロセスではnagisaを読み込まない）
+    warmup.add_step('nagisa', tokenizer_pool.warm)
+else:
+    warmup.add_step('nagisa', lambda: news_filter.tag_batch(['ウォームアップ用のサンプル文です。']))
+warmup.add_step('presynthesize', presynthesize_fixed_phrases)
+warmup.add_step('prefetch_news', prefetch_default_news)
+if not Config.WARMUP_ENABLED:
+    # /api/ready がウォームアップを待ち続けて 503 を返さないよう、最初から準備完了とする
+    warmup.skip()
+
+@bp.before_app_request
+def start_warmup():
+    # gunicornなどrun.pyを経由しない起動でも、最初のリクエストでウォームアップを始める
+    if Config.WARMUP_ENABLED:
+        warmup.start()
+
+@bp.route('/api/ready', methods=['GET'])
+def ready():
+    report = warmup.report()
+    report['import_timings_ms'] = {name: round(value * 1000, 1) for name, value in import_timings.items()}
+    return jsonify(report), (200 if report['ready'] else 503)
@@ -0,0 +1,275 @@
+import json
+import logging
+import os
+import signal
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    device_id TEXT PRIMARY KEY,
+    is_recording INTEGER NOT NULL DEFAULT 0,
+    recording_id INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER,
+    capture_mode TEXT,
+    arecord_pid INTEGER,
+    audio_file TEXT,
+    stop_requested INTEGER NOT NULL DEFAULT 0,
+    last_text TEXT NOT NULL DEFAULT '',
+    pipeline_status TEXT NOT NULL DEFAULT 'idle',
+    result_error TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS news_audio (
+    audio_id TEXT PRIMARY KEY,
+    segments TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    data TEXT,
+    timestamp REAL NOT NULL,
+    dedupe_key TEXT UNIQUE
+);
+"""
+
+# 認識処理が終わったことを示すステータス
+FINAL_STATUSES = ('recognized', 'failed')
+
+
+def process_running(pid):
+    # 他のワーカーが起動したプロセスも含めて生存確認する（ゾンビは終了済みとみなす）
+    if not pid:
+        return False
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DeviceStateStore:
+    """端末（キオスク）ごとの録音状態・認識結果・処理状況を保持する共有ストア
+
+    SQLiteをWALモードで使い、複数のgunicornワーカーから同じファイルを参照する。
+    録音の開始・停止は BEGIN IMMEDIATE で排他し、どのワーカーからでも安全に操作できる。
+    読み上げ音声のセグメント（news_audio）と表示端末へのイベント（events）も、どのワーカーからでも引けるよう保存する。
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _ensure(self, conn, device_id):
+        conn.execute('INSERT OR IGNORE INTO devices (device_id, updated_at) VALUES (?, ?)', (device_id, self.clock()))
+
+    def get(self, device_id):
+        row = self._connection().execute('SELECT * FROM devices WHERE device_id = ?', (device_id,)).fetchone()
+        if row is None:
+            return {'device_id': device_id, 'is_recording': 0, 'recording_id': 0, 'owner_pid': None,
+                    'capture_mode': None, 'arecord_pid': None, 'audio_file': None, 'stop_requested': 0,
+                    'last_text': '', 'pipeline_status': 'idle', 'result_error': None, 'updated_at': None}
+        return dict(row)
+
+    def list_devices(self):
+        return [dict(row) for row in self._connection().execute('SELECT * FROM devices ORDER BY device_id')]
+
+    def begin_recording(self, device_id, capture_mode, owner_pid, max_age=None, local_active=None):
+        # 録音中でなければ（または録音中のまま残った状態であれば）録音IDを払い出す
+        with self._transaction() as conn:
+            self._ensure(conn, device_id)
+            row = dict(conn.execute('SELECT * FROM devices WHERE device_id = ?', (device_id,)).fetchone())
+            if row['is_recording']:
+                if not self._recording_stale(row, owner_pid, max_age, local_active):
+                    return None
+                self._discard_recording(row)
+            recording_id = row['recording_id'] + 1
+            conn.execute(
+                """UPDATE devices SET is_recording = 1, recording_id = ?, owner_pid = ?, capture_mode = ?,
+                   arecord_pid = NULL, audio_file = NULL, stop_requested = 0, pipeline_status = 'recording',
+                   result_error = NULL, updated_at = ? WHERE device_id = ?""",
+                (recording_id, owner_pid, capture_mode, self.clock(), device_id)
+            )
+            return recording_id
+
+    def _recording_stale(self, row, owner_pid, max_age, local_active):
+        # 停止要求が届かなかった・arecordが先に終了した録音は、次の録音で引き継ぐ
+        if not process_running(row['owner_pid']):
+            return True
+        if row['arecord_pid'] and not process_running(row['arecord_pid']):
+            return True
+        if max_age is not None and row['updated_at'] and self.clock() - row['updated_at'] > max_age:
+            return True
+        # 自分のワーカーが持つ録音なら、実際に録音中かどうかを local_active(row) で確かめる
+        return row['owner_pid'] == owner_pid and local_active is not None and not local_active(row)
+
+    @staticmethod
+    def _discard_recording(row):
+        logger.warning("録音中のまま残っていた状態を破棄します（端末: %s, 録音ID: %s）",
+                       row['device_id'], row['recording_id'])
+        # 期限を過ぎても動き続けているarecord（一時ファイルへの録音）は止める
+        if row['arecord_pid'] and process_running(row['arecord_pid']):
+            try:
+                os.kill(row['arecord_pid'], signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def update_recording(self, device_id, recording_id, arecord_pid=None, audio_file=None):
+        with self._transaction() as conn:
+            conn.execute(
+                """UPDATE devices SET arecord_pid = ?, audio_file = ?, updated_at = ?
+                   WHERE device_id = ? AND recording_id = ?""",
+                (arecord_pid, audio_file, self.clock(), device_id, recording_id)
+            )
+
+    def end_recording(self, device_id):
+        # 録音の停止権を1つのリクエストだけが得られるよう、状態の読み出しと更新を同時に行う
+        with self._transaction() as conn:
+            row = conn.execute('SELECT * FROM devices WHERE device_id = ?', (device_id,)).fetchone()
+            if row is None or not row['is_recording']:
+                return None
+            conn.execute(
+                """UPDATE devices SET is_recording = 0, stop_requested = 1, pipeline_status = 'recognizing',
+                   updated_at = ? WHERE device_id = ?""",
+                (self.clock(), device_id)
+            )
+            return dict(row)
+
+    def abort_recording(self, device_id, recording_id, error):
+        # 録音を開始できなかった・arecordが途中で終了した場合に、録音中の状態を失敗として解除する
+        with self._transaction() as conn:
+            conn.execute(
+                """UPDATE devices SET is_recording = 0, stop_requested = 1, pipeline_status = 'failed',
+                   result_error = ?, updated_at = ? WHERE device_id = ? AND recording_id = ? AND is_recording = 1""",
+                (error, self.clock(), device_id, recording_id)
+            )
+
+    def stop_requested(self, device_id, recording_id):
+        row = self._connection().execute(
+            'SELECT stop_requested FROM devices WHERE device_id = ? AND recording_id = ?',
+            (device_id, recording_id)
+        ).fetchone()
+        return row is None or bool(row['stop_requested'])
+
+    def set_status(self, device_id, status):
+        with self._transaction() as conn:
+            self._ensure(conn, device_id)
+            conn.execute('UPDATE devices SET pipeline_status = ?, updated_at = ? WHERE device_id = ?',
+                         (status, self.clock(), device_id))
+
+    def set_last_text(self, device_id, text):
+        with self._transaction() as conn:
+            self._ensure(conn, device_id)
+            conn.execute(
+                """UPDATE devices SET last_text = ?, pipeline_status = 'recognized', result_error = NULL,
+                   updated_at = ? WHERE device_id = ?""",
+                (text, self.clock(), device_id)
+            )
+
+    def set_result(self, device_id, recording_id, text=None, error=None):
+        with self._transaction() as conn:
+            if error is None:
+                conn.execute(
+                    """UPDATE devices SET last_text = ?, pipeline_status = 'recognized', result_error = NULL,
+                       updated_at = ? WHERE device_id = ? AND recording_id = ?""",
+                    (text, self.clock(), device_id, recording_id)
+                )
+            else:
+                conn.execute(
+                    """UPDATE devices SET pipeline_status = 'failed', result_error = ?, updated_at = ?
+                       WHERE device_id = ? AND recording_id = ?""",
+                    (error, self.clock(), device_id, recording_id)
+                )
+
+    def wait_for_result(self, device_id, recording_id, timeout, interval=0.05):
+        # 他のワーカーが録音を持っている場合に、そのワーカーが認識結果を書き込むまで待つ
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self.get(device_id)
+            if row['recording_id'] != recording_id or row['pipeline_status'] in FINAL_STATUSES:
+                return row
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+
+    def save_audio_segments(self, audio_id, segments, keep):
+        # 読み上げ音声のセグメントを保存し、新しいものから keep 件だけ残す
+        with self._transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO news_audio (audio_id, segments, created_at) VALUES (?, ?, ?)',
+                         (audio_id, json.dumps(segments, ensure_ascii=False), self.clock()))
+            conn.execute(
+                """DELETE FROM news_audio WHERE audio_id NOT IN
+                   (SELECT audio_id FROM news_audio ORDER BY created_at DESC, rowid DESC LIMIT ?)""",
+                (keep,)
+            )
+
+    def load_audio_segments(self, audio_id):
+        row = self._connection().execute('SELECT segments FROM news_audio WHERE audio_id = ?', (audio_id,)).fetchone()
+        return json.loads(row['segments']) if row is not None else None
+
+    def append_event(self, event_type, data, keep, dedupe_key=None):
+        # イベントを追記して (id, 時刻) を返す。id はワーカーをまたいだ通し番号で、直近 keep 件だけ残す
+        # 同じ dedupe_key のイベントを別のワーカーが追記済みなら何もせず None を返す
+        timestamp = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO events (type, data, timestamp, dedupe_key) VALUES (?, ?, ?, ?)',
+                (event_type, json.dumps(data, ensure_ascii=False), timestamp, dedupe_key)
+            )
+            if not cursor.rowcount:
+                return None
+            event_id = cursor.lastrowid
+            conn.execute('DELETE FROM events WHERE id <= ?', (event_id - keep,))
+        return event_id, timestamp
+
+    def events_after(self, event_id, limit=None):
+        # event_id より後のイベントを (id, type, data, timestamp) の順に返す（limit 件まで）
+        rows = self._connection().execute(
+            'SELECT id, type, data, timestamp FROM events WHERE id > ? ORDER BY id LIMIT ?',
+            (event_id, -1 if limit is None else limit)
+        )
+        return [(row['id'], row['type'], json.loads(row['data']), row['timestamp']) for row in rows]
+
+    def last_event_id(self):
+        return self._connection().execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
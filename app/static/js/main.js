@@ -7,51 +7,198 @@ document.addEventListener("DOMContentLoaded", () => {
   const voiceInputStatus = document.getElementById("voice-input-status")
   const recognitionResult = document.getElementById("recognition-result")
 
+  // 複数の表示端末を1台のサーバーで扱うための端末ID（例: /?device=kitchen）
+  const deviceId = new URLSearchParams(window.location.search).get("device") || "default"
+  const deviceHeaders = { "X-Device-Id": deviceId }
+
   let isRecording = false
   const audioPlaybackPromise = null
 
+  // Socket.IOで接続している間は、サーバーが認識結果に続けてニュースを送ってくる
+  let socket = null
+  let pushedNews = null
+  let pushFallbackTimer = null
+  let voiceInputStartedAt = 0
+  let newsPushedAt = 0
+  // プッシュと fetch の両方でニュースが届いても、表示と再生は先に届いた方の1回だけにする
+  let newsFetchController = null
+  let newsFetchedAt = 0
+  let playedAudioUrl = null
+
+  let lastEventId = null
+
   function initEventSource() {
     if (eventSource) {
       eventSource.close()
     }
-    eventSource = new EventSource("/events")
-    eventSource.onmessage = (event) => {
-      if (event.data === "touch_detected") {
-        console.log("タッチ検出：音声入力を開始/停止します")
-        toggleVoiceInput()
+    // 再接続時は受信済みの最後のイベントIDを渡し、取りこぼしたイベントを再送してもらう
+    const url = lastEventId ? `/events?lastEventId=${encodeURIComponent(lastEventId)}` : "/events"
+    eventSource = new EventSource(url)
+    eventSource.addEventListener("touch_detected", (event) => {
+      lastEventId = event.lastEventId
+      if (!isOwnEvent(event)) {
+        return
       }
-    }
+      console.log("タッチ検出：音声入力を開始/停止します")
+      // タッチの連番を録音開始の要求に付け、サーバー側でタッチから録音開始までの時間を計測する
+      const data = JSON.parse(event.data || "null")
+      toggleVoiceInput(data && data.seq)
+    })
+    eventSource.addEventListener("utterance_endpointed", (event) => {
+      lastEventId = event.lastEventId
+      if (!isOwnEvent(event)) {
+        return
+      }
+      // 発話の終了をサーバーが検出したら、停止操作を待たずに認識結果を取りに行く
+      if (isRecording) {
+        console.log("発話終了を検出：音声入力を停止します")
+        stopVoiceInput()
+      }
+    })
     eventSource.onerror = (error) => {
       console.error("SSE エラー:", error)
-      eventSource.close()
-      setTimeout(() => {
-        console.log("SSE 再接続を試みます...")
-        initEventSource()
-      }, 5000)
+      // 接続中の切断はブラウザが自動で再接続する。完全に閉じた場合のみ張り直す
+      if (eventSource.readyState === EventSource.CLOSED) {
+        setTimeout(() => {
+          console.log("SSE 再接続を試みます...")
+          initEventSource()
+        }, 5000)
+      }
+    }
+  }
+
+  // 他の端末向けのイベントは無視する（端末IDの無いGPIOのタッチは全端末が対象）
+  function isOwnEvent(event) {
+    const data = JSON.parse(event.data || "null")
+    return !data || !data.device_id || data.device_id === deviceId
+  }
+
+  function initSocket() {
+    socket = io("/pipeline", {
+      auth: { device: deviceId },
+      reconnectionDelay: 500,
+      reconnectionDelayMax: 5000,
+    })
+    socket.on("connect", () => console.log("Socket.IO 接続しました"))
+    socket.on("connect_error", (error) => {
+      // サーバーに接続できない（Socket.IOが無効・プロキシが通さないなど）ときはSSEに切り替える
+      console.error("Socket.IO 接続エラー。SSE に切り替えます:", error)
+      fallBackToEventSource()
+    })
+    socket.on("disconnect", (reason) => {
+      console.log("Socket.IO 切断:", reason)
+      if (reason === "io server disconnect") {
+        fallBackToEventSource()
+      }
+    })
+    socket.on("touch_detected", (data) => {
+      console.log("タッチ検出：音声入力を開始/停止します")
+      toggleVoiceInput(data && data.seq)
+    })
+    socket.on("recording_started", () => {
+      voiceInputStatus.textContent = "音声入力中..."
+    })
+    socket.on("utterance_endpointed", () => {
+      if (isRecording) {
+        console.log("発話終了を検出：音声入力を停止します")
+        stopVoiceInput()
+      }
+    })
+    socket.on("transcript_partial", (data) => {
+      recognitionResult.textContent = `認識中: ${data.text}`
+    })
+    socket.on("recognition_result", (data) => {
+      voiceInputStatus.textContent = "音声認識完了"
+      recognitionResult.textContent = `認識結果: ${data.text}`
+    })
+    socket.on("news_started", () => {
+      clearTimeout(pushFallbackTimer)
+      if (newsFetchedAt >= voiceInputStartedAt) {
+        // 遅れて届いたプッシュ。fetch で取得したニュースをすでに表示している
+        return
+      }
+      if (newsFetchController) {
+        // 取得中の fetch はやめ、プッシュされるニュースを使う
+        newsFetchController.abort()
+        newsFetchController = null
+      }
+      newsPushedAt = Date.now()
+      pushedNews = { audioUrl: null }
+      showSection(newsSection)
+      document.getElementById("news-container").innerHTML = ""
+      document.getElementById("news-status").textContent = "ニュースを取得中..."
+    })
+    socket.on("article_accepted", (data) => {
+      // 判定を通った記事から順に表示する
+      if (pushedNews) {
+        appendArticle(data.article)
+      }
+    })
+    socket.on("news_ready", (data) => {
+      if (!pushedNews) {
+        return
+      }
+      displayNews(data.articles)
+      document.getElementById("news-status").textContent = "ニュース取得完了"
+      pushedNews.audioUrl = data.audio_url
+    })
+    socket.on("audio_ready", (data) => {
+      if (!pushedNews || pushedNews.audioUrl !== data.audio_url) {
+        return
+      }
+      pushedNews = null
+      playNewsAudio(data.audio_url)
+    })
+    socket.on("news_error", (data) => {
+      if (!pushedNews) {
+        return
+      }
+      pushedNews = null
+      document.getElementById("news-status").textContent = `ニュース取得エラー: ${data.error}`
+      returnToClockAfterDelay(5000)
+    })
+  }
+
+  function fallBackToEventSource() {
+    if (socket) {
+      const failed = socket
+      socket = null
+      failed.close()
+    }
+    if (!eventSource) {
+      initEventSource()
     }
   }
 
-  // 初期化時にSSE接続を開始
-  initEventSource()
+  // サーバーでSocket.IOが無効な場合やクライアントが読み込めなかった場合は、SSEと fetch による従来の方式で動かす
+  if (document.body.dataset.socketio === "enabled" && typeof io === "function") {
+    initSocket()
+  } else {
+    initEventSource()
+  }
 
-  voiceInputBtn.addEventListener("click", toggleVoiceInput)
+  voiceInputBtn.addEventListener("click", () => toggleVoiceInput())
 
-  function toggleVoiceInput() {
+  function toggleVoiceInput(touchSeq) {
     if (isRecording) {
       stopVoiceInput()
     } else {
-      startVoiceInput()
+      startVoiceInput(touchSeq)
     }
   }
 
-  function startVoiceInput() {
+  function startVoiceInput(touchSeq) {
     showSection(voiceInputSection)
     voiceInputStatus.textContent = "音声入力を開始します..."
     recognitionResult.textContent = ""
     isRecording = true
+    voiceInputStartedAt = Date.now()
+    playedAudioUrl = null
+    clearTimeout(pushFallbackTimer)
     voiceInputBtn.textContent = "音声入力停止"
 
-    fetch("/api/start-voice-input", { method: "POST" })
+    const headers = touchSeq ? { ...deviceHeaders, "X-Touch-Seq": String(touchSeq) } : deviceHeaders
+    fetch("/api/start-voice-input", { method: "POST", headers })
       .then((response) => response.json())
       .then((data) => {
         if (data.success) {
@@ -77,13 +224,23 @@ document.addEventListener("DOMContentLoaded", () => {
     voiceInputBtn.textContent = "音声入力開始"
     voiceInputStatus.textContent = "音声認識処理中..."
 
-    fetch("/api/stop-voice-input", { method: "POST" })
+    fetch("/api/stop-voice-input", { method: "POST", headers: deviceHeaders })
       .then((response) => response.json())
       .then((data) => {
         if (data.success) {
           voiceInputStatus.textContent = "音声認識完了"
           recognitionResult.textContent = `認識結果: ${data.text}`
-          fetchNews()
+          if (socket && socket.connected) {
+            // ニュースはサーバーから送られてくる。送られてこなければ従来どおり取りに行く
+            clearTimeout(pushFallbackTimer)
+            pushFallbackTimer = setTimeout(() => {
+              if (newsPushedAt < voiceInputStartedAt) {
+                fetchNews()
+              }
+            }, 2000)
+          } else {
+            fetchNews()
+          }
         } else {
           voiceInputStatus.textContent = "音声認識エラー"
           recognitionResult.textContent = `エラー: ${data.error}`
@@ -103,22 +260,22 @@ document.addEventListener("DOMContentLoaded", () => {
     newsContainer.innerHTML = ""
     newsStatus.textContent = "ニュースを取得中..."
 
-    fetch("/api/get-news")
+    const controller = new AbortController()
+    newsFetchController = controller
+    fetch("/api/get-news", { headers: deviceHeaders, signal: controller.signal })
       .then((response) => response.json())
       .then((data) => {
+        if (controller.signal.aborted || newsPushedAt >= voiceInputStartedAt) {
+          // 待っている間にプッシュでニュースが届いた
+          return
+        }
+        newsFetchController = null
+        newsFetchedAt = Date.now()
         if (data.articles) {
           displayNews(data.articles)
           newsStatus.textContent = "ニュース取得完了"
-          if (data.audio) {
-            playAudio(data.audio)
-              .then(() => {
-                console.log("音声再生が完了しました")
-                returnToClockAfterDelay(0)
-              })
-              .catch((error) => {
-                console.error("音声再生エラー:", error)
-                returnToClockAfterDelay(5000)
-              })
+          if (data.audio_url) {
+            playNewsAudio(data.audio_url)
           } else {
             returnToClockAfterDelay(5000)
           }
@@ -128,12 +285,34 @@ document.addEventListener("DOMContentLoaded", () => {
         }
       })
       .catch((error) => {
+        if (error.name === "AbortError") {
+          return
+        }
+        newsFetchController = null
         console.error("ニュース取得エラー:", error)
         newsStatus.textContent = `ニュース取得エラー: ${error.message}`
         returnToClockAfterDelay(5000)
       })
   }
 
+  function playNewsAudio(audioUrl) {
+    // 音声IDはニュースの内容から決まるため、同じ音声URLの2回目の再生要求は重複として無視する
+    if (audioUrl === playedAudioUrl) {
+      console.log("同じニュース音声の再生要求を無視します:", audioUrl)
+      return
+    }
+    playedAudioUrl = audioUrl
+    playAudio(audioUrl)
+      .then(() => {
+        console.log("音声再生が完了しました")
+        returnToClockAfterDelay(0)
+      })
+      .catch((error) => {
+        console.error("音声再生エラー:", error)
+        returnToClockAfterDelay(5000)
+      })
+  }
+
   function displayNews(articles) {
     const newsContainer = document.getElementById("news-container")
     newsContainer.innerHTML = ""
@@ -143,40 +322,46 @@ document.addEventListener("DOMContentLoaded", () => {
       return
     }
 
-    const newsList = document.createElement("ul")
-    newsList.className = "news-list"
+    articles.forEach(appendArticle)
+  }
 
-    articles.forEach((article) => {
-      const listItem = document.createElement("li")
-      listItem.className = "news-item"
+  function appendArticle(article) {
+    const newsContainer = document.getElementById("news-container")
+    let newsList = newsContainer.querySelector(".news-list")
+    if (!newsList) {
+      newsList = document.createElement("ul")
+      newsList.className = "news-list"
+      newsContainer.appendChild(newsList)
+    }
 
-      const title = document.createElement("h3")
-      const link = document.createElement("a")
-      link.href = article.url
-      link.target = "_blank"
-      link.textContent = article.title
-      title.appendChild(link)
+    const listItem = document.createElement("li")
+    listItem.className = "news-item"
 
-      const description = document.createElement("p")
-      description.textContent = article.description
+    const title = document.createElement("h3")
+    const link = document.createElement("a")
+    link.href = article.url
+    link.target = "_blank"
+    link.textContent = article.title
+    title.appendChild(link)
 
-      const publishedAt = document.createElement("span")
-      publishedAt.className = "news-date"
-      publishedAt.textContent = new Date(article.publishedAt).toLocaleString("ja-JP")
+    const description = document.createElement("p")
+    description.textContent = article.description
 
-      listItem.appendChild(title)
-      listItem.appendChild(description)
-      listItem.appendChild(publishedAt)
+    const publishedAt = document.createElement("span")
+    publishedAt.className = "news-date"
+    publishedAt.textContent = new Date(article.publishedAt).toLocaleString("ja-JP")
 
-      newsList.appendChild(listItem)
-    })
+    listItem.appendChild(title)
+    listItem.appendChild(description)
+    listItem.appendChild(publishedAt)
 
-    newsContainer.appendChild(newsList)
+    newsList.appendChild(listItem)
   }
 
-  function playAudio(audioBase64) {
+  function playAudio(audioUrl) {
     return new Promise((resolve, reject) => {
-      const audio = new Audio(`data:audio/mp3;base64,${audioBase64}`)
+      // 音声はサーバーから逐次ストリーミングされるので、届いた分から再生が始まる
+      const audio = new Audio(audioUrl)
       audio.onended = () => {
         console.log("音声再生が終了しました")
         resolve()
@@ -0,0 +1,138 @@
+"""nagisaによる形態素解析を別プロセスで行うワーカープール
+
+nagisaの解析はPythonで書かれたCPU処理のため、同じプロセスのスレッドで並べても
+GILで1つずつしか進まない。ワーカープロセスごとに一度だけモデルを読み込み、
+テキストのまとまり（バッチ）単位で解析を引き受けることで、Raspberry Piの複数コアを使う。
+start_method が forkserver の場合は、forkサーバーが先にnagisaを読み込んでおき、そこからforkした
+ワーカーはモデルのメモリを共有する（書き込まれない限りコピーされない）。
+
+同時に受け付けるバッチは max_pending 件までとし、それを超える投入は空きが出るまで待たせる
+（queue_timeout 秒待っても空かなければ TokenizerBusy を送出する）。
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_nagisa = None
+
+
+class TokenizerBusy(RuntimeError):
+    pass
+
+
+def _init_worker():
+    # ワーカープロセスの起動時に一度だけnagisa（とモデル）を読み込む
+    global _nagisa
+    import nagisa
+    _nagisa = nagisa
+
+
+def _tag_batch(texts):
+    return [_nagisa.tagging(text).words for text in texts]
+
+
+def _memory_bytes(pid, field):
+    # /proc から常駐メモリ量（Rss）・共有分を按分した量（Pss）を読む（Linux以外では None）
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class TokenizerPool:
+    def __init__(self, workers, max_pending, queue_timeout=5.0, start_method='forkserver', max_tasks_per_child=0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.start_method = start_method
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'texts': 0, 'pending': 0, 'waited': 0, 'rejected': 0}
+
+    def _get_executor(self):
+        # ワーカーは最初に使うとき（またはウォームアップ時）に起動する
+        with self._lock:
+            if self._executor is None:
+                kwargs = {}
+                if self.max_tasks_per_child:
+                    # 一定件数ごとにワーカーを入れ替え、メモリの増加を抑える（Python 3.11以降）
+                    kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    context.set_forkserver_preload(['nagisa'])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    **kwargs
+                )
+                logger.info("形態素解析のワーカーを%s個起動します（%s）", self.workers, self.start_method)
+            return self._executor
+
+    def submit(self, texts):
+        # 解析結果（テキストごとの単語リスト）の Future を返す
+        texts = list(texts)
+        executor = self._get_executor()
+        if not self._slots.acquire(blocking=False):
+            self._count('waited')
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self._count('rejected')
+                raise TokenizerBusy(f"形態素解析の待ちが{self.max_pending}件を超えています")
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['texts'] += len(texts)
+            self._stats['pending'] += 1
+        try:
+            future = executor.submit(_tag_batch, texts)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self._stats['pending'] -= 1
+        self._slots.release()
+
+    def tag_batch(self, texts):
+        return self.submit(texts).result()
+
+    def warm(self):
+        # すべてのワーカーを起動し、それぞれでモデルを読み込ませる
+        for future in [self.submit(['ウォームアップ用のサンプル文です。']) for _ in range(self.workers)]:
+            future.result()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            executor = self._executor
+        stats['workers'] = self.workers
+        stats['max_pending'] = self.max_pending
+        processes = list(getattr(executor, '_processes', None) or {}) if executor is not None else []
+        for field in ('Rss', 'Pss'):
+            values = [_memory_bytes(pid, field) for pid in processes]
+            if values and None not in values:
+                stats[f'workers_{field.lower()}_bytes'] = sum(values)
+        stats['main_rss_bytes'] = _memory_bytes(os.getpid(), 'Rss')
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,193 @@
+"""タッチ入力サービス（touch_sensor.py）とWebアプリの間のローカル通信路
+
+タッチサービスがUnixドメインソケットで待ち受け、接続中のすべてのWebアプリのワーカーに
+1行1件のJSONでイベントを送る。接続は張りっぱなしにし、タッチごとの接続・HTTP処理を省く。
+
+    {"type": "touch", "seq": 12, "ts": 1712345678.123, "mono": 8123.456, "source": "gpio"}
+
+mono は time.monotonic() の値（同じマシン上のプロセス間で比較できる）で、遅延の計測に使う。
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer:
+    """前回受け付けてから interval 秒以内の入力を無視するソフトウェアのチャタリング除去"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._last = None
+        self._lock = threading.Lock()
+
+    def accept(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last is not None and now - self._last < self.interval:
+                return False
+            self._last = now
+            return True
+
+
+class TouchBroadcaster:
+    """タッチイベントに連番と時刻を付け、接続中のすべてのクライアントへ送る（タッチサービス側）"""
+
+    def __init__(self, socket_path, debounce_ms=200):
+        self.socket_path = socket_path
+        self.debouncer = Debouncer(debounce_ms / 1000)
+        self.seq = 0
+        self.dropped = 0
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._accept_loop, name='touch-accept', daemon=True)
+        self._thread.start()
+        logger.info("タッチイベントの送信を開始しました: %s", self.socket_path)
+        return self
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            # GPIOのコールバックを止めないよう、送信は待たずに行う（touch() を参照）
+            conn.setblocking(False)
+            with self._lock:
+                self._clients.add(conn)
+            logger.info("Webアプリが接続しました（接続数: %s）", len(self._clients))
+
+    def touch(self, source='gpio'):
+        # GPIOのコールバックなどから呼ばれる。チャタリングと判定した入力は送らない
+        mono = time.monotonic()
+        if not self.debouncer.accept(mono):
+            self.dropped += 1
+            return None
+        with self._lock:
+            self.seq += 1
+            event = {'type': 'touch', 'seq': self.seq, 'ts': time.time(), 'mono': mono, 'source': source}
+            line = (json.dumps(event) + '\n').encode('utf-8')
+            for conn in list(self._clients):
+                # 受信が止まって送信バッファが詰まったクライアントは、待たずに切断する
+                # （行の途中までしか送れなかった場合も、以降の行が読めなくなるので切断する）
+                try:
+                    sent = conn.send(line)
+                except OSError:
+                    sent = 0
+                if sent < len(line):
+                    self._clients.discard(conn)
+                    conn.close()
+                    logger.warning("タッチイベントを送れないWebアプリとの接続を切断しました（接続数: %s）",
+                                   len(self._clients))
+        return event
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            for conn in self._clients:
+                conn.close()
+            self._clients.clear()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class TouchListener:
+    """タッチサービスに接続し、届いたイベントを on_event に渡す（Webアプリ側）
+
+    タッチサービスが起動していない・再起動した場合は、間隔を延ばしながら接続し直す。
+    受け取ったイベントは連番で一定数覚えておき、録音開始までの遅延の計測に使う。
+    sleep を省略した場合、再接続までの待機は stop() で打ち切られる。
+    """
+
+    def __init__(self, socket_path, on_event, history_size=64, initial_backoff=0.1, max_backoff=5.0, sleep=None):
+        self.socket_path = socket_path
+        self.on_event = on_event
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.connections = 0
+        self._history = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._sock = None
+        self._stopped = threading.Event()
+        self.sleep = sleep or self._stopped.wait
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='touch-listener', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        # 接続を切り、再接続のループを終える
+        self._stopped.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        backoff = self.initial_backoff
+        while not self._stopped.is_set():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    self._sock = sock
+                    sock.connect(self.socket_path)
+                    self.connected = True
+                    self.connections += 1
+                    backoff = self.initial_backoff
+                    logger.info("タッチサービスに接続しました: %s", self.socket_path)
+                    for line in sock.makefile('rb'):
+                        self._dispatch(line)
+                logger.info("タッチサービスとの接続が切れました")
+            except OSError:
+                pass
+            finally:
+                self._sock = None
+            self.connected = False
+            if self._stopped.is_set():
+                return
+            self.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _dispatch(self, line):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            logger.error("不正なタッチイベントを受信しました: %r", line)
+            return
+        with self._lock:
+            self._history[event.get('seq')] = event
+            while len(self._history) > self._history_size:
+                self._history.popitem(last=False)
+        try:
+            self.on_event(event)
+        except Exception as e:
+            logger.error("タッチイベントの処理中にエラーが発生しました: %s", e)
+
+    def get(self, seq):
+        with self._lock:
+            return self._history.get(seq)
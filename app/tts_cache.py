@@ -0,0 +1,202 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+
+from app.lazy import LazyModule
+from app.upstream import tts_client
+from config import Config
+
+gtts = LazyModule('gtts')
+
+logger = logging.getLogger(__name__)
+
+
+def gtts_synthesize(text, lang):
+    def synthesize(timeout):
+        tts = gtts.gTTS(text=text, lang=lang, timeout=timeout)
+        audio_stream = io.BytesIO()
+        tts.write_to_fp(audio_stream)
+        return audio_stream.getvalue()
+    # gTTSは通信の失敗を gTTSError で送出する
+    return tts_client.call(synthesize, failures=(gtts.gTTSError, requests.RequestException))
+
+
+def http_synthesize(text, lang):
+    # TTS_HTTP_URL のサーバーにテキストを渡してMP3を受け取る（ローカルの代替サーバー用）
+    response = tts_client.get(Config.TTS_HTTP_URL, params={'text': text, 'lang': lang})
+    response.raise_for_status()
+    return response.content
+
+
+def get_synthesizer(backend=None):
+    backend = backend or Config.TTS_BACKEND
+    if backend == 'gtts':
+        return gtts_synthesize
+    if backend == 'http':
+        return http_synthesize
+    raise ValueError(f"不明な音声合成バックエンドです: {backend}")
+
+
+def strip_id3(data):
+    # MP3フレームだけを連結できるよう、先頭のID3v2タグと末尾のID3v1タグを取り除く
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b'TAG':
+        data = data[:-128]
+    return data
+
+
+def concat_mp3(segments):
+    # MP3はフレーム単位で独立しているため、再エンコードせずにそのまま連結できる
+    return b''.join(strip_id3(segment) for segment in segments)
+
+
+class TTSSegmentCache:
+    """テキスト+言語のハッシュをキーにした音声セグメントのキャッシュ
+
+    メモリ上のLRUとディスク上のファイルの2段構成で、どちらもバイト数で上限を設ける。
+    """
+
+    def __init__(self, cache_dir, max_disk_bytes, max_memory_bytes, synthesize=gtts_synthesize):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.synthesize = synthesize
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(32)]
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'disk_evictions': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if name.endswith('.mp3'):
+                self._disk_bytes += os.path.getsize(os.path.join(cache_dir, name))
+
+    @staticmethod
+    def key(text, lang):
+        return hashlib.sha1(f'{lang}\0{text}'.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.mp3')
+
+    def contains(self, text, lang='ja'):
+        key = self.key(text, lang)
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(self._path(key))
+
+    def get(self, text, lang='ja'):
+        key = self.key(text, lang)
+        data = self._get_memory(key)
+        if data is not None:
+            return data
+
+        # 同じセグメントを複数スレッドが同時に合成しないようキー単位でロックする
+        with self._key_locks[int(key[:8], 16) % len(self._key_locks)]:
+            data = self._get_memory(key)
+            if data is None:
+                data = self._get_disk(key)
+            if data is None:
+                with self._lock:
+                    self._stats['misses'] += 1
+                logger.debug("音声セグメントを合成します: %s", text)
+                data = self.synthesize(text, lang)
+                self._put_disk(key, data)
+                self._put_memory(key, data)
+        return data
+
+    def _get_memory(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+            return data
+
+    def _put_memory(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _get_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # 最終アクセス時刻をLRU判定に使う
+        except OSError:
+            return None
+        with self._lock:
+            self._stats['disk_hits'] += 1
+        self._put_memory(key, data)
+        return data
+
+    def _put_disk(self, key, data):
+        path = self._path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("音声セグメントの保存に失敗しました: %s", e)
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.mp3'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._stats['disk_evictions'] += evicted
+
+    def prefetch(self, texts, lang='ja'):
+        for text in texts:
+            try:
+                self.get(text, lang)
+            except Exception as e:
+                logger.error("音声セグメントの事前合成に失敗しました: %s: %s", text, e)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_bytes'] = self._memory_bytes
+            stats['disk_bytes'] = self._disk_bytes
+            return stats
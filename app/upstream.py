@@ -0,0 +1,256 @@
+"""外部サービス（NewsAPI・音声合成・音声認識）の呼び出しの共通処理
+
+    - 呼び出しごとの期限（Deadline）。各試行のタイムアウトは残り時間を超えない
+    - keep-aliveで接続を使い回すセッション
+    - 接続エラー・タイムアウト・5xx・429 は、ゆらぎ（jitter）付きの待ち時間をはさんで再試行する
+    - 冪等なGETは、hedge_after 秒たっても応答が無ければ同じ要求をもう1本送り、先に返った方を使う
+    - 失敗が続いたサービスは遮断（circuit breaker）し、一定時間は呼ばずに即座に失敗させる
+
+失敗は requests.RequestException の派生クラス（UpstreamError）で送出するため、
+呼び出し側は従来どおり requests.RequestException を捕捉すればよい。
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from app.metrics import metrics
+from app.news_sources import make_session
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(requests.RequestException):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class DeadlineExceeded(UpstreamError):
+    pass
+
+
+class Deadline:
+    """処理全体の期限。残り時間を各呼び出しのタイムアウトに割り当てる"""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self):
+        return self.expires_at - self.clock()
+
+
+class CircuitBreaker:
+    """連続 failure_threshold 回失敗すると reset_timeout 秒のあいだ呼び出しを遮断する
+
+    遮断の期限が過ぎたら1件だけ試しに通し（half-open）、成功すれば元に戻す。
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self.state == self.OPEN and self.clock() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("外部サービスへの呼び出しを遮断します（連続失敗 %s回）", self.failures)
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._probing = False
+
+
+class UpstreamClient:
+    """1つの外部サービスへの呼び出し（HTTPは request/get/post、ライブラリ経由は call）
+
+    HTTPは session（requests.Session 互換）で送り、再試行の前は sleep で待つ。
+    """
+
+    _STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+    def __init__(self, name, timeout, retries=2, backoff=0.1, hedge_after=None,
+                 failure_threshold=5, reset_timeout=30.0, pool_size=4,
+                 session=None, clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.clock = clock
+        self.sleep = sleep
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+        self.session = session or make_session(pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix=f'upstream-{name}')
+        self._latencies = deque(maxlen=200)
+        self._stats = {'calls': 0, 'failures': 0, 'retries': 0, 'hedged': 0, 'hedge_wins': 0, 'timeouts': 0}
+        self._lock = threading.Lock()
+
+    def default_deadline(self):
+        # 期限を指定されなかった呼び出しは、再試行を含めて timeout の (retries + 1) 倍まで待つ
+        return Deadline(self.timeout * (self.retries + 1) + self.backoff * 2 ** self.retries, clock=self.clock)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, deadline=None, hedge=None, **kwargs):
+        # 5xx・429 以外の応答はそのまま返す（4xx の扱いは呼び出し側が決める）
+        hedge = (method == 'GET') if hedge is None else hedge
+
+        def attempt(timeout):
+            response = self._send(method, url, timeout, hedge, kwargs)
+            if response.status_code >= 500 or response.status_code == 429:
+                raise UpstreamError(f"{self.name}: HTTP {response.status_code}", response=response)
+            return response
+        return self.call(attempt, deadline=deadline, failures=(requests.ConnectionError, requests.Timeout, UpstreamError))
+
+    def call(self, func, deadline=None, failures=(requests.RequestException,)):
+        # func(timeout) を期限内で再試行する。failures 以外の例外はサービスの障害とみなさずそのまま送出する
+        deadline = deadline or self.default_deadline()
+        attempt = 0
+        self._count('calls')
+        while True:
+            if not self.breaker.allow():
+                metrics.count(f'upstream_{self.name}', 'circuit_open')
+                raise CircuitOpenError(f"{self.name} は一時的に遮断されています")
+            timeout = min(self.timeout, deadline.remaining())
+            if timeout <= 0:
+                self._count('timeouts')
+                metrics.count(f'upstream_{self.name}', 'deadline')
+                raise DeadlineExceeded(f"{self.name} の呼び出し期限を過ぎました")
+            started = self.clock()
+            try:
+                result = func(timeout)
+            except failures as e:
+                self.breaker.record_failure()
+                self._count('failures')
+                if isinstance(e, requests.Timeout):
+                    self._count('timeouts')
+                attempt += 1
+                delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                if attempt > self.retries or delay >= deadline.remaining():
+                    metrics.count(f'upstream_{self.name}', 'error')
+                    if isinstance(e, UpstreamError):
+                        raise
+                    raise UpstreamError(f"{self.name}: {str(e)}") from e
+                self._count('retries')
+                logger.warning("%s の呼び出しに失敗したため再試行します（%s回目）: %s", self.name, attempt, e)
+                self.sleep(delay)
+                continue
+            except Exception:
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            with self._lock:
+                self._latencies.append(self.clock() - started)
+            metrics.count(f'upstream_{self.name}', 'ok')
+            return result
+
+    def _send(self, method, url, timeout, hedge, kwargs):
+        hedge_after = self.hedge_after
+        if not hedge or not hedge_after or hedge_after >= timeout:
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+
+        # 一定時間内に応答が無ければ、同じ要求をもう1本送って先に成功した方を使う
+        deadline = self.clock() + timeout
+        first = self._executor.submit(self.session.request, method, url, timeout=timeout, **kwargs)
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+        self._count('hedged')
+        second = self._executor.submit(self.session.request, method, url,
+                                       timeout=max(0.001, deadline - self.clock()), **kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - self.clock()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if future is second:
+                    self._count('hedge_wins')
+                return response
+        raise error or requests.Timeout(f"{self.name}: {timeout:.1f}秒以内に応答がありませんでした")
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        if latencies:
+            stats['latency_p50_seconds'] = latencies[len(latencies) // 2]
+            stats['latency_p95_seconds'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        stats['circuit_state'] = self._STATE_VALUES[self.breaker.state]
+        stats['circuit_rejected'] = self.breaker.rejected
+        return stats
+
+
+def create_client(name, timeout, hedge_after=None):
+    return UpstreamClient(
+        name,
+        timeout=timeout,
+        retries=Config.UPSTREAM_RETRIES,
+        backoff=Config.UPSTREAM_BACKOFF,
+        hedge_after=hedge_after,
+        failure_threshold=Config.UPSTREAM_BREAKER_FAILURES,
+        reset_timeout=Config.UPSTREAM_BREAKER_RESET,
+        pool_size=Config.NEWS_FETCH_WORKERS
+    )
+
+
+newsapi_client = create_client('newsapi', Config.NEWS_API_TIMEOUT, Config.NEWS_API_HEDGE_AFTER)
+tts_client = create_client('tts', Config.TTS_TIMEOUT, Config.TTS_HEDGE_AFTER)
+stt_client = create_client('stt', Config.STT_TIMEOUT)
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """起動後にバックグラウンドで重い初期化処理を順に実行し、進捗を記録する"""
+
+    def __init__(self):
+        self.steps = []
+        self._status = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started_at = None
+        self.finished_at = None
+
+    def add_step(self, name, func):
+        self.steps.append((name, func))
+        self._status[name] = {'name': name, 'status': 'pending', 'duration_ms': None, 'error': None}
+
+    def start(self):
+        # 何度呼ばれても1回だけ開始する（skip() 後は開始しない）
+        with self._lock:
+            if self._thread is not None or self.finished_at is not None:
+                return
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+
+    def skip(self):
+        # ウォームアップを行わない設定の場合は、各処理を省略済みとして準備完了にする
+        with self._lock:
+            if self._thread is not None:
+                return
+            for status in self._status.values():
+                status['status'] = 'skipped'
+            self.finished_at = time.monotonic()
+        logger.info("ウォームアップは無効です")
+
+    def _run(self):
+        logger.info("ウォームアップを開始します")
+        for name, func in self.steps:
+            with self._lock:
+                self._status[name]['status'] = 'running'
+            start = time.perf_counter()
+            try:
+                func()
+                status, error = 'done', None
+            except Exception as e:
+                logger.error("ウォームアップ処理 %s に失敗しました: %s", name, e)
+                status, error = 'failed', str(e)
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            with self._lock:
+                self._status[name].update(status=status, duration_ms=duration_ms, error=error)
+            logger.info("ウォームアップ処理 %s: %s（%sms）", name, status, duration_ms)
+        self.finished_at = time.monotonic()
+        logger.info("ウォームアップが完了しました（%.1fms）", (self.finished_at - self.started_at) * 1000)
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ready(self):
+        return self.finished_at is not None
+
+    def report(self):
+        with self._lock:
+            steps = [dict(self._status[name]) for name, _ in self.steps]
+        finished = sum(1 for step in steps if step['status'] in ('done', 'failed', 'skipped'))
+        return {
+            'ready': self.ready,
+            'started': self.started_at is not None,
+            'progress': finished / len(steps) if steps else 1.0,
+            'steps': steps
+        }
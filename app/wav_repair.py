@@ -0,0 +1,96 @@
+import mmap
+import os
+import struct
+from collections import namedtuple
+from contextlib import contextmanager
+
+# PCMとWAVE_FORMAT_EXTENSIBLE
+PCM_FORMAT_TAGS = (0x0001, 0xFFFE)
+
+WavInfo = namedtuple('WavInfo', ['channels', 'sample_rate', 'sample_width', 'data_offset', 'data_size', 'repaired'])
+
+
+class WavRepairError(Exception):
+    pass
+
+
+def _find_chunks(buf, file_size):
+    # RIFFヘッダーに続くチャンクをたどり、fmt と data の位置を返す
+    fmt = None
+    offset = 12
+    while offset + 8 <= file_size:
+        chunk_id = bytes(buf[offset:offset + 4])
+        chunk_size, = struct.unpack_from('<I', buf, offset + 4)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            if body + 16 > file_size:
+                break
+            fmt = struct.unpack_from('<HHIIHH', buf, body)
+        elif chunk_id == b'data':
+            return fmt, body
+        offset = body + chunk_size + (chunk_size & 1)
+    return fmt, None
+
+
+def read_info(buf, file_size):
+    # ヘッダーの値ではなくファイルの実際の長さからPCMの範囲を求める（書き込みはしない）
+    if file_size < 12 or bytes(buf[0:4]) != b'RIFF' or bytes(buf[8:12]) != b'WAVE':
+        raise WavRepairError("RIFF/WAVEヘッダーがありません")
+    fmt, data_offset = _find_chunks(buf, file_size)
+    if fmt is None:
+        raise WavRepairError("fmtチャンクが見つかりません")
+    if data_offset is None:
+        raise WavRepairError("dataチャンクが見つかりません")
+    format_tag, channels, sample_rate, _, block_align, bits = fmt
+    if format_tag not in PCM_FORMAT_TAGS or not channels or not sample_rate or bits % 8:
+        raise WavRepairError(f"対応していない形式です（format={format_tag:#x}, bits={bits}）")
+    block_align = block_align or channels * bits // 8
+
+    # 途中で途切れたフレームは切り捨てる
+    data_size = (file_size - data_offset) // block_align * block_align
+    repaired = (struct.unpack_from('<I', buf, 4)[0] != file_size - 8
+                or struct.unpack_from('<I', buf, data_offset - 4)[0] != data_size)
+    return WavInfo(channels, sample_rate, bits // 8, data_offset, data_size, repaired)
+
+
+def _map(f, access):
+    file_size = os.fstat(f.fileno()).st_size
+    if file_size == 0:
+        raise WavRepairError("ファイルが空です")
+    return mmap.mmap(f.fileno(), 0, access=access), file_size
+
+
+def repair_wav(path):
+    """RIFFとdataチャンクのサイズをファイルの実際の長さに合わせてその場で書き換え、WavInfo を返す
+
+    arecord をSIGTERMで止めると、サイズが0や0xFFFFFFFFのまま残ることがある。
+    書き換えるのはヘッダーの8バイトだけで、PCM部分は読み込まない。
+    """
+    with open(path, 'r+b') as f:
+        buf, file_size = _map(f, mmap.ACCESS_WRITE)
+        with buf:
+            info = read_info(buf, file_size)
+            if info.repaired:
+                struct.pack_into('<I', buf, 4, file_size - 8)
+                struct.pack_into('<I', buf, info.data_offset - 4, info.data_size)
+                buf.flush()
+            return info
+
+
+@contextmanager
+def open_pcm(path):
+    """WAVファイルをメモリマップし、(WavInfo, PCMのmemoryview) を返す
+
+    PCMはコピーせずにファイルのマップをそのまま参照するため、録音の長さに関わらず
+    メモリ使用量は一定。memoryview は with ブロックを抜けると使えなくなる。
+    """
+    with open(path, 'rb') as f:
+        buf, file_size = _map(f, mmap.ACCESS_READ)
+        with buf:
+            info = read_info(buf, file_size)
+            view = memoryview(buf)
+            try:
+                with view[info.data_offset:info.data_offset + info.data_size] as pcm:
+                    yield info, pcm
+            finally:
+                view.release()
@@ -0,0 +1,101 @@
+"""ログ出力がリクエスト処理に与える負荷の計測
+
+従来の設定（logging.basicConfig(level=DEBUG) で、すべてのログをリクエストの処理中に書式化して書き出す）と、
+app.log_pipeline（キュー経由で別スレッドから出力し、ディスクには WARNING 以上のみ書き出す）とで、
+/api/touch-detected と /api/get-news（偽NewsAPIサーバー・偽音声合成サーバーを使用）の処理時間と、
+ログファイルに書き出したバイト数を比較する。ログの設定はプロセス全体に効くため、方式ごとに別プロセスで計測する。
+
+    python benchmarks/bench_logging.py --requests 300
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from e2e_bench import percentile  # noqa: E402
+from fake_servers import FakeNewsAPIServer, FakeTTSServer  # noqa: E402
+
+
+def measure(mode, requests_count, workdir):
+    log_path = os.path.join(workdir, f'{mode}.log')
+    news = FakeNewsAPIServer().start()
+    tts = FakeTTSServer().start()
+    os.environ.update({
+        'NEWS_API_KEY': 'bench',
+        'NEWS_API_URL': news.url,
+        'TTS_BACKEND': 'http',
+        'TTS_HTTP_URL': tts.url,
+        'TTS_CACHE_DIR': os.path.join(workdir, f'tts-{mode}'),
+        'STATE_DB_PATH': os.path.join(workdir, f'state-{mode}.sqlite3'),
+        'ARTICLE_STORE_PATH': os.path.join(workdir, f'articles-{mode}.sqlite3'),
+        'TOUCH_SOCKET_PATH': '',
+        'WARMUP_ENABLED': '0',
+        'SOCKETIO_ENABLED': '0',
+        'LOG_FILE_PATH': log_path,
+        'LOG_CONSOLE_LEVEL': 'CRITICAL',
+    })
+    from app import create_app
+
+    app = create_app()
+    if mode == 'basicConfig':
+        # 従来の run.py・routes.py の設定（コンソールの代わりにファイルへ書き出す）
+        logging.getLogger('werkzeug').setLevel(logging.NOTSET)
+        logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                            handlers=[logging.FileHandler(log_path, encoding='utf-8')], force=True)
+
+    client = app.test_client()
+    headers = {'X-Device-Id': 'bench'}
+    client.get('/api/get-news', headers=headers)
+    samples = {'touch-detected': [], 'get-news': []}
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        client.post('/api/touch-detected', headers=headers)
+        samples['touch-detected'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        client.get('/api/get-news', headers=headers)
+        samples['get-news'].append(time.perf_counter() - start)
+
+    logging.shutdown()
+    news.stop()
+    tts.stop()
+    return {
+        'endpoints': {name: {'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                             'mean': sum(values) / len(values)} for name, values in samples.items()},
+        'log_bytes': os.path.getsize(log_path) if os.path.exists(log_path) else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--mode', choices=['basicConfig', 'log_pipeline'], help='（内部用）1つの方式だけを計測する')
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.requests, args.workdir)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='log-bench-')
+    print(f'{args.requests}回ずつ計測')
+    for mode in ('basicConfig', 'log_pipeline'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--requests', str(args.requests), '--workdir', workdir],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        for name, stats in result['endpoints'].items():
+            print(f'{mode:<13} {name:<15} mean={stats["mean"] * 1e6:8.0f}µs  p50={stats["p50"] * 1e6:8.0f}µs  '
+                  f'p95={stats["p95"] * 1e6:8.0f}µs')
+        print(f'{mode:<13} ログファイル {result["log_bytes"]:,} バイト')
+
+
+if __name__ == '__main__':
+    main()
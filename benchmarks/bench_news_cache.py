@@ -0,0 +1,56 @@
+"""ニュース検索結果キャッシュの動作確認とベンチマーク
+
+偽NewsAPIサーバーに対して、同一クエリへの同時リクエストが1回の上流呼び出しに
+まとまること、TTL切れ後は古い結果を即座に返しつつ更新することを確認する。
+
+    python benchmarks/bench_news_cache.py --latency 0.3 --clients 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_servers import FakeNewsAPIServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--ttl', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with FakeNewsAPIServer(latency=args.latency) as server:
+        os.environ['NEWS_API_URL'] = server.url
+        from app import routes
+        from app.news_cache import NewsCache, make_cache_key
+
+        cache = NewsCache(ttl=args.ttl, stale_ttl=60, max_entries=8)
+        params = {'q': '日本', 'sortBy': 'publishedAt', 'apiKey': 'dummy', 'domains': 'asahi.com', 'pageSize': 20}
+        key = make_cache_key(params['q'], params)
+
+        def request(_):
+            start = time.perf_counter()
+            cache.get_or_fetch(key, lambda: routes.fetch_news_data(params))
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(args.clients) as pool:
+            cold = list(pool.map(request, range(args.clients)))
+        print(f'同時{args.clients}件（キャッシュなし）: 最大 {max(cold) * 1000:.1f}ms, 上流呼び出し {server.request_count}回')
+
+        warm = [request(i) for i in range(100)]
+        print(f'キャッシュヒット100件: 平均 {sum(warm) / len(warm) * 1e6:.1f}us')
+
+        time.sleep(args.ttl)
+        stale = request(0)
+        print(f'TTL切れ直後: {stale * 1000:.2f}ms（古い結果を返し、バックグラウンドで更新）')
+        time.sleep(args.latency * 2)
+        print(f'上流呼び出し合計 {server.request_count}回')
+        print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
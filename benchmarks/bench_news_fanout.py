@@ -0,0 +1,81 @@
+"""複数媒体・複数ページのニュース取得のベンチマーク
+
+偽NewsAPIサーバーに対し、媒体数×ページ数の問い合わせを
+従来どおり1件ずつ（接続を使い回さない requests.get）行った場合と、
+app.news_sources.NewsFanout で並行して（keep-aliveのセッションで）行った場合の所要時間と、
+まとめた結果の件数・似た見出しとしてまとめた件数を比較する。
+
+    python benchmarks/bench_news_fanout.py --sources asahi.com mainichi.jp yomiuri.co.jp --pages 2 --latency 0.2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests  # noqa: E402
+
+from app.news_sources import MinHashDeduper, NewsFanout, make_session, merge_top_k, published_timestamp  # noqa: E402
+from fake_servers import FakeNewsAPIServer  # noqa: E402
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sources', nargs='+', default=['asahi.com', 'mainichi.jp', 'yomiuri.co.jp'])
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--k', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    params_list = [
+        {'q': '日本', 'domains': domain, 'page': page, 'pageSize': args.page_size}
+        for domain in args.sources for page in range(1, args.pages + 1)
+    ]
+    deduper = MinHashDeduper()
+    session = make_session(len(params_list))
+    fanout = NewsFanout(workers=len(params_list))
+
+    with FakeNewsAPIServer(latency=args.latency, articles=args.page_size) as server:
+        def fetch_plain(params):
+            response = requests.get(server.url, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        def fetch_pooled(params):
+            response = session.get(server.url, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        def run_sequential():
+            return [fetch_plain(params) for params in params_list]
+
+        def run_fanout():
+            return fanout.fetch_all(params_list, fetch_pooled)
+
+        print(f'{len(args.sources)}媒体 x {args.pages}ページ（1件あたり {args.latency * 1000:.0f}ms）')
+        for label, run in (('sequential requests.get', run_sequential), ('NewsFanout + Session', run_fanout)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = run()
+                timings.append(time.perf_counter() - start)
+            merge_start = time.perf_counter()
+            articles, collapsed = merge_top_k(
+                [result['articles'] for result in results], args.k, published_timestamp, deduper
+            )
+            merge_ms = (time.perf_counter() - merge_start) * 1000
+            fetched = sum(len(result['articles']) for result in results)
+            print(f'{label:<26} 取得 median={median(timings) * 1000:8.1f}ms  '
+                  f'{fetched}件 → {len(articles)}件（似た見出し {collapsed}件をまとめた, 統合 {merge_ms:.1f}ms）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""ネガティブワードフィルタのマイクロベンチマーク
+
+従来の filter_positive_news（全記事をnagisaで解析してリストを線形探索）と
+app.news_filter.NewsFilter を同じ記事セットで比較する。
+
+    python benchmarks/bench_news_filter.py --articles 20 --repeat 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import nagisa  # noqa: E402
+
+from config import Config  # noqa: E402
+from app.news_filter import NewsFilter  # noqa: E402
+
+POSITIVE_TITLES = [
+    '新しい図書館が駅前に開館、週末は家族連れでにぎわう',
+    '高校生が開発したアプリが全国大会で優勝',
+    '桜の開花が各地で始まる、見頃は来週末か',
+    '地元の農家が育てたイチゴが海外で人気に',
+    '100歳を迎えた女性、毎日の散歩が元気の秘訣',
+]
+NEGATIVE_TITLES = [
+    '高速道路で事故、3人けが',
+    '株価が大幅に下落、市場に不安広がる',
+    '大雨による災害で避難指示',
+]
+
+
+def legacy_filter_positive_news(title, description):
+    # 変更前の実装
+    text = title + ' ' + description
+    words = nagisa.tagging(text)
+    for word in words.words:
+        if word in Config.NEGATIVE_WORDS:
+            return False
+    return True
+
+
+def make_articles(n, seed):
+    rng = random.Random(seed)
+    articles = []
+    for i in range(n):
+        title = rng.choice(POSITIVE_TITLES + NEGATIVE_TITLES)
+        articles.append({
+            'title': f'{title}（{i}）',
+            'description': rng.choice(POSITIVE_TITLES),
+            'url': f'https://www.asahi.com/articles/bench{seed}-{i}.html',
+        })
+    return articles
+
+
+def bench(label, fn, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f'{label:<28} min={timings[0] * 1000:8.2f}ms  median={timings[len(timings) // 2] * 1000:8.2f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--articles', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # nagisaのモデル読み込みを計測から除外する
+    nagisa.tagging('ウォームアップ')
+
+    engine = NewsFilter(Config.NEGATIVE_WORDS)
+
+    def run_legacy(i):
+        articles = make_articles(args.articles, i)
+        return [a for a in articles if legacy_filter_positive_news(a['title'], a['description'])]
+
+    def run_engine_cold(i):
+        articles = make_articles(args.articles, i)
+        return NewsFilter(Config.NEGATIVE_WORDS).filter(articles)
+
+    warm_articles = make_articles(args.articles, 0)
+    engine.filter(warm_articles)
+
+    def run_engine_cached(i):
+        return engine.filter(warm_articles)
+
+    expected = run_legacy(0)
+    assert expected == NewsFilter(Config.NEGATIVE_WORDS).filter(make_articles(args.articles, 0))
+
+    print(f'{args.articles}件 x {args.repeat}回')
+    bench('legacy filter_positive_news', run_legacy, args.repeat)
+    bench('NewsFilter (cold cache)', run_engine_cold, args.repeat)
+    bench('NewsFilter (cached)', run_engine_cached, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""ニュース取得パイプラインのレイテンシ計測
+
+偽NewsAPIサーバーと遅延付きの偽音声合成を使い、従来の直列処理
+（取得 → 全件判定 → 3件整形 → 音声合成）とパイプライン処理の
+「記事が返るまで」「音声がそろうまで」の p50/p95 を比較する。
+
+    python benchmarks/bench_news_pipeline.py --runs 30 --tts-latency 0.3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_servers import FakeNewsAPIServer  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--api-latency', type=float, default=0.1)
+    parser.add_argument('--tts-latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    with FakeNewsAPIServer(latency=args.api_latency) as server:
+        os.environ['NEWS_API_URL'] = server.url
+        from app import routes
+        from app.news_audio import NewsAudio
+        from app.news_filter import NewsFilter
+        from app.news_pipeline import NewsPipeline
+        from app.tts_cache import TTSSegmentCache
+        from config import Config
+
+        def fake_synthesize(text, lang):
+            time.sleep(args.tts_latency)
+            return b'\xff\xfb' + text.encode('utf-8')
+
+        def build(workdir):
+            cache = TTSSegmentCache(workdir, 10 ** 8, 10 ** 8, synthesize=lambda text, lang: b'\xff\xfb')
+            # 定型文はアプリ起動時に事前合成されるので、計測前に済ませておく
+            cache.prefetch(routes.FIXED_PHRASES)
+            cache.synthesize = fake_synthesize
+            audio = NewsAudio(cache, workers=Config.TTS_WORKERS, max_entries=8)
+            engine = NewsFilter(Config.NEGATIVE_WORDS)
+            return audio, engine, NewsPipeline(engine, audio, filter_workers=Config.NEWS_FILTER_WORKERS)
+
+        def run_serial(i, workdir):
+            audio, engine, _ = build(workdir)
+            params = {'q': f'serial{i}', 'pageSize': 20}
+            start = time.perf_counter()
+            news_data = routes.fetch_news_data(params)
+            articles = engine.filter(routes.filter_source_articles(news_data['articles']))[:3]
+            articles_ready = time.perf_counter() - start
+            segments = routes.build_audio_segments([a['title'] for a in articles])
+            audio.render(segments)
+            return articles_ready, time.perf_counter() - start
+
+        def run_pipeline(i, workdir):
+            audio, _, pipeline = build(workdir)
+            params = {'q': f'pipeline{i}', 'pageSize': 20}
+            start = time.perf_counter()
+            articles, _ = pipeline.run(lambda: routes.fetch_news_data(params),
+                                       routes.filter_source_articles, routes.title_segment)
+            segments = routes.build_audio_segments([a['title'] for a in articles])
+            audio.register(segments)
+            articles_ready = time.perf_counter() - start
+            # ストリーミング配信では先頭セグメントがそろった時点で再生が始まる
+            stream = audio.stream(segments)
+            next(stream)
+            first_audio = time.perf_counter() - start
+            for _ in stream:
+                pass
+            return articles_ready, first_audio
+
+        for label, fn, audio_label in (('serial', run_serial, '音声完成'),
+                                       ('pipeline', run_pipeline, '先頭音声')):
+            ready, audio_ready = [], []
+            for i in range(args.runs):
+                with tempfile.TemporaryDirectory() as workdir:
+                    a, b = fn(i, workdir)
+                ready.append(a)
+                audio_ready.append(b)
+            print(f'{label:<9} 記事応答 p50={percentile(ready, 50) * 1000:7.1f}ms p95={percentile(ready, 95) * 1000:7.1f}ms'
+                  f'  {audio_label} p50={percentile(audio_ready, 50) * 1000:7.1f}ms'
+                  f' p95={percentile(audio_ready, 95) * 1000:7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
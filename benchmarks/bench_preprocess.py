@@ -0,0 +1,88 @@
+"""音声認識前の前処理（app.audio_preprocess）のベンチマーク
+
+前後に無音を含む 44.1kHz の合成録音（5〜30秒）に対して前処理の所要時間と、
+認識サービスへ送るWAVの大きさ・ローカルのSTTサーバーへの送信時間を前処理の有無で比較する。
+
+    python benchmarks/bench_preprocess.py --durations 5 10 20 30 --repeat 5
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import numpy as np  # noqa: E402
+import requests  # noqa: E402
+
+from app.audio_preprocess import AudioPreprocessor  # noqa: E402
+from fake_servers import FakeSTTServer  # noqa: E402
+
+
+def make_recording(seconds, sample_rate=44100, lead=1.5, tail=2.0, seed=0):
+    # 前後に無音（環境雑音と直流成分）を含み、その間に発話相当の音が入った録音
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    samples = rng.normal(0, 60, n) + 400
+    speech = (t >= lead) & (t < seconds - tail)
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    voice = 6000 * envelope * (np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 660 * t))
+    samples[speech] += voice[speech]
+    return np.clip(samples, -32768, 32767).astype('<i2').tobytes()
+
+
+def wav_bytes(pcm, sample_rate):
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buf.getvalue()
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--durations', type=float, nargs='*', default=[5, 10, 20, 30])
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--upload-bytes-per-sec', type=float, default=0,
+                        help='回線速度を模擬する場合の送信速度（0なら制限なし）')
+    args = parser.parse_args()
+
+    preprocessor = AudioPreprocessor()
+    session = requests.Session()
+    print(f'{"録音":>6} {"前処理":>10} {"WAV(前)":>10} {"WAV(後)":>10} {"送信(前)":>10} {"送信(後)":>10} {"音声長(後)":>10}')
+    with FakeSTTServer() as stt:
+        def upload(data):
+            session.post(stt.url, data=data, headers={'Content-Type': 'audio/wav'}).raise_for_status()
+            if args.upload_bytes_per_sec:
+                time.sleep(len(data) / args.upload_bytes_per_sec)
+
+        for seconds in args.durations:
+            pcm = make_recording(seconds, args.sample_rate)
+            processed, rate = preprocessor.process_pcm(pcm, args.sample_rate)
+            before, after = wav_bytes(pcm, args.sample_rate), wav_bytes(processed, rate)
+            preprocess_ms = median_ms(lambda: preprocessor.process_pcm(pcm, args.sample_rate), args.repeat)
+            upload_before = median_ms(lambda: upload(before), args.repeat)
+            upload_after = median_ms(lambda: upload(after), args.repeat)
+            print(f'{seconds:>5.0f}s {preprocess_ms:>8.1f}ms {len(before) / 1024:>8.0f}KB {len(after) / 1024:>8.0f}KB '
+                  f'{upload_before:>8.1f}ms {upload_after:>8.1f}ms {len(processed) / 2 / rate:>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""形態素解析のワーカープール（app.tokenizer_pool）のスループット計測
+
+複数の表示端末からの /api/get-news を想定し、--clients 個のスレッドが --batch 件ずつのテキストを
+解析に回す。従来どおりこのプロセスのスレッドで解析した場合（GILで直列になる）と、
+ワーカープロセス 1・2・4 個のプールで解析した場合の、1秒あたりの解析件数・バッチの待ち時間・
+ワーカーの常駐メモリ量（RSS と、共有しているモデルを按分した PSS）を比較する。
+
+    python benchmarks/bench_tokenizer_pool.py --clients 4 --batches 20 --batch 5
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.tokenizer_pool import TokenizerPool  # noqa: E402
+from e2e_bench import percentile  # noqa: E402
+from fake_servers import SAMPLE_TITLES  # noqa: E402
+
+
+def make_batches(clients, batches, size):
+    # キャッシュの効かない（毎回異なる）テキストを用意する
+    return [[[f'{SAMPLE_TITLES[(c + b + i) % len(SAMPLE_TITLES)]}（{c}-{b}-{i}）。{SAMPLE_TITLES[i % len(SAMPLE_TITLES)]}'
+              for i in range(size)] for b in range(batches)] for c in range(clients)]
+
+
+def run(label, tag_batch, work):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(batches):
+        for texts in batches:
+            start = time.perf_counter()
+            tag_batch(texts)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(work)) as pool:
+        for future in [pool.submit(client, batches) for batches in work]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    texts = sum(len(texts) for batches in work for texts in batches)
+    print(f'{label:<18} {texts / elapsed:8.1f}件/秒  バッチ p50={percentile(latencies, 50) * 1000:7.1f}ms  '
+          f'p95={percentile(latencies, 95) * 1000:7.1f}ms', end='')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--batch', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f'CPU {os.cpu_count()}コア, {args.clients}クライアント x {args.batches}バッチ x {args.batch}件')
+    import nagisa
+
+    nagisa.tagging('ウォームアップ')
+    run('threads (GIL)', lambda texts: [nagisa.tagging(text).words for text in texts],
+        make_batches(args.clients, args.batches, args.batch))
+    print()
+
+    for workers in args.workers:
+        pool = TokenizerPool(workers=workers, max_pending=workers * 4)
+        pool.warm()
+        run(f'pool {workers} workers', pool.tag_batch, make_batches(args.clients, args.batches, args.batch))
+        stats = pool.stats()
+        print(f'  ワーカー計 RSS {stats.get("workers_rss_bytes", 0) / 2 ** 20:6.1f}MB'
+              f' PSS {stats.get("workers_pss_bytes", 0) / 2 ** 20:6.1f}MB  待たされた投入 {stats["waited"]}件')
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""タッチから録音開始までの遅延の計測
+
+模擬タッチを app.touch_channel のソケット経由で送る方式と、従来の
+タッチごとに /api/touch-detected へHTTP POSTする方式とで、
+ブラウザ役のクライアントがSSEでタッチを受け取るまで・録音開始の応答を受け取るまでの時間を比較する。
+録音には benchmarks/fake_arecord.py を使う。
+
+    python benchmarks/bench_touch_latency.py --touches 20
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import requests  # noqa: E402
+
+from e2e_bench import make_sample_wav, percentile  # noqa: E402
+
+
+def sse_events(base_url, events):
+    # /events を読み続け、touch_detected を受け取った時刻とともにキューへ入れる
+    with requests.get(base_url + '/events', stream=True) as response:
+        event_type = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event: '):
+                event_type = line[7:]
+            elif line.startswith('data: ') and event_type == 'touch_detected':
+                events.put((time.monotonic(), json.loads(line[6:])))
+            elif not line:
+                event_type = None
+
+
+def summarize(label, samples):
+    print(f'{label:<34} p50={percentile(samples, 50) * 1000:7.2f}ms  p95={percentile(samples, 95) * 1000:7.2f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--touches', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='touch-bench-')
+    socket_path = os.path.join(workdir, 'touch.sock')
+    os.environ.update({
+        'TOUCH_SOCKET_PATH': socket_path,
+        'STATE_DB_PATH': os.path.join(workdir, 'state.sqlite3'),
+        'ARTICLE_STORE_PATH': os.path.join(workdir, 'articles.sqlite3'),
+        'TTS_CACHE_DIR': os.path.join(workdir, 'tts'),
+        'ARECORD_PATH': os.path.join(BENCH_DIR, 'fake_arecord.py'),
+        'FAKE_ARECORD_INPUT': make_sample_wav(os.path.join(workdir, 'sample.wav')),
+        'RECOGNIZER_BACKEND': 'stub',
+        'VAD_ENABLED': '0',
+        'WARMUP_ENABLED': '0',
+    })
+    from werkzeug.serving import make_server
+    from app import create_app, routes
+    from app.touch_channel import TouchBroadcaster
+
+    broadcaster = TouchBroadcaster(socket_path, debounce_ms=50).start()
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    events = queue.Queue()
+    threading.Thread(target=sse_events, args=(base_url, events), daemon=True).start()
+    deadline = time.monotonic() + 5
+    while not routes.touch_listener.connected and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.2)
+
+    session = requests.Session()
+    socket_delivery, socket_to_recording, http_delivery = [], [], []
+    for _ in range(args.touches):
+        # ソケット経由: タッチ → SSE受信 → 録音開始の要求（X-Touch-Seq付き）
+        event = broadcaster.touch('simulated')
+        received, data = events.get(timeout=5)
+        socket_delivery.append(received - event['mono'])
+        session.post(base_url + '/api/start-voice-input', headers={'X-Touch-Seq': str(data['seq'])}).raise_for_status()
+        socket_to_recording.append(time.monotonic() - event['mono'])
+        session.post(base_url + '/api/stop-voice-input')
+        time.sleep(args.interval)
+
+        # 従来方式: タッチごとに新しい接続でHTTP POST → SSE受信
+        start = time.monotonic()
+        requests.post(base_url + '/api/touch-detected', headers={'X-Device-Id': 'bench'})
+        received, _ = events.get(timeout=5)
+        http_delivery.append(received - start)
+
+    print(f'{args.touches}回のタッチ')
+    summarize('HTTP POST → SSE受信（従来）', http_delivery)
+    summarize('ソケット → SSE受信', socket_delivery)
+    summarize('ソケット → 録音開始の応答', socket_to_recording)
+    metrics = session.get(base_url + '/metrics').text
+    print('\n'.join(line for line in metrics.splitlines()
+                    if line.startswith('news_stage_duration_seconds_') and 'touch' in line and '_bucket' not in line))
+    broadcaster.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
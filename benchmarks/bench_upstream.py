@@ -0,0 +1,126 @@
+"""外部サービスの障害時の振る舞いの確認（app.upstream）
+
+偽サーバーの set_faults() で障害を起こし、次を確認する。
+
+    1. 応答の遅延（--slow-rate の割合を --slow-latency 秒遅らせる）に対する、
+       2本目の要求（hedge）の有無による UpstreamClient の所要時間の p50/p95/p99
+    2. NewsAPIが停止した場合の /api/get-news: 再試行の後に期限切れのキャッシュで答え（degraded）、
+       遮断後は上流を呼ばずに即座に答えること
+    3. NewsAPIの復旧後に音声合成サービスが停止した場合: 遮断の期限が過ぎたら再びNewsAPIから取得し、
+       読み上げ音声は合成済みのセグメント（定型文）だけで返すこと
+    4. 音声合成サービスの復旧後: 全セグメントの読み上げ音声を返すこと
+
+    python benchmarks/bench_upstream.py --calls 200 --slow-rate 0.05 --slow-latency 1.0
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from e2e_bench import percentile  # noqa: E402
+from fake_servers import FakeNewsAPIServer, FakeTTSServer  # noqa: E402
+
+
+def hedging(args, news):
+    from app.upstream import UpstreamClient
+
+    news.set_faults(slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=1)
+    print(f'1. {args.slow_rate * 100:.0f}% のリクエストを {args.slow_latency * 1000:.0f}ms 遅らせた場合（{args.calls}回）')
+    for label, hedge_after in (('hedge なし', None), (f'hedge {args.hedge_after * 1000:.0f}ms', args.hedge_after)):
+        client = UpstreamClient('bench', timeout=args.slow_latency * 2, hedge_after=hedge_after)
+        timings = []
+        for i in range(args.calls):
+            start = time.perf_counter()
+            client.get(news.url, params={'q': f'hedge{i}', 'pageSize': 5}).raise_for_status()
+            timings.append(time.perf_counter() - start)
+        stats = client.stats()
+        print(f'   {label:<14} p50={percentile(timings, 50) * 1000:7.1f}ms  p95={percentile(timings, 95) * 1000:7.1f}ms  '
+              f'p99={percentile(timings, 99) * 1000:7.1f}ms  （2本目 {stats["hedged"]}回, うち先着 {stats["hedge_wins"]}回）')
+    news.set_faults()
+
+
+def get_news(client, label):
+    start = time.perf_counter()
+    response = client.get('/api/get-news')
+    elapsed = (time.perf_counter() - start) * 1000
+    data = response.get_json()
+    audio = client.get(data['audio_url']) if response.status_code == 200 and data.get('audio_url') else None
+    print(f'   {label:<30} HTTP {response.status_code}  {elapsed:7.1f}ms  '
+          f'degraded={data.get("pipeline", {}).get("degraded")}  '
+          f'audio={"%d bytes" % len(audio.data) if audio is not None else None}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--slow-rate', type=float, default=0.05)
+    parser.add_argument('--slow-latency', type=float, default=1.0)
+    parser.add_argument('--hedge-after', type=float, default=0.1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='upstream-bench-')
+    news = FakeNewsAPIServer(latency=0.02).start()
+    tts = FakeTTSServer(latency=0.02).start()
+    os.environ.update({
+        'NEWS_API_KEY': 'bench',
+        'NEWS_API_URL': news.url,
+        'TTS_BACKEND': 'http',
+        'TTS_HTTP_URL': tts.url,
+        'TTS_CACHE_DIR': os.path.join(workdir, 'tts'),
+        'STATE_DB_PATH': os.path.join(workdir, 'state.sqlite3'),
+        'ARTICLE_STORE_PATH': os.path.join(workdir, 'articles.sqlite3'),
+        'ARTICLE_STORE_FRESH_SECONDS': '0',
+        'NEWS_CACHE_TTL': '1',
+        'NEWS_CACHE_STALE_TTL': '0',
+        'UPSTREAM_BREAKER_FAILURES': '3',
+        'UPSTREAM_BREAKER_RESET': '2',
+        'TOUCH_SOCKET_PATH': '',
+        'WARMUP_ENABLED': '0',
+        'SOCKETIO_ENABLED': '0',
+        'LOG_CONSOLE_LEVEL': 'ERROR',
+    })
+    hedging(args, news)
+
+    from app import create_app, routes
+
+    app = create_app()
+    client = app.test_client()
+    routes.state_store.set_last_text('default', '図書館')
+    print('2. NewsAPIの停止')
+    get_news(client, '正常時')
+    time.sleep(1.1)
+    news.set_faults(error_rate=1.0)
+    requests_before = news.request_count
+    for i in range(4):
+        get_news(client, f'停止中 {i + 1}回目')
+    print(f'   NewsAPIへのリクエスト: {news.request_count - requests_before}回, 遮断中に呼ばなかった回数: '
+          f'{routes.newsapi_client.breaker.rejected}回')
+
+    print('3. NewsAPIの復旧・音声合成サービスの停止')
+    news.set_faults()
+    time.sleep(2.1)
+    tts.set_faults(error_rate=1.0)
+    for text in ('synthesize-1', 'synthesize-2'):
+        try:
+            routes.tts_cache.get(text, 'ja')
+        except Exception:
+            pass
+    print(f'   音声合成サービスの遮断: {routes.tts_client.breaker.is_open}')
+    routes.state_store.set_last_text('default', '桜')
+    get_news(client, '遮断の期限後・音声は定型文のみ')
+
+    print('4. 音声合成サービスの復旧')
+    tts.set_faults()
+    time.sleep(2.1)
+    routes.news_cache.clear()
+    get_news(client, '遮断の期限後')
+    news.stop()
+    tts.stop()
+
+
+if __name__ == '__main__':
+    main()
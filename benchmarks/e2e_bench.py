@@ -0,0 +1,249 @@
+"""音声入力 → ニュース取得 → 読み上げ の一連の処理をオフラインで計測するベンチマーク
+
+create_app() で起動したアプリを、NewsAPI・音声合成・音声認識の代わりとなる
+ローカルの偽サーバーに接続し、各クライアントが次の流れを繰り返す。
+
+    1. 音声の送信（--mode upload: /api/speech-to-text に WAV をアップロード、
+       --mode record: /api/start-voice-input → 録音 → /api/stop-voice-input）
+    2. /api/get-news
+    3. 返ってきた audio_url から読み上げ音声を最後まで受信
+
+エンドポイントごと・パイプラインの段階ごとの p50/p95/p99 とスループットを表示し、
+--output に JSON で書き出す（リリース間の比較用）。
+
+    python benchmarks/e2e_bench.py --clients 4 --iterations 10 --news-latency 0.2 \\
+        --tts-latency 0.3 --stt-latency 0.5 --wav recordings/*.wav --output bench_results.json
+
+--mode upload には ffmpeg が必要（FFMPEG_PATH で指定可能）。
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, ROOT_DIR)
+
+import requests  # noqa: E402
+
+from fake_servers import FakeNewsAPIServer, FakeSTTServer, FakeTTSServer  # noqa: E402
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(math.ceil(p / 100 * len(values))) - 1)]
+
+
+def summarize(samples, wall_seconds):
+    return {
+        'count': len(samples),
+        'throughput_per_s': round(len(samples) / wall_seconds, 3) if wall_seconds else None,
+        'p50_ms': _ms(percentile(samples, 50)),
+        'p95_ms': _ms(percentile(samples, 95)),
+        'p99_ms': _ms(percentile(samples, 99)),
+        'max_ms': _ms(max(samples) if samples else None),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def make_sample_wav(path, seconds=2.0, rate=16000):
+    # 無音・発話相当の音・無音からなる合成音声（録音ファイルが指定されない場合に使う）
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        amp = 8000 if 0.3 <= t < seconds - 0.8 else 0
+        frames += struct.pack('<h', int(amp * math.sin(2 * math.pi * 300 * t)))
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(bytes(frames))
+    return path
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints = defaultdict(list)
+        self.stages = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, ok):
+        with self._lock:
+            if ok:
+                self.endpoints[endpoint].append(seconds)
+            else:
+                self.errors[endpoint] += 1
+
+    def add_stages(self, timings_ms):
+        with self._lock:
+            for name, value in timings_ms.items():
+                self.stages[name].append(value / 1000)
+
+
+def timed(recorder, endpoint, func):
+    start = time.perf_counter()
+    try:
+        response = func()
+        ok = response.status_code < 400
+    except requests.RequestException:
+        response, ok = None, False
+    recorder.add(endpoint, time.perf_counter() - start, ok)
+    return response if ok else None
+
+
+def run_client(base_url, client_id, args, wav_files, recorder):
+    session = requests.Session()
+    headers = {'X-Device-Id': f'bench-{client_id}'}
+    for i in range(args.iterations):
+        loop_start = time.perf_counter()
+        wav_path = wav_files[(client_id + i) % len(wav_files)]
+        if args.mode == 'upload':
+            with open(wav_path, 'rb') as f:
+                data = f.read()
+            response = timed(recorder, 'speech-to-text', lambda: session.post(
+                base_url + '/api/speech-to-text', files={'audio': (os.path.basename(wav_path), data)}, headers=headers))
+        else:
+            timed(recorder, 'start-voice-input', lambda: session.post(base_url + '/api/start-voice-input', headers=headers))
+            time.sleep(args.record_seconds)
+            response = timed(recorder, 'stop-voice-input', lambda: session.post(
+                base_url + '/api/stop-voice-input', headers=headers))
+        if response is None:
+            continue
+
+        response = timed(recorder, 'get-news', lambda: session.get(base_url + '/api/get-news', headers=headers))
+        if response is None:
+            continue
+        news = response.json()
+        recorder.add_stages(news.get('pipeline', {}).get('timings_ms', {}))
+
+        audio_start = time.perf_counter()
+        try:
+            with session.get(base_url + news['audio_url'], stream=True) as audio:
+                chunks = audio.iter_content(chunk_size=4096)
+                next(chunks, None)
+                recorder.add('news-audio (first byte)', time.perf_counter() - audio_start, audio.ok)
+                for _ in chunks:
+                    pass
+                recorder.add('news-audio', time.perf_counter() - audio_start, audio.ok)
+        except requests.RequestException:
+            recorder.add('news-audio', 0, False)
+        recorder.add('loop', time.perf_counter() - loop_start, True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['upload', 'record'], default='upload')
+    parser.add_argument('--clients', type=int, default=2)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--wav', nargs='*', default=[], help='再生する録音ファイル（省略時は合成音声）')
+    parser.add_argument('--record-seconds', type=float, default=1.0, help='--mode record での録音時間')
+    parser.add_argument('--news-latency', type=float, default=0.2)
+    parser.add_argument('--news-articles', type=int, default=20)
+    parser.add_argument('--tts-latency', type=float, default=0.3)
+    parser.add_argument('--tts-bytes', type=int, default=12000)
+    parser.add_argument('--stt-latency', type=float, default=0.5)
+    parser.add_argument('--stt-text', default='ニュース{n}', help='{n} を含めると毎回異なる検索ワードになる')
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='news-bench-')
+    wav_files = args.wav or [make_sample_wav(os.path.join(workdir, 'sample.wav'))]
+
+    news = FakeNewsAPIServer(latency=args.news_latency, articles=args.news_articles).start()
+    tts = FakeTTSServer(latency=args.tts_latency, payload_bytes=args.tts_bytes).start()
+    stt = FakeSTTServer(latency=args.stt_latency, text=args.stt_text).start()
+
+    # アプリの読み込み前に設定を環境変数で差し替える
+    os.environ.update({
+        'NEWS_API_KEY': 'bench',
+        'NEWS_API_URL': news.url,
+        'TTS_BACKEND': 'http',
+        'TTS_HTTP_URL': tts.url,
+        'RECOGNIZER_BACKEND': 'http',
+        'STT_HTTP_URL': stt.url,
+        'TTS_CACHE_DIR': os.path.join(workdir, 'tts'),
+        'STATE_DB_PATH': os.path.join(workdir, 'state.sqlite3'),
+        'ARTICLE_STORE_PATH': os.path.join(workdir, 'articles.sqlite3'),
+        'ARECORD_PATH': os.path.join(BENCH_DIR, 'fake_arecord.py'),
+        'FAKE_ARECORD_INPUT': wav_files[0],
+        'VAD_ENABLED': '0',
+    })
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    # ウォームアップ（モデル読み込み・定型文の合成）を計測前に済ませる
+    warmup = app.extensions['warmup']
+    warmup.start()
+    warmup.wait()
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        for future in [pool.submit(run_client, base_url, c, args, wav_files, recorder) for c in range(args.clients)]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    server.shutdown()
+    for fake in (news, tts, stt):
+        fake.stop()
+
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'parameters': vars(args),
+        'wall_seconds': round(wall, 3),
+        'endpoints': {name: dict(summarize(samples, wall), errors=recorder.errors.get(name, 0))
+                      for name, samples in sorted(recorder.endpoints.items())},
+        'stages': {name: summarize(samples, wall) for name, samples in sorted(recorder.stages.items())},
+        'upstream_requests': {'newsapi': news.request_count, 'tts': tts.request_count, 'stt': stt.request_count},
+    }
+    for name, count in recorder.errors.items():
+        results['endpoints'].setdefault(name, dict(summarize([], wall), errors=count))
+
+    print(f'{"endpoint / stage":<26}{"count":>7}{"err":>5}{"req/s":>8}{"p50":>10}{"p95":>10}{"p99":>10}')
+    for section in ('endpoints', 'stages'):
+        for name, summary in results[section].items():
+            print(f'{name:<26}{summary["count"]:>7}{summary.get("errors", 0):>5}'
+                  f'{summary["throughput_per_s"] or 0:>8.2f}'
+                  + ''.join(f'{summary[k] if summary[k] is not None else "-":>10}' for k in ('p50_ms', 'p95_ms', 'p99_ms')))
+    print(f'上流リクエスト数: {results["upstream_requests"]}')
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'結果を {args.output} に書き出しました')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""arecord の代わりに、指定した音声ファイルの生PCMを標準出力へ書き出す偽コマンド
+
+ファイルを出し終えた後は、停止されるまで無音を出し続ける（実際のマイクと同じ挙動）。
+出力ファイルが指定された場合は、長さ未確定のWAVヘッダー（サイズ欄が最大値）を付けて書き込む。
+
+    ARECORD_PATH=benchmarks/fake_arecord.py FAKE_ARECORD_INPUT=sample.wav python run.py
+
+環境変数:
+    FAKE_ARECORD_INPUT  WAVファイルまたは生PCM（S16_LE, モノラル）のパス
+    FAKE_ARECORD_SPEED  再生速度の倍率（1.0で実時間、0で待ち時間なし）
+    FAKE_ARECORD_TAIL   ファイル後に出力する無音の秒数（省略時は停止まで無限）
+"""
+import os
+import struct
+import sys
+import time
+import wave
+
+CHUNK_MS = 20
+
+
+def parse_rate(argv):
+    for i, arg in enumerate(argv):
+        if arg == '-r' and i + 1 < len(argv):
+            return int(argv[i + 1])
+    return 8000
+
+
+def parse_output(argv):
+    # オプションの値ではない最後の引数を出力ファイルとみなす
+    skip = False
+    output = None
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in ('-f', '-c', '-r', '-t', '-d', '-D'):
+            skip = True
+        elif not arg.startswith('-'):
+            output = arg
+    return output
+
+
+def wav_header(rate):
+    # arecordが長さ不明で録音を始めたときと同じく、サイズ欄を最大値にしておく
+    return (b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, rate, rate * 2, 2, 16)
+            + b'data' + struct.pack('<I', 0xFFFFFFFF))
+
+
+def load_pcm(path):
+    if not path:
+        return b''
+    try:
+        with wave.open(path, 'rb') as wav_file:
+            return wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def main():
+    rate = parse_rate(sys.argv[1:])
+    speed = float(os.environ.get('FAKE_ARECORD_SPEED', '1.0'))
+    tail = os.environ.get('FAKE_ARECORD_TAIL')
+    pcm = load_pcm(os.environ.get('FAKE_ARECORD_INPUT'))
+    chunk_bytes = rate * CHUNK_MS // 1000 * 2
+    silence = bytes(chunk_bytes)
+    tail_chunks = int(float(tail) * 1000 / CHUNK_MS) if tail else None
+
+    output = parse_output(sys.argv[1:])
+    out = open(output, 'wb') if output else sys.stdout.buffer
+    if output:
+        out.write(wav_header(rate))
+    start = time.monotonic()
+    sent = 0
+    try:
+        offset = 0
+        while tail_chunks is None or tail_chunks > 0:
+            if offset < len(pcm):
+                chunk = pcm[offset:offset + chunk_bytes]
+                offset += len(chunk)
+            else:
+                chunk = silence
+                if tail_chunks is not None:
+                    tail_chunks -= 1
+            out.write(chunk)
+            out.flush()
+            sent += len(chunk)
+            if speed > 0:
+                delay = start + sent / 2 / rate / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""ベンチマーク・動作確認用のローカル偽サーバー
+
+外部サービスの代わりに 127.0.0.1 の空きポートで起動し、応答遅延やペイロードの
+大きさを指定できる。set_faults() で、一定の割合のリクエストに障害（503・応答の遅延・接続の切断）を起こせる。
+
+    with FakeNewsAPIServer(latency=0.2, articles=20) as server:
+        os.environ['NEWS_API_URL'] = server.url
+        server.set_faults(error_rate=0.5)       # 半数のリクエストに503を返す
+        server.set_faults(slow_rate=0.1, slow_latency=2.0)  # 1割のリクエストだけ2秒遅らせる
+"""
+import json
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SAMPLE_TITLES = [
+    '新しい図書館が駅前に開館、週末は家族連れでにぎわう',
+    '高校生が開発したアプリが全国大会で優勝',
+    '高速道路で事故、3人けが',
+    '桜の開花が各地で始まる、見頃は来週末か',
+    '株価が大幅に下落、市場に不安広がる',
+    '地元の農家が育てたイチゴが海外で人気に',
+    '100歳を迎えた女性、毎日の散歩が元気の秘訣',
+    '大雨による災害で避難指示',
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def begin(self):
+        # リクエストを数え、障害を起こした（応答済み・切断済みの）場合は True を返す
+        fault = self.fake.record_request()
+        if fault == 'error':
+            self._send(503, b'{"status": "error", "code": "injectedFault"}')
+            return True
+        if fault == 'drop':
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return True
+        return False
+
+
+class FakeServer:
+    handler_class = _Handler
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.request_count = 0
+        self.fault_count = 0
+        self.set_faults()
+        self._count_lock = threading.Lock()
+        handler = type('Handler', (self.handler_class,), {'fake': self})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def set_faults(self, error_rate=0.0, slow_rate=0.0, slow_latency=2.0, drop_rate=0.0, seed=None):
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+
+    def record_request(self):
+        # 起こす障害（'error'・'drop'・'slow'、または None）を返す。遅延はここで待つ
+        with self._count_lock:
+            self.request_count += 1
+            roll = self._random.random()
+            fault = None
+            if roll < self.error_rate:
+                fault = 'error'
+            elif roll < self.error_rate + self.drop_rate:
+                fault = 'drop'
+            elif roll < self.error_rate + self.drop_rate + self.slow_rate:
+                fault = 'slow'
+            if fault is not None:
+                self.fault_count += 1
+        if fault == 'slow':
+            time.sleep(self.slow_latency)
+        if self.latency:
+            time.sleep(self.latency)
+        return fault
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _NewsAPIHandler(_Handler):
+    def do_GET(self):
+        if self.begin():
+            return
+        query = parse_qs(urlparse(self.path).query)
+        self._send(200, json.dumps(self.fake.make_response(query), ensure_ascii=False).encode('utf-8'))
+
+
+class FakeNewsAPIServer(FakeServer):
+    """NewsAPI /v2/everything の代わりに記事一覧を返す"""
+
+    handler_class = _NewsAPIHandler
+
+    def __init__(self, latency=0.0, articles=20, description_size=80, domain='asahi.com'):
+        super().__init__(latency)
+        self.articles = articles
+        self.description_size = description_size
+        self.domain = domain
+
+    @property
+    def url(self):
+        return self.base_url + '/v2/everything'
+
+    def make_response(self, query):
+        q = query.get('q', [''])[0]
+        page = int(query.get('page', ['1'])[0])
+        size = min(int(query.get('pageSize', [str(self.articles)])[0]), self.articles)
+        # domains を指定された場合はその媒体の記事として返す。既定の媒体以外は見出しに媒体名を付け、
+        # 媒体をまたいだ「ほぼ同じ見出し」の記事になる
+        domain = query.get('domains', [self.domain])[0].split(',')[0]
+        suffix = '' if domain == self.domain else f' - {domain}'
+        now = datetime.now(timezone.utc)
+        articles = []
+        for i in range(size):
+            n = (page - 1) * size + i
+            title = f'{SAMPLE_TITLES[n % len(SAMPLE_TITLES)]}（{q} {n}）{suffix}'
+            articles.append({
+                'source': {'id': None, 'name': domain},
+                'title': title,
+                'description': (title * (self.description_size // len(title) + 1))[:self.description_size],
+                'url': f'https://www.{domain}/articles/{q}-{n}.html',
+                'publishedAt': (now - timedelta(minutes=n)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            })
+        return {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+
+
+class _TTSHandler(_Handler):
+    def do_GET(self):
+        if self.begin():
+            return
+        self._send(200, self.fake.make_audio(), content_type='audio/mpeg')
+
+
+class FakeTTSServer(FakeServer):
+    """音声合成の代わりに、指定サイズのMP3フレーム列を返す"""
+
+    handler_class = _TTSHandler
+
+    # MPEG-2 Layer III, 24kHz, 32kbps, モノラルのフレームヘッダー（gTTSの出力と同じ形式）
+    FRAME_HEADER = b'\xff\xf3\x44\xc4'
+    FRAME_SIZE = 96
+
+    def __init__(self, latency=0.0, payload_bytes=12000):
+        super().__init__(latency)
+        self.payload_bytes = payload_bytes
+
+    @property
+    def url(self):
+        return self.base_url + '/tts'
+
+    def make_audio(self):
+        frame = self.FRAME_HEADER + bytes(self.FRAME_SIZE - len(self.FRAME_HEADER))
+        return frame * max(1, self.payload_bytes // self.FRAME_SIZE)
+
+
+class _STTHandler(_Handler):
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if self.begin():
+            return
+        body = json.dumps({'text': self.fake.next_text()}, ensure_ascii=False).encode('utf-8')
+        self._send(200, body)
+
+
+class FakeSTTServer(FakeServer):
+    """音声認識の代わりに、受け取った音声を読み捨てて決まった文字列を返す
+
+    text に {n} を含めると、リクエストごとに異なる認識結果（検索ワード）になる。
+    """
+
+    handler_class = _STTHandler
+
+    def __init__(self, latency=0.0, text='ニュース{n}'):
+        super().__init__(latency)
+        self.text = text
+
+    @property
+    def url(self):
+        return self.base_url + '/recognize'
+
+    def next_text(self):
+        return self.text.format(n=self.request_count)
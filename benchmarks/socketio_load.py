@@ -0,0 +1,165 @@
+"""Socket.IOによるプッシュ配信の負荷試験（ヘッドレスのクライアント）
+
+端末IDの異なる --clients 個の python-socketio クライアントが /pipeline 名前空間に接続し、
+録音の開始・停止を繰り返して、停止要求から次のイベントを受け取るまでの時間を計測する。
+
+    recognition_result / article_accepted（最初の1件）/ news_ready / audio_ready
+
+比較として、Socket.IOに接続せずに従来どおり停止 → /api/get-news → 音声の受信完了 を行った場合も計測する。
+--url を省略すると、偽サーバー（NewsAPI・音声合成・音声認識）につないだアプリをこのプロセス内で起動する。
+既に起動しているサーバー（gunicorn -k eventlet など）に対して試す場合は --url で指定する。
+
+    python benchmarks/socketio_load.py --clients 8 --iterations 5
+    python benchmarks/socketio_load.py --url http://127.0.0.1:5000 --clients 20
+"""
+import argparse
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import requests  # noqa: E402
+import socketio  # noqa: E402
+
+from e2e_bench import make_sample_wav, percentile  # noqa: E402
+from fake_servers import FakeNewsAPIServer, FakeSTTServer, FakeTTSServer  # noqa: E402
+
+PUSH_EVENTS = ('recognition_result', 'article_accepted', 'news_ready', 'audio_ready')
+
+
+def start_local_app(args, workdir):
+    news = FakeNewsAPIServer(latency=args.news_latency).start()
+    tts = FakeTTSServer(latency=args.tts_latency).start()
+    stt = FakeSTTServer(latency=args.stt_latency).start()
+    os.environ.update({
+        'NEWS_API_KEY': 'bench',
+        'NEWS_API_URL': news.url,
+        'TTS_BACKEND': 'http',
+        'TTS_HTTP_URL': tts.url,
+        'RECOGNIZER_BACKEND': 'http',
+        'STT_HTTP_URL': stt.url,
+        'TTS_CACHE_DIR': os.path.join(workdir, 'tts'),
+        'STATE_DB_PATH': os.path.join(workdir, 'state.sqlite3'),
+        'ARTICLE_STORE_PATH': os.path.join(workdir, 'articles.sqlite3'),
+        'ARECORD_PATH': os.path.join(BENCH_DIR, 'fake_arecord.py'),
+        'FAKE_ARECORD_INPUT': make_sample_wav(os.path.join(workdir, 'sample.wav')),
+        'TOUCH_SOCKET_PATH': '',
+        'VAD_ENABLED': '0',
+        'WARMUP_ENABLED': '0',
+        'SOCKETIO_ENABLED': '1',
+        'SOCKETIO_ASYNC_MODE': 'threading',
+    })
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', [server, news, tts, stt]
+
+
+def record(session, base_url, headers, seconds):
+    session.post(base_url + '/api/start-voice-input', headers=headers).raise_for_status()
+    time.sleep(seconds)
+    stop_start = time.monotonic()
+    response = session.post(base_url + '/api/stop-voice-input', headers=headers)
+    return stop_start, response
+
+
+def run_socket_client(base_url, client_id, args, samples):
+    device_id = f'load-{client_id}'
+    headers = {'X-Device-Id': device_id}
+    events = queue.Queue()
+    client = socketio.Client(reconnection=False)
+    for name in PUSH_EVENTS:
+        client.on(name, lambda data, name=name: events.put((name, time.monotonic())), namespace='/pipeline')
+    client.connect(base_url, namespaces=['/pipeline'], auth={'device': device_id}, transports=['websocket'])
+    session = requests.Session()
+    try:
+        for _ in range(args.iterations):
+            stop_start, response = record(session, base_url, headers, args.record_seconds)
+            if not response.ok:
+                samples['socket error'].append(0)
+                continue
+            seen = set()
+            while 'audio_ready' not in seen:
+                try:
+                    name, received = events.get(timeout=args.timeout)
+                except queue.Empty:
+                    samples['socket timeout'].append(0)
+                    break
+                if name not in seen:
+                    seen.add(name)
+                    samples[f'socket {name}'].append(received - stop_start)
+    finally:
+        client.disconnect()
+
+
+def run_fetch_client(base_url, client_id, args, samples):
+    headers = {'X-Device-Id': f'fetch-{client_id}'}
+    session = requests.Session()
+    for _ in range(args.iterations):
+        stop_start, response = record(session, base_url, headers, args.record_seconds)
+        if not response.ok:
+            samples['fetch error'].append(0)
+            continue
+        samples['fetch stop-voice-input'].append(time.monotonic() - stop_start)
+        news = session.get(base_url + '/api/get-news', headers=headers).json()
+        samples['fetch get-news'].append(time.monotonic() - stop_start)
+        session.get(base_url + news['audio_url']).raise_for_status()
+        samples['fetch news-audio'].append(time.monotonic() - stop_start)
+
+
+def run_phase(run_client, base_url, args, samples):
+    with ThreadPoolExecutor(args.clients) as pool:
+        for future in [pool.submit(run_client, base_url, c, args, samples) for c in range(args.clients)]:
+            future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=None, help='計測するサーバー（省略時はこのプロセス内で起動）')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--record-seconds', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=15.0)
+    parser.add_argument('--news-latency', type=float, default=0.2)
+    parser.add_argument('--tts-latency', type=float, default=0.3)
+    parser.add_argument('--stt-latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    resources = []
+    base_url = args.url
+    if base_url is None:
+        base_url, resources = start_local_app(args, tempfile.mkdtemp(prefix='socketio-load-'))
+
+    samples = defaultdict(list)
+    start = time.monotonic()
+    run_phase(run_fetch_client, base_url, args, samples)
+    run_phase(run_socket_client, base_url, args, samples)
+    wall = time.monotonic() - start
+
+    print(f'{args.clients}クライアント x {args.iterations}回（停止要求からの時間, {wall:.1f}秒）')
+    for name, values in samples.items():
+        if name.endswith(('error', 'timeout')):
+            print(f'{name:<34} {len(values)}件')
+            continue
+        print(f'{name:<34} n={len(values):<4} p50={percentile(values, 50) * 1000:8.1f}ms  '
+              f'p95={percentile(values, 95) * 1000:8.1f}ms')
+
+    for resource in resources:
+        if hasattr(resource, 'shutdown'):
+            resource.shutdown()
+        else:
+            resource.stop()
+
+
+if __name__ == '__main__':
+    main()
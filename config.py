@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,6 +7,7 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     NEWS_API_KEY = os.environ.get('NEWS_API_KEY')
+    NEWS_API_URL = os.environ.get('NEWS_API_URL') or 'https://newsapi.org/v2/everything'
     
     # ネガティブワードのリストを追加
     NEGATIVE_WORDS = [
@@ -14,3 +16,146 @@ class Config:
         '貧困', '飢餓', '失業', '倒壊', '崩壊', '破壊', '悪化', '低下', '下落', '減少'
     ]
 
+    # ネガティブ判定結果のキャッシュ件数（記事URL/タイトル単位）
+    NEWS_FILTER_CACHE_SIZE = int(os.environ.get('NEWS_FILTER_CACHE_SIZE', 1024))
+    # ニュース取得パイプラインで記事の判定に使うスレッド数
+    NEWS_FILTER_WORKERS = int(os.environ.get('NEWS_FILTER_WORKERS', 2))
+
+    # ニュース検索結果キャッシュ（秒）
+    NEWS_CACHE_TTL = int(os.environ.get('NEWS_CACHE_TTL', 300))
+    NEWS_CACHE_STALE_TTL = int(os.environ.get('NEWS_CACHE_STALE_TTL', 1800))
+    NEWS_CACHE_MAX_ENTRIES = int(os.environ.get('NEWS_CACHE_MAX_ENTRIES', 64))
+
+    # 音声セグメントキャッシュ
+    # 音声合成バックエンド: 'gtts' または 'http'（TTS_HTTP_URL のサーバーを使う）
+    TTS_BACKEND = os.environ.get('TTS_BACKEND', 'gtts')
+    TTS_HTTP_URL = os.environ.get('TTS_HTTP_URL')
+    TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'news_tts_cache')
+    TTS_CACHE_MAX_DISK_BYTES = int(os.environ.get('TTS_CACHE_MAX_DISK_BYTES', 50 * 1024 * 1024))
+    TTS_CACHE_MAX_MEMORY_BYTES = int(os.environ.get('TTS_CACHE_MAX_MEMORY_BYTES', 8 * 1024 * 1024))
+
+    # ニュース音声の並列合成スレッド数と、保持する音声IDの件数
+    TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 3))
+    NEWS_AUDIO_MAX_ENTRIES = int(os.environ.get('NEWS_AUDIO_MAX_ENTRIES', 32))
+
+    # SSE（/events）の設定
+    SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', 3000))
+    SSE_HISTORY_SIZE = int(os.environ.get('SSE_HISTORY_SIZE', 100))
+    SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', 64))
+    # 他のワーカーが共有ストアに追記したイベントを確認する間隔（秒）
+    EVENT_RELAY_INTERVAL = float(os.environ.get('EVENT_RELAY_INTERVAL', 0.1))
+
+    # 録音方式: 'stream'（arecordの出力をメモリ上で処理）または 'file'（一時WAVファイル）
+    CAPTURE_MODE = os.environ.get('CAPTURE_MODE', 'stream')
+    ARECORD_PATH = os.environ.get('ARECORD_PATH', 'arecord')
+    RECORD_SAMPLE_RATE = int(os.environ.get('RECORD_SAMPLE_RATE', 44100))
+    RECORD_BUFFER_SECONDS = int(os.environ.get('RECORD_BUFFER_SECONDS', 30))
+    RECORD_MAX_SECONDS = int(os.environ.get('RECORD_MAX_SECONDS', 30))
+    # 停止されないまま RECORD_MAX_SECONDS + この秒数が過ぎた録音は、次の録音開始時に破棄する
+    RECORDING_STALE_MARGIN = int(os.environ.get('RECORDING_STALE_MARGIN', 30))
+    # 発話終了の自動検出（VAD）
+    VAD_ENABLED = os.environ.get('VAD_ENABLED', '1') == '1'
+    VAD_SILENCE_MS = int(os.environ.get('VAD_SILENCE_MS', 700))
+    VAD_MIN_THRESHOLD = int(os.environ.get('VAD_MIN_THRESHOLD', 300))
+
+    # 音声認識バックエンド: 'google'、'offline'（Vosk）、'http'（STT_HTTP_URL のサーバー）、'stub'（固定文字列を返す）
+    RECOGNIZER_BACKEND = os.environ.get('RECOGNIZER_BACKEND', 'google')
+    RECOGNIZER_LANGUAGE = os.environ.get('RECOGNIZER_LANGUAGE', 'ja-JP')
+    VOSK_MODEL_PATH = os.environ.get('VOSK_MODEL_PATH')
+    STUB_RECOGNIZER_TEXT = os.environ.get('STUB_RECOGNIZER_TEXT', '日本')
+    STT_HTTP_URL = os.environ.get('STT_HTTP_URL')
+    FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+    # /api/speech-to-text で受け付ける音声データの上限（バイト。チャンク転送の場合も受信しながら確認する）
+    SPEECH_UPLOAD_MAX_BYTES = int(os.environ.get('SPEECH_UPLOAD_MAX_BYTES', 16 * 1024 * 1024))
+
+    # 端末ごとの状態を共有するSQLiteファイル（複数のgunicornワーカーから参照する）
+    STATE_DB_PATH = os.environ.get('STATE_DB_PATH') or os.path.join(tempfile.gettempdir(), 'news_state.sqlite3')
+    # 別のワーカーが持つ録音の認識結果を待つ最大秒数
+    RECOGNITION_WAIT_TIMEOUT = float(os.environ.get('RECOGNITION_WAIT_TIMEOUT', 30))
+
+    # 起動後にバックグラウンドでモデル読み込み・定型文の合成・既定ニュースの取得を行う
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '1') == '1'
+
+    # /metrics（Prometheus形式）での処理時間・リクエスト数の集計。Server-Timingヘッダーは任意で付与する
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', '0') == '1'
+
+    # 音声認識前の前処理（直流成分・前後の無音の除去、16kHzへの変換、ピーク正規化）
+    PREPROCESS_ENABLED = os.environ.get('PREPROCESS_ENABLED', '1') == '1'
+    PREPROCESS_TARGET_RATE = int(os.environ.get('PREPROCESS_TARGET_RATE', 16000))
+    PREPROCESS_PADDING_MS = int(os.environ.get('PREPROCESS_PADDING_MS', 200))
+
+    # 取得した記事を保存して全文検索するローカルの記事ストア
+    ARTICLE_STORE_ENABLED = os.environ.get('ARTICLE_STORE_ENABLED', '1') == '1'
+    ARTICLE_STORE_PATH = os.environ.get('ARTICLE_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'news_articles.sqlite3')
+    # この秒数以内にNewsAPIへ問い合わせた検索ワードは保存済みの記事だけで答える
+    ARTICLE_STORE_FRESH_SECONDS = int(os.environ.get('ARTICLE_STORE_FRESH_SECONDS', 900))
+    ARTICLE_STORE_RETENTION_DAYS = int(os.environ.get('ARTICLE_STORE_RETENTION_DAYS', 7))
+    ARTICLE_STORE_MAX_ARTICLES = int(os.environ.get('ARTICLE_STORE_MAX_ARTICLES', 5000))
+    # 定期的に取得しておく話題（カンマ区切り）と取得間隔（秒）
+    ARTICLE_SYNC_TOPICS = [t for t in os.environ.get('ARTICLE_SYNC_TOPICS', '日本').split(',') if t]
+    ARTICLE_SYNC_INTERVAL = int(os.environ.get('ARTICLE_SYNC_INTERVAL', 900))
+
+    # ニュースの取得元（カンマ区切りのドメイン）。媒体ごと・ページごとに並行して問い合わせる
+    NEWS_SOURCES = [d.strip() for d in os.environ.get('NEWS_SOURCES', 'asahi.com').split(',') if d.strip()]
+    NEWS_PAGES = int(os.environ.get('NEWS_PAGES', 1))
+    NEWS_PAGE_SIZE = int(os.environ.get('NEWS_PAGE_SIZE', 20))
+    NEWS_FETCH_WORKERS = int(os.environ.get('NEWS_FETCH_WORKERS', 4))
+    # まとめた後に判定へ回す記事の最大数と、検索ワードを見出しに含む記事を新しい記事として扱う時間
+    NEWS_MAX_CANDIDATES = int(os.environ.get('NEWS_MAX_CANDIDATES', 40))
+    NEWS_TITLE_MATCH_BONUS_HOURS = float(os.environ.get('NEWS_TITLE_MATCH_BONUS_HOURS', 6))
+    # 見出しの類似度（MinHashによるJaccard係数の推定値）がこれ以上の記事は同じ記事とみなす
+    NEWS_DEDUPE_THRESHOLD = float(os.environ.get('NEWS_DEDUPE_THRESHOLD', 0.8))
+
+    # タッチ入力サービス（touch_sensor.py）との通信に使うUnixドメインソケット（空にすると無効）
+    TOUCH_SOCKET_PATH = os.environ.get('TOUCH_SOCKET_PATH', os.path.join(tempfile.gettempdir(), 'news_touch.sock'))
+    TOUCH_PIN = int(os.environ.get('TOUCH_PIN', 17))
+    TOUCH_DEBOUNCE_MS = int(os.environ.get('TOUCH_DEBOUNCE_MS', 200))
+
+    # Socket.IOによる表示端末へのプッシュ配信。run.py では threading、gunicorn -k eventlet では eventlet を指定する
+    SOCKETIO_ENABLED = os.environ.get('SOCKETIO_ENABLED', '1') == '1'
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+
+    # ログ。記録は直近 LOG_RING_SIZE 件をメモリに保持し（/debug/logs で参照）、ディスクには WARNING 以上のみ書き出す
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    # モジュールごとのレベル（例: "app.routes=DEBUG,werkzeug=WARNING"）
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', 'werkzeug=WARNING')
+    LOG_CONSOLE_LEVEL = os.environ.get('LOG_CONSOLE_LEVEL', 'WARNING').upper()
+    # LOG_CONSOLE_LEVEL 未満でもコンソールに出すロガー（カンマ区切り。既定は run.py の起動時間の計測）
+    LOG_CONSOLE_LOGGERS = os.environ.get('LOG_CONSOLE_LOGGERS', 'startup')
+    LOG_FILE_PATH = os.environ.get('LOG_FILE_PATH', os.path.join(tempfile.gettempdir(), 'news_system.log'))
+    LOG_FILE_LEVEL = os.environ.get('LOG_FILE_LEVEL', 'WARNING').upper()
+    LOG_FILE_MAX_BYTES = int(os.environ.get('LOG_FILE_MAX_BYTES', 1024 * 1024))
+    LOG_RING_SIZE = int(os.environ.get('LOG_RING_SIZE', 2000))
+    LOG_DUMP_DIR = os.environ.get('LOG_DUMP_DIR', tempfile.gettempdir())
+    # WARNING 未満のログは、同じ書式のメッセージを毎秒この件数まで（瞬間的には LOG_RATE_BURST 件まで）に抑える
+    LOG_RATE_PER_SECOND = float(os.environ.get('LOG_RATE_PER_SECOND', 5))
+    LOG_RATE_BURST = int(os.environ.get('LOG_RATE_BURST', 20))
+    # /debug/logs を有効にする（有効にしてもサーバー自身からのアクセスにのみ応じる）
+    LOG_DEBUG_ENDPOINT_ENABLED = os.environ.get('LOG_DEBUG_ENDPOINT_ENABLED', '0') == '1'
+
+    # 外部サービスの呼び出し。接続エラー・タイムアウト・5xxは UPSTREAM_RETRIES 回まで再試行し、
+    # UPSTREAM_BREAKER_FAILURES 回続けて失敗したサービスは UPSTREAM_BREAKER_RESET 秒のあいだ呼ばない
+    UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+    UPSTREAM_BACKOFF = float(os.environ.get('UPSTREAM_BACKOFF', 0.1))
+    UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', 5))
+    UPSTREAM_BREAKER_RESET = float(os.environ.get('UPSTREAM_BREAKER_RESET', 30))
+    # 1回の試行のタイムアウト（秒）と、応答が遅いときに同じ要求をもう1本送るまでの時間（0で無効）
+    NEWS_API_TIMEOUT = float(os.environ.get('NEWS_API_TIMEOUT', 3))
+    NEWS_API_HEDGE_AFTER = float(os.environ.get('NEWS_API_HEDGE_AFTER', 0.8))
+    TTS_TIMEOUT = float(os.environ.get('TTS_TIMEOUT', 5))
+    TTS_HEDGE_AFTER = float(os.environ.get('TTS_HEDGE_AFTER', 1.5))
+    STT_TIMEOUT = float(os.environ.get('STT_TIMEOUT', 8))
+    # /api/get-news でニュースの取得にかけてよい時間（秒）。過ぎたら古いキャッシュ・保存済みの記事で答える
+    NEWS_DEADLINE_SECONDS = float(os.environ.get('NEWS_DEADLINE_SECONDS', 6))
+
+    # nagisaの形態素解析を行うワーカープロセスの数（0でこのプロセス内のスレッドで解析する）。
+    # ワーカーごとにモデルを読み込むため、数を増やすとメモリ使用量も増える
+    TOKENIZER_WORKERS = int(os.environ.get('TOKENIZER_WORKERS', 2))
+    # 同時に受け付ける解析のバッチ数と、空きを待つ時間（秒）
+    TOKENIZER_MAX_PENDING = int(os.environ.get('TOKENIZER_MAX_PENDING', 16))
+    TOKENIZER_QUEUE_TIMEOUT = float(os.environ.get('TOKENIZER_QUEUE_TIMEOUT', 5))
+    TOKENIZER_START_METHOD = os.environ.get('TOKENIZER_START_METHOD', 'forkserver')
+    # この件数のバッチを処理したワーカーを入れ替える（0で入れ替えない。Python 3.11以降）
+    TOKENIZER_MAX_TASKS_PER_CHILD = int(os.environ.get('TOKENIZER_MAX_TASKS_PER_CHILD', 0))
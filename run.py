@@ -1,17 +1,78 @@
+import time
+
+_import_start = time.perf_counter()
+
 import logging
-from app import create_app
+import threading
 
-# ログ設定
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+# 起動時間の計測は LOG_CONSOLE_LEVEL に関係なくコンソールに出す（LOG_CONSOLE_LOGGERS）
+logger = logging.getLogger('startup')
 
-app = create_app()
+# 形態素解析のワーカー（forkserver）は起動時にこのファイルを __mp_main__ として読み込み直すため、
+# アプリの読み込み・構築はモジュールの読み込み時ではなく main() の中で行う
+
+
+def install_request_timing(app):
+    from flask import g, request
+
+    first_request = {'logged': False}
+    first_request_lock = threading.Lock()
+
+    @app.before_request
+    def _mark_request_start():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _log_first_request(response):
+        # 起動後最初のリクエストの処理時間を記録する
+        with first_request_lock:
+            if first_request['logged'] or not hasattr(g, 'request_started'):
+                return response
+            first_request['logged'] = True
+        elapsed = (time.perf_counter() - g.request_started) * 1000
+        logger.info("最初のリクエスト %s の処理時間: %.1fms", request.path, elapsed)
+        return response
+
+
+def report_warmup(warmup):
+    from app.lazy import import_timings
+
+    warmup.wait()
+    report = warmup.report()
+    for step in report['steps']:
+        logger.info("ウォームアップ %s: %s %sms", step['name'], step['status'], step['duration_ms'])
+    for name, seconds in import_timings.items():
+        logger.info("遅延インポート %s: %.1fms", name, seconds * 1000)
+
+
+def main():
+    from werkzeug.serving import make_server
+    from config import Config
+    from app import create_app
+    from app.log_pipeline import log_pipeline
+
+    # ログ設定（出力はバックグラウンドのスレッドで行い、ディスクには WARNING 以上のみ書き出す）
+    log_pipeline.configure()
+
+    app = create_app()
+    install_request_timing(app)
+    startup_seconds = time.perf_counter() - _import_start
+    logger.info("アプリケーションの読み込みが完了しました（%.1fms）", startup_seconds * 1000)
 
-if __name__ == '__main__':
     try:
         logger.info("Starting the application...")
-        app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+        # 先にソケットを開いて待ち受けを始めてから、重い初期化をバックグラウンドで行う
+        server = make_server('0.0.0.0', 5000, app, threaded=True)
+        logger.info("待ち受けを開始しました（起動から %.1fms）", (time.perf_counter() - _import_start) * 1000)
+        if Config.WARMUP_ENABLED:
+            warmup = app.extensions['warmup']
+            warmup.start()
+            threading.Thread(target=report_warmup, args=(warmup,), daemon=True).start()
+        server.serve_forever()
     except Exception as e:
-        logger.error(f"An error occurred while starting the application: {str(e)}")
+        logger.error("An error occurred while starting the application: %s", e)
         raise
 
+
+if __name__ == '__main__':
+    main()
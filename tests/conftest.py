@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+# config.py は読み込み時に環境変数を参照するため、app を読み込む前に外部の資源を使わない設定にしておく
+_workdir = tempfile.mkdtemp(prefix='news-tests-')
+os.environ.update({
+    'NEWS_API_KEY': '',
+    'STATE_DB_PATH': os.path.join(_workdir, 'state.sqlite3'),
+    'ARTICLE_STORE_PATH': os.path.join(_workdir, 'articles.sqlite3'),
+    'TTS_CACHE_DIR': os.path.join(_workdir, 'tts'),
+    'LOG_FILE_PATH': '',
+    'LOG_DUMP_DIR': _workdir,
+    'ARECORD_PATH': os.path.join(ROOT, 'benchmarks', 'fake_arecord.py'),
+    'RECOGNIZER_BACKEND': 'stub',
+    'TOUCH_SOCKET_PATH': '',
+    'WARMUP_ENABLED': '0',
+    'SOCKETIO_ENABLED': '0',
+    'TOKENIZER_WORKERS': '0',
+})
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+class FakeClock:
+    """テスト用の時計。advance() で時刻を進める"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,83 @@
+import pytest
+
+from app.article_store import ArticleStore, ArticleSync, bigrams, match_expression
+from conftest import wait_until
+
+
+def article(url, title, description='', published_at='2024-04-01T00:00:00Z'):
+    return {'url': url, 'title': title, 'description': description, 'publishedAt': published_at,
+            'source': {'name': 'テスト新聞'}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleStore(str(tmp_path / 'articles.sqlite3'))
+    store.ingest('', [
+        article('https://example.com/1', '桜が満開に', '公園で花見客', '2024-04-03T00:00:00Z'),
+        article('https://example.com/2', '新しい図書館が開館', '駅前に', '2024-04-02T00:00:00Z'),
+        article('https://example.com/3', '100% 再生可能エネルギー', '町の取り組み', '2024-04-01T00:00:00Z'),
+    ])
+    return store
+
+
+def titles(results):
+    return [result['title'] for result in results]
+
+
+def test_bigrams_split_runs_and_keep_single_characters():
+    assert bigrams('桜が満開') == ['桜が', 'が満', '満開']
+    assert bigrams('a 桜') == ['a', '桜']
+
+
+def test_match_expression_skips_single_character_terms():
+    assert match_expression('図書館') == '"図書 書館"'
+    assert match_expression('桜 図書館') == '"図書 書館"'
+    assert match_expression('桜') == ''
+
+
+def test_search_matches_substrings_through_the_bigram_index(store):
+    assert titles(store.search('図書館')) == ['新しい図書館が開館']
+    assert titles(store.search('花見')) == ['桜が満開に']
+    assert store.search('美術館') == []
+
+
+def test_single_character_query_falls_back_to_like(store):
+    assert titles(store.search('桜')) == ['桜が満開に']
+    assert titles(store.search('駅')) == ['新しい図書館が開館']
+
+
+def test_single_and_multi_character_terms_are_combined(store):
+    assert titles(store.search('桜 花見')) == ['桜が満開に']
+    assert store.search('桜 図書館') == []
+
+
+def test_like_wildcards_in_the_query_are_literal(store):
+    assert titles(store.search('%')) == ['100% 再生可能エネルギー']
+    assert store.search('_') == []
+
+
+def test_negative_articles_are_excluded(store):
+    article_id = store.unclassified()[0]['id']
+    store.set_verdicts([(article_id, False)])
+
+    assert article_id not in [row['id'] for row in store.unclassified()]
+    assert store.search('桜') == []
+
+
+def test_sync_thread_survives_classification_errors(store):
+    calls = []
+
+    def classify(articles):
+        calls.append(len(articles))
+        if len(calls) == 1:
+            raise RuntimeError('tokenizer busy')
+        return [True] * len(articles)
+
+    sync = ArticleSync(store, topics=[], interval=0.01, sync_topic=lambda topic: None, classify=classify)
+    sync.start()
+    try:
+        wait_until(lambda: store.stats()['unclassified'] == 0)
+    finally:
+        sync.stop()
+    # 1回目の失敗の後も同期のスレッドは動き続ける
+    assert len(calls) >= 2
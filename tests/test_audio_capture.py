@@ -0,0 +1,110 @@
+import math
+import os
+import struct
+import sys
+
+import pytest
+
+from app.audio_capture import EnergyVAD, RingBuffer, StreamingRecorder
+from conftest import wait_until
+
+FAKE_ARECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'fake_arecord.py')
+RATE = 8000
+
+
+def tone(seconds, amplitude=8000, freq=440):
+    return struct.pack(f'<{int(RATE * seconds)}h', *(int(amplitude * math.sin(2 * math.pi * freq * i / RATE))
+                                                     for i in range(int(RATE * seconds))))
+
+
+def silence(seconds):
+    return bytes(int(RATE * seconds) * 2)
+
+
+@pytest.fixture
+def fake_arecord(tmp_path, monkeypatch):
+    # 指定したPCMを出し終えた後は無音を出し続ける偽arecord（待ち時間なし）
+    def setup(pcm):
+        path = tmp_path / 'input.raw'
+        path.write_bytes(pcm)
+        monkeypatch.setenv('FAKE_ARECORD_INPUT', str(path))
+        monkeypatch.setenv('FAKE_ARECORD_SPEED', '0')
+        return [sys.executable, FAKE_ARECORD, '-t', 'raw', '-f', 'S16_LE', '-c', '1', '-r', str(RATE)]
+    return setup
+
+
+def test_ring_buffer_keeps_latest_bytes():
+    buffer = RingBuffer(8)
+    buffer.write(b'abcde')
+    buffer.write(b'fghij')
+
+    assert buffer.getvalue() == b'cdefghij'
+    assert buffer.overflowed == 2
+    buffer.write(b'0123456789')
+    assert buffer.getvalue() == b'23456789'
+
+
+def test_vad_endpoints_after_speech_followed_by_silence():
+    vad = EnergyVAD(RATE, silence_ms=300)
+
+    assert not vad.feed(silence(0.5))
+    assert not vad.feed(tone(0.5))
+    assert vad.speech_started
+    assert vad.feed(silence(0.5))
+
+
+def test_vad_ignores_silence_only():
+    vad = EnergyVAD(RATE, silence_ms=300)
+
+    assert not vad.feed(silence(3))
+    assert not vad.speech_started
+
+
+def test_recorder_endpoints_on_vad(fake_arecord):
+    endpoints = []
+    pcm = silence(0.5) + tone(1.0) + silence(1.0)
+    recorder = StreamingRecorder(fake_arecord(pcm), RATE, buffer_seconds=10, max_seconds=10,
+                                 vad=EnergyVAD(RATE, silence_ms=300), on_endpoint=endpoints.append)
+    recorder.start()
+
+    assert recorder.endpointed.wait(10)
+    wait_until(lambda: endpoints)
+    assert endpoints == [recorder]
+    assert recorder.stop_reason == 'vad'
+    assert recorder.process.poll() is not None
+    assert 1.5 <= recorder.duration() < 3.0
+    assert recorder.pcm()[:len(pcm) // 2] == pcm[:len(pcm) // 2]
+
+
+def test_recorder_stops_at_max_duration(fake_arecord):
+    recorder = StreamingRecorder(fake_arecord(tone(5)), RATE, buffer_seconds=1, max_seconds=2)
+    recorder.start()
+
+    assert recorder.endpointed.wait(10)
+    assert recorder.stop_reason == 'max_duration'
+    # リングバッファには直近 buffer_seconds 分だけが残る
+    assert len(recorder.pcm()) == RATE * 2
+
+
+def test_recorder_honours_stop_request_from_another_worker(fake_arecord):
+    stop = []
+    recorder = StreamingRecorder(fake_arecord(tone(0.2)), RATE, buffer_seconds=60, max_seconds=60,
+                                 should_stop=lambda: bool(stop), stop_check_interval=0.01)
+    recorder.start()
+    stop.append(True)
+
+    assert recorder.endpointed.wait(10)
+    assert recorder.stop_reason == 'stop_requested'
+
+
+def test_stop_returns_buffered_pcm(fake_arecord, monkeypatch):
+    command = fake_arecord(tone(0.5))
+    # 待ち時間なしだと後続の無音が停止前にリングバッファを埋めてしまうため、実時間で出力させる
+    monkeypatch.setenv('FAKE_ARECORD_SPEED', '1')
+    recorder = StreamingRecorder(command, RATE, buffer_seconds=60, max_seconds=60)
+    recorder.start()
+    wait_until(lambda: recorder.duration() >= 0.5)
+
+    pcm = recorder.stop()
+    assert pcm[:RATE] == tone(0.5)[:RATE]
+    assert recorder.process.poll() is not None
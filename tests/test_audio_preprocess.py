@@ -0,0 +1,74 @@
+import numpy as np
+
+from app.audio_preprocess import AudioPreprocessor, lowpass_kernel, resample, trim_silence
+
+RATE = 44100
+
+
+def tone(seconds, amplitude, freq=440, rate=RATE):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def noise(seconds, level, seed=0):
+    return np.random.default_rng(seed).normal(0, level, int(RATE * seconds)).astype(np.float32)
+
+
+def test_trim_silence_removes_leading_and_trailing_noise():
+    samples = np.concatenate([noise(1.0, 30), tone(1.0, 3000) + noise(1.0, 30, seed=1), noise(1.0, 30, seed=2)])
+
+    trimmed = trim_silence(samples, RATE, padding_ms=100)
+    assert 1.0 <= trimmed.size / RATE <= 1.3
+
+
+def test_trim_silence_keeps_quiet_speech():
+    # 固定の下限（以前は RMS 300）を下回る小さな声でも、雑音レベルより大きければ残す
+    samples = np.concatenate([noise(1.0, 5), tone(1.0, 150) + noise(1.0, 5, seed=1), noise(1.0, 5, seed=2)])
+
+    trimmed = trim_silence(samples, RATE, padding_ms=100)
+    assert 1.0 <= trimmed.size / RATE <= 1.3
+
+
+def test_trim_silence_returns_original_clip_when_nothing_is_voiced():
+    silence = np.zeros(RATE, dtype=np.float32)
+    assert trim_silence(silence, RATE).size == silence.size
+
+    steady = tone(1.0, 100)
+    assert trim_silence(steady, RATE).size == steady.size
+
+
+def test_resample_matches_full_convolution():
+    samples = noise(2.0, 3000)
+    expected_filtered = np.convolve(samples.astype(np.float64), lowpass_kernel(0.5 * 16000 / RATE * 0.95), 'same')
+    positions = np.arange(int(samples.size * 16000 / RATE)) * (RATE / 16000)
+    expected = np.interp(positions, np.arange(samples.size), expected_filtered)
+
+    result = resample(samples, RATE, 16000, block=1000)
+    assert result.dtype == np.float32
+    assert result.size == expected.size
+    assert np.max(np.abs(result - expected)) < 0.5
+
+
+def test_resample_keeps_passband_and_removes_aliasing():
+    passband = resample(tone(1.0, 10000, freq=1000), RATE, 16000)
+    aliased = resample(tone(1.0, 10000, freq=12000), RATE, 16000)
+
+    assert np.abs(passband[1000:-1000]).max() > 9000
+    assert np.abs(aliased[1000:-1000]).max() < 500
+
+
+def test_resample_upsamples_without_filtering():
+    samples = tone(0.5, 1000, rate=8000)
+    result = resample(samples, 8000, 16000)
+
+    assert result.size == samples.size * 2
+    assert np.allclose(result[::2], samples, atol=1e-3)
+
+
+def test_preprocessor_does_not_empty_quiet_recordings():
+    quiet = np.concatenate([noise(0.5, 5), tone(1.0, 150) + noise(1.0, 5, seed=1), noise(0.5, 5, seed=2)])
+    pcm = np.rint(quiet).astype('<i2').tobytes()
+
+    processed, rate = AudioPreprocessor(target_rate=16000).process_pcm(pcm, RATE)
+    assert rate == 16000
+    assert len(processed) / 2 / rate >= 1.0
@@ -0,0 +1,81 @@
+import subprocess
+import sys
+
+import pytest
+
+from app import audio_transcode
+from app.audio_transcode import UnsupportedAudioFormat, UploadTooLarge, raw_input_args, transcode_stream
+
+# ffmpegの代わりに標準入力をそのまま標準出力へ書き出すコマンド
+PASSTHROUGH = [sys.executable, '-c', 'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)']
+
+
+@pytest.fixture
+def passthrough_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_transcode, 'ffmpeg_command', lambda input_args=None, sample_rate=16000: PASSTHROUGH)
+
+
+def test_l16_defaults_to_network_byte_order():
+    assert raw_input_args({'rate': '44100'}) == ['-f', 's16be', '-ar', '44100', '-ac', '1']
+    assert raw_input_args({'endian': 'big'})[:2] == ['-f', 's16be']
+
+
+def test_l16_little_endian_must_be_explicit():
+    assert raw_input_args({'rate': '44100', 'channels': '1', 'endian': 'little'}) == \
+        ['-f', 's16le', '-ar', '44100', '-ac', '1']
+
+
+@pytest.mark.parametrize('params', [{'rate': '44100 -i /etc/passwd'}, {'rate': '-1'}, {'rate': '12345'},
+                                    {'channels': 'abc'}, {'channels': '8'}])
+def test_l16_rejects_unsupported_rate_and_channels(params):
+    with pytest.raises(UnsupportedAudioFormat):
+        raw_input_args(params)
+
+
+def test_speech_to_text_answers_415_for_unsupported_l16(client):
+    response = client.post('/api/speech-to-text', data=b'\x00\x00' * 100,
+                           headers={'Content-Type': 'audio/l16; rate=-i; channels=1'})
+    assert response.status_code == 415
+
+
+def test_transcode_stream_feeds_chunks_through_the_pipe(passthrough_ffmpeg):
+    audio = transcode_stream(iter([b'\x01\x00' * 100, b'', b'\x02\x00' * 100]), max_bytes=1000)
+
+    assert audio.frame_data == b'\x01\x00' * 100 + b'\x02\x00' * 100
+    assert audio.sample_rate == 16000
+
+
+def test_transcode_stream_rejects_uploads_over_the_limit(passthrough_ffmpeg):
+    sent = []
+
+    def chunks():
+        for _ in range(1000):
+            sent.append(1)
+            yield bytes(4096)
+
+    with pytest.raises(UploadTooLarge):
+        transcode_stream(chunks(), max_bytes=16384)
+    # 上限を超えた時点で受信を打ち切る
+    assert len(sent) == 5
+
+
+def test_transcode_stream_kills_ffmpeg_when_receiving_fails(monkeypatch):
+    # 標準入力を読まずに居座るコマンド。受信が失敗したら終了を待たずに止める
+    monkeypatch.setattr(audio_transcode, 'ffmpeg_command',
+                        lambda input_args=None, sample_rate=16000: [sys.executable, '-c', 'import time; time.sleep(60)'])
+    processes = []
+
+    class RecordingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            processes.append(self)
+
+    monkeypatch.setattr(audio_transcode.subprocess, 'Popen', RecordingPopen)
+
+    def chunks():
+        yield bytes(16)
+        raise ConnectionResetError('client went away')
+
+    with pytest.raises(ConnectionResetError):
+        transcode_stream(chunks())
+    assert processes[0].returncode is not None
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from app.event_hub import Event, EventHub, format_sse
+from app.state_store import DeviceStateStore
+
+
+@pytest.fixture
+def workers(tmp_path):
+    # 同じSQLiteファイルを使う2つのワーカーのイベントハブ
+    path = str(tmp_path / 'state.sqlite3')
+    return [EventHub(history_size=10, store=DeviceStateStore(path), poll_interval=0.01) for _ in range(2)]
+
+
+def drain(subscription, count, timeout=5):
+    # count 件届くまで（または timeout 秒まで）受け取る
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count and time.monotonic() < deadline:
+        event = subscription.get(timeout=0.05)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def test_last_event_id_replays_only_later_events():
+    hub = EventHub(history_size=3)
+    published = [hub.publish('partial_result', {'text': str(i)}) for i in range(5)]
+
+    # 履歴に残っている直近3件のうち、Last-Event-ID より後のものだけを再送する
+    replayed = drain(hub.subscribe(last_event_id=published[2].id), 2)
+    assert [event.data['text'] for event in replayed] == ['3', '4']
+    assert [event.data['text'] for event in drain(hub.subscribe(last_event_id=0), 3)] == ['2', '3', '4']
+    assert hub.subscribe().get(timeout=0) is None
+
+
+def test_slow_subscriber_drops_oldest_events():
+    hub = EventHub(queue_size=2)
+    slow = hub.subscribe()
+    fast = hub.subscribe()
+    received = []
+    for i in range(5):
+        hub.publish('partial_result', {'text': str(i)})
+        received.append(fast.get(timeout=0))
+
+    assert slow.dropped == 3
+    assert [event.data['text'] for event in drain(slow, 2)] == ['3', '4']
+    assert fast.dropped == 0
+    assert [event.data['text'] for event in received] == ['0', '1', '2', '3', '4']
+
+    slow.close()
+    assert hub.subscriber_count() == 1
+
+
+def test_format_sse():
+    event = Event(12, 'recognition_result', {'text': '桜が満開\n', 'ok': True}, 1000.0)
+    # 日本語はエスケープせず、改行は JSON の中でエスケープされて1行の data になる
+    assert format_sse(event) == \
+        'id: 12\nevent: recognition_result\ndata: {"text": "桜が満開\\n", "ok": true}\n\n'
+    assert format_sse(Event(1, 'news_started', None, 1000.0)) == 'id: 1\nevent: news_started\ndata: null\n\n'
+
+
+def test_events_published_by_another_worker_reach_subscribers(workers):
+    recorder_worker, display_worker = workers
+    subscription = display_worker.subscribe()
+
+    recorder_worker.publish('utterance_endpointed', {'device_id': 'kitchen'})
+    display_worker.publish('recognition_result', {'device_id': 'kitchen', 'text': '桜'})
+
+    events = drain(subscription, 2)
+    assert [event.type for event in events] == ['utterance_endpointed', 'recognition_result']
+    assert events[1].id > events[0].id
+
+
+def test_touch_received_by_every_worker_is_delivered_once(workers):
+    subscription = workers[0].subscribe()
+    for worker in workers:
+        worker.publish('touch_detected', {'seq': 7}, dedupe_key='touch:7:1.0')
+    workers[0].publish('recording_started', {})
+
+    assert [event.type for event in drain(subscription, 2)] == ['touch_detected', 'recording_started']
+
+
+def test_new_worker_replays_shared_history(workers, tmp_path):
+    first = workers[0].publish('recognition_result', {'text': '桜'})
+    workers[0].publish('news_started', {})
+
+    late_worker = EventHub(history_size=10, store=DeviceStateStore(str(tmp_path / 'state.sqlite3')), poll_interval=0.01)
+    subscription = late_worker.subscribe(last_event_id=first.id)
+    assert [event.type for event in drain(subscription, 1)] == ['news_started']
@@ -0,0 +1,91 @@
+import logging
+import sys
+
+import pytest
+from flask import Flask
+
+from app.log_pipeline import ConsoleFilter, RateLimitFilter, RingBufferHandler, log_pipeline
+from config import Config
+
+
+def make_record(msg, name='app.routes', level=logging.INFO, lineno=10):
+    return logging.LogRecord(name, level, '/app/routes.py', lineno, msg, (), None)
+
+
+def test_rate_limit_buckets_by_call_site_not_message():
+    rate_limit = RateLimitFilter(rate=0.001, burst=2)
+
+    # f-string で毎回違う文字列になっても、同じ呼び出し箇所なら同じバケットで数える
+    passed = [rate_limit.filter(make_record(f'device {i}')) for i in range(100)]
+    assert passed.count(True) == 2
+    assert rate_limit.suppressed_total == 98
+    assert len(rate_limit._buckets) == 1
+
+    assert rate_limit.filter(make_record('other call site', lineno=20))
+    assert rate_limit.filter(make_record('warning', level=logging.WARNING))
+
+
+def test_console_filter_keeps_startup_logger_visible():
+    console = ConsoleFilter(logging.WARNING, ['startup'])
+
+    assert console.filter(make_record('起動', name='startup'))
+    assert console.filter(make_record('起動', name='startup.warmup'))
+    assert not console.filter(make_record('info', name='app.routes'))
+    assert not console.filter(make_record('info', name='startupx'))
+    assert console.filter(make_record('warning', name='app.routes', level=logging.WARNING))
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(log_pipeline, 'ring', RingBufferHandler(10))
+    return log_pipeline
+
+
+def test_dump_overwrites_a_single_file(pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'LOG_DUMP_DIR', str(tmp_path))
+    pipeline.ring.emit(make_record('first'))
+    first_path, _ = pipeline.dump()
+    pipeline.ring.emit(make_record('second'))
+    second_path, count = pipeline.dump()
+
+    assert first_path == second_path
+    assert count == 2
+    assert [path.name for path in tmp_path.iterdir()] == ['news-log-dump.log']
+    assert 'second' in (tmp_path / 'news-log-dump.log').read_text(encoding='utf-8')
+
+
+def test_debug_endpoint_is_off_by_default(client):
+    assert client.get('/debug/logs').status_code == 404
+
+
+def test_debug_endpoint_only_answers_local_requests(pipeline, monkeypatch):
+    monkeypatch.setattr(Config, 'LOG_DEBUG_ENDPOINT_ENABLED', True)
+    app = Flask(__name__)
+    pipeline.init_app(app)
+    pipeline.ring.emit(make_record('hello'))
+    client = app.test_client()
+
+    response = client.get('/debug/logs', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert response.status_code == 200
+    assert [record['message'] for record in response.get_json()['records']] == ['hello']
+    assert client.get('/debug/logs', environ_base={'REMOTE_ADDR': '192.168.1.20'}).status_code == 403
+    assert client.post('/debug/logs/dump', environ_base={'REMOTE_ADDR': '192.168.1.20'}).status_code == 403
+
+
+def test_ring_keeps_rendered_text_instead_of_tracebacks_and_args():
+    ring = RingBufferHandler(10)
+    payload = {'items': [1, 2, 3]}
+    try:
+        raise ValueError('broken')
+    except ValueError:
+        record = logging.LogRecord('app.routes', logging.ERROR, '/app/routes.py', 10, '処理に失敗しました: %s',
+                                   (payload,), sys.exc_info())
+    ring.emit(record)
+    payload['items'].append(4)
+
+    [kept] = ring.records()
+    assert kept.exc_info is None and kept.args is None
+    entry = ring.to_dict(kept)
+    assert entry['message'] == "処理に失敗しました: {'items': [1, 2, 3]}"
+    assert 'ValueError: broken' in entry['exception']
+    assert 'ValueError: broken' in logging.Formatter().format(kept)
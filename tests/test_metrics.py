@@ -0,0 +1,83 @@
+from app.metrics import Counter, Histogram, Metrics
+
+
+def test_histogram_renders_cumulative_buckets_with_sum_and_count():
+    histogram = Histogram('news_stage_duration_seconds', '処理段階ごとの所要時間', ('stage',), buckets=(1.0, 0.5))
+    # 境界と同じ値はそのバケットに入る（le は「以下」）
+    for value in (0.125, 0.5, 0.75, 4.0):
+        histogram.observe(value, 'ffmpeg')
+
+    assert histogram.render() == [
+        '# HELP news_stage_duration_seconds 処理段階ごとの所要時間',
+        '# TYPE news_stage_duration_seconds histogram',
+        'news_stage_duration_seconds_bucket{stage="ffmpeg",le="0.5"} 2',
+        'news_stage_duration_seconds_bucket{stage="ffmpeg",le="1.0"} 3',
+        'news_stage_duration_seconds_bucket{stage="ffmpeg",le="+Inf"} 4',
+        'news_stage_duration_seconds_sum{stage="ffmpeg"} 5.375',
+        'news_stage_duration_seconds_count{stage="ffmpeg"} 4',
+    ]
+
+
+def test_histogram_series_are_rendered_per_label_set():
+    histogram = Histogram('latency_seconds', 'help', ('endpoint', 'method'), buckets=(1.0,))
+    histogram.observe(2.0, '/b', 'GET')
+    histogram.observe(0.5, '/a', 'POST')
+
+    lines = histogram.render()
+    assert lines[2:] == [
+        'latency_seconds_bucket{endpoint="/a",method="POST",le="1.0"} 1',
+        'latency_seconds_bucket{endpoint="/a",method="POST",le="+Inf"} 1',
+        'latency_seconds_sum{endpoint="/a",method="POST"} 0.5',
+        'latency_seconds_count{endpoint="/a",method="POST"} 1',
+        'latency_seconds_bucket{endpoint="/b",method="GET",le="1.0"} 0',
+        'latency_seconds_bucket{endpoint="/b",method="GET",le="+Inf"} 1',
+        'latency_seconds_sum{endpoint="/b",method="GET"} 2.0',
+        'latency_seconds_count{endpoint="/b",method="GET"} 1',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter('events_total', 'help', ('event',))
+    counter.inc('say "hi"\\\n')
+    counter.inc('plain', amount=2)
+
+    assert counter.render()[2:] == [
+        'events_total{event="plain"} 2',
+        'events_total{event="say \\"hi\\"\\\\\\n"} 1',
+    ]
+
+
+def test_metrics_render_includes_numeric_gauges_only():
+    metrics = Metrics(prefix='test')
+    metrics.count('recognition', 'ok')
+    metrics.observe('newsapi', 0.25)
+    metrics.add_gauges('test_cache', 'キャッシュの状態', lambda: {'hits': 3, 'ratio': 0.5, 'ready': True, 'name': 'x'})
+
+    text = metrics.render()
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    assert 'test_events_total{event="recognition",result="ok"} 1' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="newsapi",le="+Inf"} 1' in lines
+    assert 'test_stage_duration_seconds_count{stage="newsapi"} 1' in lines
+    assert lines[-6:] == [
+        '# HELP test_cache_hits キャッシュの状態',
+        '# TYPE test_cache_hits gauge',
+        'test_cache_hits 3',
+        '# HELP test_cache_ratio キャッシュの状態',
+        '# TYPE test_cache_ratio gauge',
+        'test_cache_ratio 0.5',
+    ]
+
+
+def test_disabled_metrics_do_not_record():
+    metrics = Metrics(enabled=False, prefix='test')
+
+    def func():
+        return 1
+
+    with metrics.stage('newsapi'):
+        pass
+    metrics.count('recognition')
+    assert metrics.timed('newsapi', func) is func
+    assert 'test_stage_duration_seconds_count' not in metrics.render()
+    assert 'test_events_total{' not in metrics.render()
@@ -0,0 +1,131 @@
+import pytest
+
+from app import routes
+from app.news_audio import NewsAudio
+from app.tts_cache import TTSSegmentCache
+from app.upstream import CircuitBreaker
+
+
+class FakeTTSCache:
+    """合成の代わりにテキストをそのまま返す。failing のテキストは合成に失敗する"""
+
+    key = staticmethod(TTSSegmentCache.key)
+
+    def __init__(self, cached=True, failing=()):
+        self.cached = cached
+        self.failing = set(failing)
+
+    def contains(self, text, lang='ja'):
+        # cached は True/False（すべて）か、合成済みのテキストの集合
+        cached = self.cached if isinstance(self.cached, bool) else text in self.cached
+        return cached and text not in self.failing
+
+    def get(self, text, lang='ja'):
+        if text in self.failing:
+            raise RuntimeError(f'synthesis failed: {text}')
+        return text.encode('utf-8')
+
+
+@pytest.fixture
+def register(monkeypatch):
+    def setup(segments, **kwargs):
+        audio = NewsAudio(FakeTTSCache(**kwargs), workers=2, max_entries=10)
+        monkeypatch.setattr(routes, 'news_audio', audio)
+        return audio.register(segments)
+    return setup
+
+
+def test_complete_render_is_cacheable(client, register):
+    audio_id = register(['一つ目', '二つ目'])
+
+    response = client.get(f'/api/news-audio/{audio_id}')
+    assert response.status_code == 200
+    assert response.data == '一つ目二つ目'.encode('utf-8')
+    assert response.headers['ETag'] == f'"{audio_id}"'
+    assert 'max-age=3600' in response.headers['Cache-Control']
+
+    assert client.get(f'/api/news-audio/{audio_id}', headers={'If-None-Match': f'"{audio_id}"'}).status_code == 304
+
+
+def test_render_with_skipped_segments_is_not_cached(client, register):
+    audio_id = register(['一つ目', '二つ目', '三つ目'], failing=['二つ目'])
+
+    response = client.get(f'/api/news-audio/{audio_id}', headers={'Range': 'bytes=0-'})
+    assert response.status_code == 206
+    assert response.data == '一つ目三つ目'.encode('utf-8')
+    assert 'ETag' not in response.headers
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+def test_streamed_audio_is_not_cached(client, register):
+    audio_id = register(['一つ目', '二つ目'], cached=False, failing=['二つ目'])
+
+    response = client.get(f'/api/news-audio/{audio_id}')
+    assert response.status_code == 200
+    assert response.data == '一つ目'.encode('utf-8')
+    assert 'ETag' not in response.headers
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+@pytest.mark.parametrize('headers', [{}, {'Range': 'bytes=0-'}])
+def test_all_segments_failing_returns_503(client, register, headers):
+    audio_id = register(['一つ目', '二つ目'], cached=False, failing=['一つ目', '二つ目'])
+
+    response = client.get(f'/api/news-audio/{audio_id}', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_unknown_audio_id_is_404(client, register):
+    register(['一つ目'])
+    assert client.get('/api/news-audio/unknown').status_code == 404
+
+
+@pytest.fixture
+def breaker_open(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setattr(routes.tts_client, 'breaker', breaker)
+
+
+def use_cache(monkeypatch, cached):
+    audio = NewsAudio(FakeTTSCache(cached=set(cached)), workers=2, max_entries=10)
+    monkeypatch.setattr(routes, 'news_audio', audio)
+
+
+def test_open_breaker_without_cached_titles_plays_nothing(breaker_open, monkeypatch):
+    # 定型文だけ合成済みで、タイトルはどれも未合成
+    use_cache(monkeypatch, routes.FIXED_PHRASES)
+
+    assert routes.playable_segments(['桜が満開', '図書館が開館']) == []
+
+
+def test_open_breaker_drops_uncached_titles_with_their_joiners(breaker_open, monkeypatch):
+    use_cache(monkeypatch, routes.FIXED_PHRASES + [routes.title_segment('図書館が開館')])
+
+    assert routes.playable_segments(['桜が満開', '図書館が開館', '新駅が完成']) == [
+        routes.INTRO_TEXT, routes.title_segment('図書館が開館'), routes.CLOSING_TEXT]
+
+
+def test_open_breaker_without_cached_phrases_plays_nothing(breaker_open, monkeypatch):
+    use_cache(monkeypatch, [routes.title_segment('桜が満開')])
+
+    assert routes.playable_segments(['桜が満開']) == []
+
+
+def test_closed_breaker_reads_every_title(monkeypatch):
+    use_cache(monkeypatch, [])
+
+    assert routes.playable_segments(['桜が満開', '図書館が開館']) == routes.build_audio_segments(['桜が満開', '図書館が開館'])
+
+
+def test_audio_registered_by_another_worker_is_served(client, monkeypatch):
+    # 同じ state_store を共有する2つのワーカーの NewsAudio。登録したのとは別のワーカーが配信する
+    registering_worker = NewsAudio(FakeTTSCache(), workers=1, max_entries=10, store=routes.state_store)
+    monkeypatch.setattr(routes, 'news_audio', NewsAudio(FakeTTSCache(), workers=1, max_entries=10,
+                                                        store=routes.state_store))
+    audio_id = registering_worker.register(['別のワーカー'])
+
+    response = client.get(f'/api/news-audio/{audio_id}')
+    assert response.status_code == 200
+    assert response.data == '別のワーカー'.encode('utf-8')
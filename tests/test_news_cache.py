@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+from app.news_cache import NewsCache, make_cache_key
+from conftest import wait_until
+
+
+class Upstream:
+    """呼び出し回数を数え、呼ばれるたびに異なる値を返す上流"""
+
+    def __init__(self):
+        self.calls = 0
+        self.refreshed = threading.Event()
+
+    def fetch(self):
+        self.calls += 1
+        self.refreshed.set()
+        return {'version': self.calls}
+
+
+def test_make_cache_key_normalizes_query_and_ignores_api_key():
+    a = make_cache_key(' ＮＥＷＳ ', {'q': ' ＮＥＷＳ ', 'apiKey': 'a', 'pageSize': 20})
+    b = make_cache_key('news', {'q': 'news', 'apiKey': 'b', 'pageSize': '20'})
+    assert a == b
+
+
+def test_fresh_entry_is_served_without_calling_upstream(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=8, clock=clock)
+    upstream = Upstream()
+
+    assert cache.get_or_fetch('k', upstream.fetch) == {'version': 1}
+    clock.advance(59)
+    assert cache.get_or_fetch('k', upstream.fetch) == {'version': 1}
+    assert upstream.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_stale_entry_is_served_while_refreshing_in_background(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=8, clock=clock)
+    upstream = Upstream()
+    cache.get_or_fetch('k', upstream.fetch)
+    upstream.refreshed.clear()
+
+    clock.advance(61)
+    assert cache.get_or_fetch('k', upstream.fetch) == {'version': 1}
+    assert upstream.refreshed.wait(5)
+    wait_until(lambda: not cache._flights)
+
+    assert cache.get_or_fetch('k', upstream.fetch) == {'version': 2}
+    stats = cache.stats()
+    assert stats['stale_hits'] == 1
+    assert stats['refreshes'] == 1
+    assert upstream.calls == 2
+
+
+def test_failed_refresh_keeps_stale_entry(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=8, clock=clock)
+    cache.put('k', {'version': 1})
+    failed = threading.Event()
+
+    def broken():
+        failed.set()
+        raise RuntimeError('upstream down')
+
+    clock.advance(61)
+    assert cache.get_or_fetch('k', broken) == {'version': 1}
+    assert failed.wait(5)
+    wait_until(lambda: cache.stats()['refresh_errors'] == 1)
+    assert cache.get_stale('k') == {'version': 1}
+
+
+def test_expired_entry_is_fetched_synchronously(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=8, clock=clock)
+    upstream = Upstream()
+    cache.get_or_fetch('k', upstream.fetch)
+
+    clock.advance(661)
+    assert cache.get_or_fetch('k', upstream.fetch) == {'version': 2}
+    assert cache.stats()['misses'] == 2
+
+
+def test_fetch_error_is_raised_and_not_cached(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=8, clock=clock)
+
+    def broken():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch('k', broken)
+    assert cache.get_stale('k') is None
+
+
+def test_concurrent_misses_are_coalesced_into_one_upstream_call(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=8, clock=clock)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'version': len(calls)}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_fetch('k', slow_fetch)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('k', slow_fetch)))
+                 for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    wait_until(lambda: cache.stats()['coalesced'] == 4)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{'version': 1}] * 5
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = NewsCache(ttl=60, stale_ttl=600, max_entries=2, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get_or_fetch('a', lambda: None)
+    cache.put('c', 3)
+
+    assert cache.get_stale('b') is None
+    assert cache.get_stale('a') == 1
+    assert cache.get_stale('c') == 3
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,109 @@
+from concurrent.futures import Future
+
+import pytest
+
+from app.news_filter import AhoCorasick, NewsFilter
+
+
+class FakeTokenizer:
+    """空白で区切った語を解析結果として返し、解析に回したテキストを記録する"""
+
+    def __init__(self):
+        self.batches = []
+
+    def submit(self, texts):
+        self.batches.append(list(texts))
+        future = Future()
+        future.set_result([text.split() for text in texts])
+        return future
+
+
+def article(title, url=None):
+    return {'url': url or f'https://example.com/{title}', 'title': title, 'description': ''}
+
+
+@pytest.fixture
+def tokenizer():
+    return FakeTokenizer()
+
+
+@pytest.mark.parametrize('text, found', [
+    ('abcd', True),      # 'bcd' は 'abx' の途中から失敗遷移でたどる
+    ('xabxy', True),
+    ('abc', True),       # 'bc' は 'abc' の状態の失敗遷移の先で見つかる
+    ('acbd', False),
+    ('', False),
+])
+def test_aho_corasick_finds_overlapping_patterns(text, found):
+    assert AhoCorasick(['abx', 'bc', 'bcd']).search(text) is found
+
+
+def test_aho_corasick_matches_at_the_text_boundaries():
+    matcher = AhoCorasick(['事故', '火災'])
+    assert matcher.search('事故のあと')
+    assert matcher.search('倉庫で火災')
+    assert matcher.search('事故')
+    assert not matcher.search('事')
+    assert not AhoCorasick([]).search('事故')
+    assert not AhoCorasick(['']).search('事故')
+
+
+def test_articles_without_a_negative_substring_skip_tokenization(tokenizer):
+    news_filter = NewsFilter(['事故'], tokenizer=tokenizer)
+
+    assert news_filter.verdicts([article('桜 が 満開'), article('新しい 図書館')]) == [True, True]
+    assert tokenizer.batches == []
+
+
+def test_substring_matches_are_decided_by_tokenization(tokenizer):
+    news_filter = NewsFilter(['事故'], tokenizer=tokenizer)
+
+    # 「無事故」は部分文字列では一致するが、語としてはネガティブワードではない
+    assert news_filter.verdicts([article('無事故 を 達成'), article('桜 が 満開'), article('大きな 事故')]) == \
+        [True, True, False]
+    assert tokenizer.batches == [['無事故 を 達成 ', '大きな 事故 ']]
+
+
+def test_cached_verdicts_do_not_call_the_tokenizer(tokenizer):
+    news_filter = NewsFilter(['事故'], tokenizer=tokenizer)
+    articles = [article('無事故 を 達成'), article('大きな 事故')]
+    news_filter.verdicts(articles)
+
+    assert news_filter.verdicts(articles) == [True, False]
+    assert news_filter.is_positive_text('大きな 事故') is False
+    assert len(tokenizer.batches) == 2
+    # 同じURL・タイトルの記事は、概要が違ってもキャッシュから判定する
+    assert news_filter.verdicts([dict(articles[1], description='続報')]) == [False]
+    assert len(tokenizer.batches) == 2
+
+
+def test_least_recently_used_verdicts_are_evicted(tokenizer):
+    news_filter = NewsFilter(['事故'], cache_size=2, tokenizer=tokenizer)
+    first, second, third = article('事故 1'), article('事故 2'), article('事故 3')
+    news_filter.verdicts([first, second])
+    news_filter.verdicts([first])       # first を最近使ったものにする
+    news_filter.verdicts([third])       # second が追い出される
+    assert len(tokenizer.batches) == 2
+
+    news_filter.verdicts([first])
+    assert len(tokenizer.batches) == 2
+    news_filter.verdicts([second])
+    assert tokenizer.batches[-1] == ['事故 2 ']
+
+
+def test_tokenizer_failure_is_raised_and_not_cached():
+    class FailingTokenizer(FakeTokenizer):
+        def submit(self, texts):
+            self.batches.append(list(texts))
+            future = Future()
+            future.set_exception(RuntimeError('tokenizer crashed'))
+            return future
+
+    tokenizer = FailingTokenizer()
+    news_filter = NewsFilter(['事故'], tokenizer=tokenizer)
+
+    with pytest.raises(RuntimeError):
+        news_filter.verdicts([article('大きな 事故')])
+    with pytest.raises(RuntimeError):
+        news_filter.verdicts([article('大きな 事故')])
+    assert len(tokenizer.batches) == 2
@@ -0,0 +1,109 @@
+from concurrent.futures import Future
+
+import pytest
+
+from app.news_filter import NewsFilter
+from app.news_pipeline import NewsPipeline
+
+
+class FakeTokenizer:
+    """空白で区切った語を解析結果として返す。complete=False なら Future を完了させずに残す"""
+
+    def __init__(self, complete=True):
+        self.complete = complete
+        self.batches = []
+        self.futures = []
+
+    def submit(self, texts):
+        self.batches.append(list(texts))
+        future = Future()
+        if self.complete:
+            future.set_result([text.split() for text in texts])
+        self.futures.append(future)
+        return future
+
+
+class FakeNewsAudio:
+    def __init__(self):
+        self.segments = []
+
+    def synthesize_async(self, segments):
+        self.segments.extend(segments)
+
+
+def article(title):
+    return {'url': f'https://example.com/{title}', 'title': title, 'description': ''}
+
+
+@pytest.fixture
+def tokenizer():
+    return FakeTokenizer()
+
+
+@pytest.fixture
+def news_filter(tokenizer):
+    return NewsFilter(['事故'], tokenizer=tokenizer)
+
+
+def test_submit_each_tags_matching_articles_in_one_batch(news_filter, tokenizer):
+    articles = [article('桜 が 満開'), article('大きな 事故'), article('新しい 図書館'), article('無事故 を 達成')]
+
+    futures = news_filter.submit_each(articles)
+    assert [future.result() for future in futures] == [True, False, True, True]
+    # ネガティブワードを部分文字列として含む記事だけを、1回でまとめて解析に回す
+    assert tokenizer.batches == [['大きな 事故 ', '無事故 を 達成 ']]
+
+    # 判定結果はキャッシュされ、次の要求では解析しない
+    assert [future.result() for future in news_filter.submit_each(articles)] == [True, False, True, True]
+    assert len(tokenizer.batches) == 1
+
+
+def test_pipeline_accepts_in_order(news_filter, tokenizer):
+    articles = [article('大きな 事故'), article('桜 が 満開'), article('無事故 の 記録'), article('道路 で 事故'),
+                article('新しい 図書館')]
+    audio = FakeNewsAudio()
+    accepted_events = []
+
+    accepted, report = NewsPipeline(news_filter, audio, filter_workers=2, limit=2).run(
+        lambda: {'articles': articles}, lambda items: items, lambda title: f'{title}。',
+        on_accept=lambda index, item: accepted_events.append((index, item['title'])))
+
+    assert [item['title'] for item in accepted] == ['桜 が 満開', '無事故 の 記録']
+    assert accepted_events == [(0, '桜 が 満開'), (1, '無事故 の 記録')]
+    assert audio.segments == ['桜 が 満開。', '無事故 の 記録。']
+    assert report['examined'] == 3
+
+
+def test_pipeline_submits_chunks_within_the_read_ahead_window(news_filter, tokenizer):
+    # 解析の要る記事ばかり40件。先頭の記事で採用がそろえば、先読みした分より後は解析に回さない
+    articles = [article(f'無事故 {i}') for i in range(40)]
+
+    accepted, _ = NewsPipeline(news_filter, FakeNewsAudio(), filter_workers=2, limit=1).run(
+        lambda: {'articles': articles}, lambda items: items, lambda title: title)
+
+    assert len(accepted) == 1
+    assert [len(batch) for batch in tokenizer.batches] == [2, 2]
+
+
+def test_pipeline_uses_several_batches_for_one_request(news_filter, tokenizer):
+    articles = [article(f'道路 で 事故 {i}') for i in range(6)]
+
+    accepted, report = NewsPipeline(news_filter, FakeNewsAudio(), filter_workers=2, limit=3).run(
+        lambda: {'articles': articles}, lambda items: items, lambda title: title)
+
+    assert accepted == []
+    assert report['examined'] == 6
+    assert [len(batch) for batch in tokenizer.batches] == [2, 2, 2]
+
+
+def test_pipeline_cancels_batches_that_have_not_started():
+    tokenizer = FakeTokenizer(complete=False)
+    news_filter = NewsFilter(['事故'], tokenizer=tokenizer)
+    articles = [article('桜 が 満開'), article('新しい 図書館'), article('大きな 事故'), article('小さな 事故')]
+
+    accepted, _ = NewsPipeline(news_filter, FakeNewsAudio(), filter_workers=2, limit=2).run(
+        lambda: {'articles': articles}, lambda items: items, lambda title: title)
+
+    assert len(accepted) == 2
+    assert len(tokenizer.futures) == 1
+    assert tokenizer.futures[0].cancelled()
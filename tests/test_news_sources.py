@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.news_sources import MinHashDeduper, merge_top_k, published_timestamp, shingles
+
+
+def article(url, title, published_at='2024-05-01T00:00:00Z'):
+    return {'url': url, 'title': title, 'publishedAt': published_at}
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    # サーバーのタイムゾーンがUTCでない場合
+    def use(name):
+        monkeypatch.setenv('TZ', name)
+        time.tzset()
+    yield use
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_published_at_is_parsed_as_utc(local_timezone):
+    local_timezone('Asia/Tokyo')
+    assert published_timestamp({'publishedAt': '2024-05-01T00:00:00Z'}) == 1714521600.0
+    assert published_timestamp({'publishedAt': '2024-05-01T00:00:00.250Z'}) == 1714521600.25
+    assert published_timestamp({'publishedAt': '2024-05-01T09:00:00+09:00'}) == 1714521600.0
+    assert published_timestamp({'publishedAt': '2024-05-01T00:00:00'}) == 1714521600.0
+
+
+@pytest.mark.parametrize('value', [None, '', '昨日'])
+def test_missing_or_malformed_published_at_sorts_last(value):
+    assert published_timestamp({'publishedAt': value}) == 0.0
+
+
+def test_shingles_ignore_source_suffix_and_symbols():
+    assert shingles('桜が満開 - 朝日新聞') == shingles('「桜が満開」 | 毎日新聞')
+    assert shingles('ＡＢ') == {'ab'}
+    assert shingles('') == set()
+
+
+def test_near_duplicate_titles_are_merged():
+    deduper = MinHashDeduper(threshold=0.5)
+    buckets = {}
+
+    assert deduper.add_if_unique('東京で桜が満開に 平年より5日早く - 朝日新聞', buckets)
+    assert not deduper.add_if_unique('東京で桜が満開に、平年より5日早く | 毎日新聞', buckets)
+    assert deduper.add_if_unique('新しい図書館が駅前に開館 蔵書は10万冊', buckets)
+
+
+def test_minhash_rejects_bands_that_do_not_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashDeduper(num_perm=64, bands=10)
+
+
+def test_merge_top_k_orders_by_score_and_drops_duplicate_urls():
+    first = [article('https://a/1', '一', '2024-05-01T00:00:00Z'), article('https://a/2', '二', '2024-05-03T00:00:00Z')]
+    second = [article('https://a/2', '二（重複）', '2024-05-09T00:00:00Z'), article('https://b/3', '三', '2024-05-02T00:00:00Z'),
+              article(None, 'URLなし', '2024-05-10T00:00:00Z')]
+
+    selected, collapsed = merge_top_k([first, second], 2, published_timestamp)
+    assert [item['title'] for item in selected] == ['二', '三']
+    assert collapsed == 0
+
+
+def test_merge_top_k_skips_near_duplicates_and_fills_up_to_k():
+    articles = [
+        article('https://a/1', '東京で桜が満開に 平年より5日早く - 朝日新聞', '2024-05-03T00:00:00Z'),
+        article('https://b/1', '東京で桜が満開に、平年より5日早く | 毎日新聞', '2024-05-02T00:00:00Z'),
+        article('https://c/1', '新しい図書館が駅前に開館 蔵書は10万冊', '2024-05-01T00:00:00Z'),
+    ]
+
+    selected, collapsed = merge_top_k([articles], 2, published_timestamp, MinHashDeduper(threshold=0.5))
+    assert [item['url'] for item in selected] == ['https://a/1', 'https://c/1']
+    assert collapsed == 1
@@ -0,0 +1,87 @@
+import math
+import struct
+
+import pytest
+
+from app import routes
+from config import Config
+from conftest import wait_until
+
+RATE = 8000
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    # 偽arecordが出力する音声（出し終えたら tail 秒の無音を出して終了する。None なら停止まで無音を出し続ける）
+    def setup(pcm, tail=None, max_seconds=30):
+        path = tmp_path / 'input.raw'
+        path.write_bytes(pcm)
+        monkeypatch.setenv('FAKE_ARECORD_INPUT', str(path))
+        monkeypatch.setenv('FAKE_ARECORD_SPEED', '0' if tail is not None else '1')
+        if tail is not None:
+            monkeypatch.setenv('FAKE_ARECORD_TAIL', str(tail))
+        monkeypatch.setattr(Config, 'CAPTURE_MODE', 'stream')
+        monkeypatch.setattr(Config, 'RECORD_SAMPLE_RATE', RATE)
+        monkeypatch.setattr(Config, 'RECORD_MAX_SECONDS', max_seconds)
+        monkeypatch.setattr(Config, 'VAD_ENABLED', False)
+    yield setup
+    for recorder in list(routes.local_recorders.values()):
+        recorder.stop()
+    routes.local_recorders.clear()
+
+
+def headers(device_id):
+    return {'X-Device-Id': device_id}
+
+
+def tone(seconds):
+    return struct.pack(f'<{int(RATE * seconds)}h',
+                       *(int(8000 * math.sin(2 * math.pi * 440 * i / RATE)) for i in range(int(RATE * seconds))))
+
+
+def test_second_start_is_rejected_while_recording(client, recording):
+    recording(b'')
+
+    assert client.post('/api/start-voice-input', headers=headers('busy')).status_code == 200
+    response = client.post('/api/start-voice-input', headers=headers('busy'))
+    assert response.status_code == 409
+
+
+def test_start_recovers_after_a_recording_that_was_never_stopped(client, recording):
+    # 画面の再読み込みなどで停止要求が届かなかった録音は、最大録音時間で止まった後に引き継げる
+    recording(b'', max_seconds=1)
+
+    assert client.post('/api/start-voice-input', headers=headers('reload')).status_code == 200
+    assert client.post('/api/start-voice-input', headers=headers('reload')).status_code == 409
+    recorder = routes.local_recorders['reload']
+    assert recorder.endpointed.wait(5)
+    wait_until(lambda: recorder.process.poll() is not None)
+
+    assert client.post('/api/start-voice-input', headers=headers('reload')).status_code == 200
+    assert routes.state_store.get('reload')['recording_id'] == 2
+
+
+def test_arecord_exiting_without_endpoint_releases_the_device(client, recording):
+    recording(tone(0.2), tail=0)
+
+    assert client.post('/api/start-voice-input', headers=headers('unplugged')).status_code == 200
+    wait_until(lambda: routes.state_store.get('unplugged')['pipeline_status'] == 'failed')
+    assert 'unplugged' not in routes.local_recorders
+    assert routes.state_store.get('unplugged')['is_recording'] == 0
+
+    assert client.post('/api/start-voice-input', headers=headers('unplugged')).status_code == 200
+
+
+def test_start_then_stop_recognizes_the_recording(client, recording):
+    # 認識は固定の文字列を返す stub バックエンドで行う
+    text = Config.STUB_RECOGNIZER_TEXT
+    recording(tone(0.5))
+
+    assert client.post('/api/start-voice-input', headers=headers('kiosk')).status_code == 200
+    wait_until(lambda: routes.local_recorders['kiosk'].duration() >= 0.3)
+    response = client.post('/api/stop-voice-input', headers=headers('kiosk'))
+
+    assert response.status_code == 200
+    assert response.get_json()['text'] == text
+    assert client.get('/api/get-text', headers=headers('kiosk')).get_json() == {'text': text}
+    assert client.post('/api/stop-voice-input', headers=headers('kiosk')).status_code == 400
@@ -0,0 +1,166 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.state_store import DeviceStateStore, process_running
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return DeviceStateStore(str(tmp_path / 'state.sqlite3'), clock=clock)
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_unknown_device_is_idle(store):
+    state = store.get('kitchen')
+
+    assert state['is_recording'] == 0
+    assert state['pipeline_status'] == 'idle'
+    assert state['last_text'] == ''
+
+
+def test_recording_lifecycle(store):
+    recording_id = store.begin_recording('kitchen', 'stream', os.getpid())
+    assert recording_id == 1
+    assert store.get('kitchen')['pipeline_status'] == 'recording'
+    assert not store.stop_requested('kitchen', recording_id)
+
+    recording = store.end_recording('kitchen')
+    assert recording['recording_id'] == recording_id
+    assert store.get('kitchen')['pipeline_status'] == 'recognizing'
+    assert store.stop_requested('kitchen', recording_id)
+
+    store.set_result('kitchen', recording_id, text='桜')
+    state = store.wait_for_result('kitchen', recording_id, timeout=1)
+    assert state['pipeline_status'] == 'recognized'
+    assert state['last_text'] == '桜'
+
+
+def test_only_one_start_and_one_stop_win(store):
+    assert store.begin_recording('kitchen', 'stream', os.getpid()) == 1
+    assert store.begin_recording('kitchen', 'stream', os.getpid()) is None
+
+    assert store.end_recording('kitchen') is not None
+    assert store.end_recording('kitchen') is None
+
+
+def test_devices_are_independent(store):
+    assert store.begin_recording('kitchen', 'stream', os.getpid()) == 1
+    assert store.begin_recording('hall', 'stream', os.getpid()) == 1
+    assert [row['device_id'] for row in store.list_devices()] == ['hall', 'kitchen']
+
+
+def test_failed_result_is_final(store):
+    recording_id = store.begin_recording('kitchen', 'stream', os.getpid())
+    store.end_recording('kitchen')
+    store.set_result('kitchen', recording_id, error='unknown_value')
+
+    state = store.wait_for_result('kitchen', recording_id, timeout=1)
+    assert state['pipeline_status'] == 'failed'
+    assert state['result_error'] == 'unknown_value'
+
+
+def test_result_of_an_older_recording_is_ignored(store):
+    first = store.begin_recording('kitchen', 'stream', os.getpid())
+    store.end_recording('kitchen')
+    second = store.begin_recording('kitchen', 'stream', os.getpid())
+
+    store.set_result('kitchen', first, text='古い結果')
+    assert store.get('kitchen')['pipeline_status'] == 'recording'
+    assert store.stop_requested('kitchen', first)
+    assert not store.stop_requested('kitchen', second)
+
+
+def test_recording_of_a_dead_worker_is_taken_over(store, dead_pid):
+    assert store.begin_recording('kitchen', 'stream', dead_pid) == 1
+    assert store.begin_recording('kitchen', 'stream', os.getpid()) == 2
+
+
+def test_recording_whose_arecord_exited_is_taken_over(store, dead_pid):
+    recording_id = store.begin_recording('kitchen', 'stream', os.getpid())
+    store.update_recording('kitchen', recording_id, arecord_pid=dead_pid)
+
+    assert store.begin_recording('kitchen', 'stream', os.getpid()) == 2
+
+
+def test_recording_older_than_max_age_is_taken_over(store, clock):
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        recording_id = store.begin_recording('kitchen', 'file', os.getpid(), max_age=60)
+        store.update_recording('kitchen', recording_id, arecord_pid=process.pid, audio_file='/tmp/a.wav')
+
+        clock.advance(59)
+        assert store.begin_recording('kitchen', 'file', os.getpid(), max_age=60) is None
+        clock.advance(2)
+        assert store.begin_recording('kitchen', 'file', os.getpid(), max_age=60) == 2
+        # 動き続けていた古い録音のarecordは止める
+        assert process.wait(5) is not None
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+def test_own_recording_without_a_live_recorder_is_taken_over(store):
+    assert store.begin_recording('kitchen', 'stream', os.getpid(), local_active=lambda row: True) == 1
+    assert store.begin_recording('kitchen', 'stream', os.getpid(), local_active=lambda row: True) is None
+    assert store.begin_recording('kitchen', 'stream', os.getpid(), local_active=lambda row: False) == 2
+
+
+def test_other_workers_recording_is_not_checked_locally(store):
+    parent = os.getppid()
+    assert store.begin_recording('kitchen', 'stream', parent) == 1
+    assert store.begin_recording('kitchen', 'stream', os.getpid(), local_active=lambda row: False) is None
+
+
+def test_abort_recording_releases_the_device(store):
+    recording_id = store.begin_recording('kitchen', 'stream', os.getpid())
+    store.abort_recording('kitchen', recording_id, 'arecordが終了しました')
+
+    state = store.get('kitchen')
+    assert state['is_recording'] == 0
+    assert state['pipeline_status'] == 'failed'
+    assert store.end_recording('kitchen') is None
+    assert store.begin_recording('kitchen', 'stream', os.getpid()) == recording_id + 1
+
+
+def test_process_running(dead_pid):
+    assert process_running(os.getpid())
+    assert not process_running(dead_pid)
+    assert not process_running(None)
+
+
+def test_audio_segments_are_shared_and_pruned(store, clock, tmp_path):
+    other_worker = DeviceStateStore(str(tmp_path / 'state.sqlite3'), clock=clock)
+    for i in range(3):
+        store.save_audio_segments(f'audio{i}', [f'導入{i}', 'タイトル。'], keep=2)
+        clock.advance(1)
+
+    assert other_worker.load_audio_segments('audio2') == ['導入2', 'タイトル。']
+    assert other_worker.load_audio_segments('audio1') == ['導入1', 'タイトル。']
+    assert other_worker.load_audio_segments('audio0') is None
+
+
+def test_events_are_numbered_across_workers_and_deduplicated(store, tmp_path):
+    other_worker = DeviceStateStore(str(tmp_path / 'state.sqlite3'))
+    first, _ = store.append_event('touch_detected', {'seq': 1}, keep=10, dedupe_key='touch:1')
+    assert other_worker.append_event('touch_detected', {'seq': 1}, keep=10, dedupe_key='touch:1') is None
+    second, _ = other_worker.append_event('recognition_result', {'text': '桜'}, keep=10)
+
+    assert second > first
+    assert [(event_id, event_type, data) for event_id, event_type, data, _ in store.events_after(0)] == [
+        (first, 'touch_detected', {'seq': 1}), (second, 'recognition_result', {'text': '桜'})]
+    assert store.last_event_id() == second
+
+
+def test_old_events_are_pruned(store):
+    for i in range(5):
+        store.append_event('tick', {'i': i}, keep=2)
+    assert [data['i'] for _, _, data, _ in store.events_after(0)] == [3, 4]
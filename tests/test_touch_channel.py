@@ -0,0 +1,149 @@
+import socket
+
+import pytest
+
+from app.touch_channel import Debouncer, TouchBroadcaster, TouchListener
+from conftest import wait_until
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'touch.sock')
+
+
+@pytest.fixture
+def listen(socket_path):
+    listeners = []
+
+    def start(**kwargs):
+        events = []
+        listener = TouchListener(socket_path, events.append, **kwargs)
+        listener.start()
+        listeners.append(listener)
+        return listener, events
+    yield start
+    for listener in listeners:
+        listener.stop()
+
+
+@pytest.fixture
+def broadcasters():
+    started = []
+
+    def start(socket_path):
+        broadcaster = TouchBroadcaster(socket_path, debounce_ms=0).start()
+        started.append(broadcaster)
+        return broadcaster
+    yield start
+    for broadcaster in started:
+        broadcaster.close()
+
+
+def wait_for_clients(broadcaster, count=1):
+    wait_until(lambda: len(broadcaster._clients) == count)
+
+
+def test_debouncer_ignores_input_within_interval():
+    debouncer = Debouncer(0.2)
+    assert debouncer.accept(10.0)
+    assert not debouncer.accept(10.1)
+    assert debouncer.accept(10.3)
+
+
+def test_listener_connects_once_the_service_starts(socket_path, listen, broadcasters):
+    # タッチサービスより先にWebアプリが起動した場合
+    listener, events = listen(initial_backoff=0.01, max_backoff=0.05)
+    assert not listener.connected
+
+    broadcaster = broadcasters(socket_path)
+    wait_for_clients(broadcaster)
+    event = broadcaster.touch()
+
+    wait_until(lambda: events)
+    assert events[0]['seq'] == event['seq']
+    assert listener.get(event['seq'])['source'] == 'gpio'
+
+
+def test_listener_reconnects_after_the_service_restarts(socket_path, listen, broadcasters):
+    broadcaster = broadcasters(socket_path)
+    listener, events = listen(initial_backoff=0.01, max_backoff=0.05)
+    wait_for_clients(broadcaster)
+    broadcaster.touch()
+    wait_until(lambda: len(events) == 1)
+
+    broadcaster.close()
+    wait_until(lambda: not listener.connected)
+
+    restarted = broadcasters(socket_path)
+    wait_for_clients(restarted)
+    restarted.touch()
+    wait_until(lambda: len(events) == 2)
+    assert listener.connected
+    assert listener.connections == 2
+
+
+def test_reconnect_backoff_grows_and_is_capped(socket_path):
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        if len(delays) == 6:
+            listener.stop()
+
+    listener = TouchListener(socket_path, lambda event: None, initial_backoff=0.1, max_backoff=1.0, sleep=sleep)
+    listener.start()
+    try:
+        wait_until(lambda: len(delays) == 6)
+    finally:
+        listener.stop()
+    assert delays == [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+
+
+def test_malformed_lines_and_handler_errors_keep_the_connection(socket_path, listen):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    try:
+        received = []
+
+        def on_event(event):
+            received.append(event)
+            if event['seq'] == 1:
+                raise RuntimeError('handler failed')
+
+        listener = TouchListener(socket_path, on_event, initial_backoff=0.01)
+        listener.start()
+        try:
+            conn, _ = server.accept()
+            conn.sendall(b'not json\n{"type": "touch", "seq": 1}\n{"type": "touch", "seq": 2}\n')
+            wait_until(lambda: len(received) == 2)
+            assert [event['seq'] for event in received] == [1, 2]
+            assert listener.connections == 1
+            conn.close()
+        finally:
+            listener.stop()
+    finally:
+        server.close()
+
+
+def test_stalled_client_is_dropped_without_blocking_touch(socket_path, listen, broadcasters):
+    broadcaster = broadcasters(socket_path)
+    # 接続したまま一切読まないクライアント
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(socket_path)
+    try:
+        wait_for_clients(broadcaster)
+        for _ in range(100000):
+            broadcaster.touch()
+            if not broadcaster._clients:
+                break
+        assert not broadcaster._clients
+
+        # 切断した後も、新しく接続したクライアントには届く
+        listener, events = listen(initial_backoff=0.01, max_backoff=0.05)
+        wait_for_clients(broadcaster)
+        event = broadcaster.touch()
+        wait_until(lambda: events)
+        assert events[0]['seq'] == event['seq']
+    finally:
+        stalled.close()
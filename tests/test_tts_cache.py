@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from app.tts_cache import TTSSegmentCache, concat_mp3, strip_id3
+
+FRAMES = b'\xff\xfb\x90\x00' + bytes(60)
+
+
+def id3v2(body, flags=0):
+    # サイズは7bitずつの syncsafe 整数で書く
+    size = len(body)
+    header = b'ID3\x04\x00' + bytes([flags, (size >> 21) & 0x7f, (size >> 14) & 0x7f, (size >> 7) & 0x7f, size & 0x7f])
+    footer = b'3DI' + header[3:] if flags & 0x10 else b''
+    return header + body + footer
+
+
+def id3v1():
+    return b'TAG' + bytes(125)
+
+
+class Synthesizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, lang):
+        self.calls.append(text)
+        return text.encode('utf-8') * 10
+
+
+@pytest.fixture
+def synthesize():
+    return Synthesizer()
+
+
+def test_strip_id3_removes_both_tags():
+    assert strip_id3(id3v2(bytes(300)) + FRAMES + id3v1()) == FRAMES
+    assert strip_id3(id3v2(bytes(20), flags=0x10) + FRAMES) == FRAMES
+    assert strip_id3(FRAMES) == FRAMES
+
+
+def test_strip_id3_reads_syncsafe_sizes():
+    # 128バイト以上のタグは、サイズの各バイトが7bitずつに分かれる
+    assert strip_id3(id3v2(bytes(1000)) + FRAMES) == FRAMES
+
+
+def test_concat_mp3_joins_frames_without_tags():
+    first = id3v2(b'TIT2 first') + FRAMES + id3v1()
+    second = id3v2(b'TIT2 second') + FRAMES[::-1]
+    assert concat_mp3([first, second]) == FRAMES + FRAMES[::-1]
+    assert concat_mp3([]) == b''
+
+
+def test_cache_hits_do_not_synthesize(tmp_path, synthesize):
+    cache = TTSSegmentCache(str(tmp_path), max_disk_bytes=10_000, max_memory_bytes=10_000, synthesize=synthesize)
+    assert not cache.contains('こんにちは')
+
+    data = cache.get('こんにちは')
+    assert cache.get('こんにちは') == data
+    assert cache.contains('こんにちは')
+    assert not cache.contains('こんにちは', lang='en')
+    assert synthesize.calls == ['こんにちは']
+
+    # 別のプロセスで作り直しても、ディスク上のセグメントを使う
+    restarted = TTSSegmentCache(str(tmp_path), max_disk_bytes=10_000, max_memory_bytes=10_000, synthesize=synthesize)
+    assert restarted.get('こんにちは') == data
+    assert synthesize.calls == ['こんにちは']
+    assert restarted.stats()['disk_hits'] == 1
+    assert restarted.stats()['disk_bytes'] == len(data)
+
+
+def test_memory_is_evicted_by_byte_budget(tmp_path, synthesize):
+    # 1セグメント30バイト（3バイトの文字 × 10）。メモリには2つまで
+    cache = TTSSegmentCache(str(tmp_path), max_disk_bytes=10_000, max_memory_bytes=60, synthesize=synthesize)
+    for text in ['一', '二', '三']:
+        cache.get(text)
+
+    stats = cache.stats()
+    assert stats['memory_bytes'] == 60
+    cache.get('一')
+    assert cache.stats()['disk_hits'] == 1
+    assert synthesize.calls == ['一', '二', '三']
+
+
+def test_disk_evicts_least_recently_used_files(tmp_path, synthesize):
+    cache = TTSSegmentCache(str(tmp_path), max_disk_bytes=70, max_memory_bytes=10_000, synthesize=synthesize)
+    cache.get('一')
+    cache.get('二')
+    os.utime(cache._path(cache.key('一', 'ja')), (2000, 2000))
+    os.utime(cache._path(cache.key('二', 'ja')), (1000, 1000))
+
+    cache.get('三')
+
+    stats = cache.stats()
+    assert stats['disk_evictions'] == 1
+    assert stats['disk_bytes'] == 60
+    assert not os.path.exists(cache._path(cache.key('二', 'ja')))
+    assert os.path.exists(cache._path(cache.key('一', 'ja')))
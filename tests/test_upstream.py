@@ -0,0 +1,164 @@
+import threading
+
+import pytest
+import requests
+
+from app.upstream import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, UpstreamClient, UpstreamError
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=''):
+        self.status_code = status_code
+        self.body = body
+
+
+class FakeTransport:
+    """requests.Session の代わりの送信先。responses の要素（応答・例外・関数）を順に返す"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, timeout=None, **kwargs):
+        with self._lock:
+            self.calls.append((method, url, timeout))
+            response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if callable(response):
+            response = response(timeout)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def make_client(clock):
+    def make(*responses, **kwargs):
+        transport = FakeTransport(*responses)
+        options = dict(timeout=1.0, retries=2, backoff=0, failure_threshold=3, reset_timeout=30,
+                       pool_size=2, session=transport, clock=clock, sleep=clock.advance)
+        options.update(kwargs)
+        return UpstreamClient('test', **options), transport
+    return make
+
+
+def test_deadline_uses_the_injected_clock(clock):
+    deadline = Deadline(5, clock=clock)
+    clock.advance(2)
+    assert deadline.remaining() == 3
+
+
+def test_breaker_opens_and_lets_one_probe_through_after_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+    clock.advance(10)
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert breaker.rejected == 2
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.is_open
+    clock.advance(9)
+    assert not breaker.allow()
+
+
+def test_server_errors_are_retried(make_client):
+    client, transport = make_client(FakeResponse(503), requests.ConnectionError('reset'), FakeResponse(200, 'ok'))
+
+    assert client.get('https://example.com/').body == 'ok'
+    assert len(transport.calls) == 3
+    assert client.stats()['retries'] == 2
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_are_returned_without_retrying(make_client):
+    client, transport = make_client(FakeResponse(404))
+
+    assert client.get('https://example.com/').status_code == 404
+    assert len(transport.calls) == 1
+    assert client.breaker.failures == 0
+
+
+def test_breaker_rejects_calls_until_reset_timeout(make_client, clock):
+    client, transport = make_client(FakeResponse(500), retries=0)
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.get('https://example.com/')
+
+    with pytest.raises(CircuitOpenError):
+        client.get('https://example.com/')
+    assert len(transport.calls) == 3
+
+    transport.responses = [FakeResponse(200)]
+    clock.advance(30)
+    assert client.get('https://example.com/').status_code == 200
+    assert client.stats()['circuit_state'] == 0
+
+
+def test_attempt_timeouts_are_capped_by_the_deadline(make_client, clock):
+    def slow(timeout):
+        clock.advance(timeout)
+        return requests.Timeout('slow')
+
+    client, transport = make_client(slow, retries=5, failure_threshold=10)
+    with pytest.raises(UpstreamError):
+        client.get('https://example.com/', deadline=Deadline(2.5, clock=clock))
+
+    assert [timeout for _, _, timeout in transport.calls] == [1.0, 1.0, 0.5]
+    assert client.stats()['timeouts'] == 3
+
+
+def test_expired_deadline_fails_without_calling(make_client, clock):
+    client, transport = make_client(FakeResponse(200))
+    deadline = Deadline(1, clock=clock)
+    clock.advance(1)
+
+    with pytest.raises(DeadlineExceeded):
+        client.get('https://example.com/', deadline=deadline)
+    assert transport.calls == []
+
+
+def test_slow_get_is_hedged_and_the_faster_response_wins(make_client):
+    release = threading.Event()
+
+    def stalled(timeout):
+        release.wait(5)
+        return FakeResponse(200, 'first')
+
+    client, transport = make_client(stalled, FakeResponse(200, 'second'), timeout=5.0, hedge_after=0.05)
+    try:
+        assert client.get('https://example.com/').body == 'second'
+    finally:
+        release.set()
+
+    assert len(transport.calls) == 2
+    stats = client.stats()
+    assert (stats['hedged'], stats['hedge_wins']) == (1, 1)
+
+
+def test_post_is_not_hedged(make_client):
+    def slow(timeout):
+        threading.Event().wait(0.1)
+        return FakeResponse(200)
+
+    client, transport = make_client(slow, timeout=5.0, hedge_after=0.01)
+    assert client.post('https://example.com/').status_code == 200
+    assert len(transport.calls) == 1
+    assert client.stats()['hedged'] == 0
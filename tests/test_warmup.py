@@ -0,0 +1,56 @@
+from app.warmup import Warmup
+
+
+def test_steps_run_in_order_and_failures_are_reported():
+    calls = []
+    warmup = Warmup()
+    warmup.add_step('first', lambda: calls.append('first'))
+    warmup.add_step('broken', lambda: 1 / 0)
+    warmup.add_step('last', lambda: calls.append('last'))
+    assert not warmup.report()['ready']
+
+    warmup.start()
+    warmup.wait(5)
+
+    report = warmup.report()
+    assert calls == ['first', 'last']
+    assert report['ready']
+    assert report['progress'] == 1.0
+    assert [step['status'] for step in report['steps']] == ['done', 'failed', 'done']
+
+
+def test_skipped_warmup_is_ready_and_never_runs():
+    calls = []
+    warmup = Warmup()
+    warmup.add_step('model', lambda: calls.append('model'))
+
+    warmup.skip()
+    warmup.start()
+    warmup.wait(1)
+
+    report = warmup.report()
+    assert calls == []
+    assert report['ready']
+    assert not report['started']
+    assert report['steps'][0]['status'] == 'skipped'
+
+
+def test_ready_endpoint_reports_ready_when_warmup_is_disabled(client):
+    response = client.get('/api/ready')
+
+    assert response.status_code == 200
+    assert {step['status'] for step in response.get_json()['steps']} == {'skipped'}
+
+
+def test_article_sync_starts_without_warmup(monkeypatch):
+    from app import create_app, routes
+    from config import Config
+
+    started = []
+    monkeypatch.setattr(Config, 'NEWS_API_KEY', 'test-key')
+    monkeypatch.setattr(routes, 'article_sync', type('FakeSync', (), {'start': lambda self: started.append(True)})())
+    assert not Config.WARMUP_ENABLED
+
+    create_app()
+    assert started == [True]
+    assert 'article_sync' not in [step['name'] for step in routes.warmup.report()['steps']]
@@ -0,0 +1,142 @@
+import struct
+import wave
+
+import pytest
+
+from app.wav_repair import WavRepairError, open_pcm, repair_wav
+
+RATE = 16000
+PCM = bytes(range(256)) * 40  # 10240バイト = 5120フレーム（16bitモノラル）
+
+
+def fmt_chunk(channels=1, rate=RATE, bits=16, format_tag=1):
+    block_align = channels * bits // 8
+    return b'fmt ' + struct.pack('<IHHIIHH', 16, format_tag, channels, rate, rate * block_align, block_align, bits)
+
+
+def make_wav(tmp_path, pcm=PCM, riff_size=None, data_size=None, extra_chunks=b'', fmt=None, name='test.wav'):
+    # ヘッダーのサイズ欄に任意の値を書き込んだWAVファイルを作る（None なら正しい値）
+    body = b'WAVE' + (fmt or fmt_chunk()) + extra_chunks + b'data' + struct.pack(
+        '<I', len(pcm) if data_size is None else data_size) + pcm
+    data = b'RIFF' + struct.pack('<I', len(body) if riff_size is None else riff_size) + body
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def header_sizes(path):
+    data = path.read_bytes()
+    data_offset = data.index(b'data') + 8
+    return struct.unpack_from('<I', data, 4)[0], struct.unpack_from('<I', data, data_offset - 4)[0]
+
+
+def test_valid_file_is_left_untouched(tmp_path):
+    path = make_wav(tmp_path)
+    before = path.read_bytes()
+
+    info = repair_wav(path)
+    assert not info.repaired
+    assert (info.channels, info.sample_rate, info.sample_width, info.data_size) == (1, RATE, 2, len(PCM))
+    assert path.read_bytes() == before
+
+
+@pytest.mark.parametrize('size', [0, 0xFFFFFFFF])
+def test_placeholder_sizes_are_rewritten(tmp_path, size):
+    # arecord をSIGTERMで止めたときに残るサイズ欄（0 または 0xFFFFFFFF）
+    path = make_wav(tmp_path, riff_size=size, data_size=size)
+    file_size = path.stat().st_size
+
+    info = repair_wav(path)
+    assert info.repaired
+    assert info.data_size == len(PCM)
+    assert header_sizes(path) == (file_size - 8, len(PCM))
+    with wave.open(str(path), 'rb') as wav_file:
+        assert wav_file.getnframes() == len(PCM) // 2
+        assert wav_file.readframes(wav_file.getnframes()) == PCM
+
+
+def test_truncated_data_chunk_uses_the_bytes_actually_present(tmp_path):
+    # ヘッダーは最後まで書かれたときのサイズのまま、PCMが途中で途切れている
+    path = make_wav(tmp_path, pcm=PCM[:4000], data_size=len(PCM), riff_size=len(PCM) + 36)
+
+    info = repair_wav(path)
+    assert info.repaired
+    assert info.data_size == 4000
+    with open_pcm(path) as (_, pcm):
+        assert bytes(pcm) == PCM[:4000]
+
+
+def test_odd_trailing_byte_is_dropped_from_the_data_size(tmp_path):
+    path = make_wav(tmp_path, pcm=PCM + b'\x7f', data_size=0xFFFFFFFF)
+
+    info = repair_wav(path)
+    assert info.data_size == len(PCM)
+    with open_pcm(path) as (opened, pcm):
+        assert opened.data_size == len(PCM)
+        assert bytes(pcm) == PCM
+
+
+def test_partial_stereo_frame_is_dropped(tmp_path):
+    path = make_wav(tmp_path, pcm=PCM + b'\x01\x02', data_size=0, fmt=fmt_chunk(channels=2))
+
+    info = repair_wav(path)
+    assert info.channels == 2
+    assert info.data_size == len(PCM)
+
+
+def test_extra_chunks_before_data_are_skipped(tmp_path):
+    # 奇数長のチャンクには1バイトのパディングが入る
+    odd = b'junk' + struct.pack('<I', 3) + b'abc' + b'\x00'
+    info_list = b'LIST' + struct.pack('<I', 12) + b'INFOISFT' + struct.pack('<I', 0)
+    path = make_wav(tmp_path, extra_chunks=odd + info_list, riff_size=0, data_size=0)
+
+    info = repair_wav(path)
+    assert info.repaired
+    assert info.data_size == len(PCM)
+    with open_pcm(path) as (_, pcm):
+        assert bytes(pcm) == PCM
+
+
+def test_open_pcm_reads_without_rewriting_the_header(tmp_path):
+    path = make_wav(tmp_path, data_size=0xFFFFFFFF)
+    before = path.read_bytes()
+
+    with open_pcm(path) as (info, pcm):
+        assert info.repaired
+        assert bytes(pcm[:4]) == PCM[:4]
+        assert len(pcm) == len(PCM)
+    assert path.read_bytes() == before
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'ID3\x03\x00\x00\x00\x00\x00\x00' + bytes(100),
+    b'RIFF\x00\x00\x00\x00AVI LIST',
+    b'RIF',
+])
+def test_non_riff_input_is_rejected(tmp_path, data):
+    path = tmp_path / 'bad.wav'
+    path.write_bytes(data)
+    before = path.read_bytes()
+
+    with pytest.raises(WavRepairError):
+        repair_wav(path)
+    with pytest.raises(WavRepairError):
+        with open_pcm(path):
+            pass
+    assert path.read_bytes() == before
+
+
+def test_missing_data_chunk_is_rejected(tmp_path):
+    path = tmp_path / 'nodata.wav'
+    path.write_bytes(b'RIFF' + struct.pack('<I', 28) + b'WAVE' + fmt_chunk())
+
+    with pytest.raises(WavRepairError, match='data'):
+        repair_wav(path)
+
+
+def test_compressed_format_is_rejected(tmp_path):
+    path = make_wav(tmp_path, fmt=fmt_chunk(format_tag=0x55))
+
+    with pytest.raises(WavRepairError, match='対応していない'):
+        repair_wav(path)
@@ -1,6 +1,17 @@
-import time
-import requests
+"""タッチ入力サービス
+
+GPIOのタッチセンサーを専有し、タッチをUnixドメインソケット経由でWebアプリへ送る。
+Raspberry Pi以外（またはRPi.GPIOが無い環境）では、Enterキーか一定間隔でタッチを模擬する。
+
+    python touch_sensor.py                      # GPIO（無ければEnterキーで模擬）
+    python touch_sensor.py --simulate-interval 2  # 2秒ごとに模擬タッチ
+"""
+import argparse
 import logging
+import time
+
+from config import Config
+from app.touch_channel import TouchBroadcaster
 
 # Raspberry Pi環境でのみRPi.GPIOをインポート
 try:
@@ -13,43 +24,59 @@ except ImportError:
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# タッチセンサーが接続されているGPIOピン
-TOUCH_PIN = 17
-
-# FlaskサーバーのURL
-SERVER_URL = "http://localhost:5000/api/touch-detected"
 
-if GPIO:
+def setup_gpio(broadcaster, pin):
     GPIO.setmode(GPIO.BCM)
-    GPIO.setup(TOUCH_PIN, GPIO.IN)
+    GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+    # チャタリングはソフトウェアで除去するため、ハードウェア側の bouncetime は指定しない
+    GPIO.add_event_detect(pin, GPIO.RISING, callback=lambda channel: on_touch(broadcaster, 'gpio'))
+    logger.info(f"GPIOの設定が正常に完了しました（PIN={pin}）")
 
-def touch_detected():
-    logger.info("タッチセンサーが触れられました。サーバーに通知します。")
+
+def on_touch(broadcaster, source):
+    event = broadcaster.touch(source)
+    if event is None:
+        logger.debug("チャタリングとして無視しました")
+    else:
+        logger.info(f"タッチを送信しました（seq={event['seq']}, source={source}）")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', default=Config.TOUCH_SOCKET_PATH)
+    parser.add_argument('--pin', type=int, default=Config.TOUCH_PIN)
+    parser.add_argument('--debounce-ms', type=int, default=Config.TOUCH_DEBOUNCE_MS)
+    parser.add_argument('--simulate', action='store_true', help='GPIOがあっても模擬入力を使う')
+    parser.add_argument('--simulate-interval', type=float, default=None, help='指定した秒数ごとに模擬タッチを送る')
+    args = parser.parse_args()
+
+    broadcaster = TouchBroadcaster(args.socket, debounce_ms=args.debounce_ms).start()
+    use_gpio = GPIO is not None and not args.simulate
     try:
-        response = requests.post(SERVER_URL)
-        if response.status_code == 200:
-            logger.info("サーバーに正常に通知しました。")
+        if use_gpio:
+            setup_gpio(broadcaster, args.pin)
+            logger.info("タッチセンサーの入力待機中...")
+            while True:
+                time.sleep(1)
+        elif args.simulate_interval:
+            logger.info(f"{args.simulate_interval}秒ごとに模擬タッチを送ります")
+            while True:
+                time.sleep(args.simulate_interval)
+                on_touch(broadcaster, 'simulated')
         else:
-            logger.error(f"サーバーへの通知に失敗しました。ステータスコード: {response.status_code}")
-    except Exception as e:
-        logger.error(f"サーバーへの通知中にエラーが発生しました: {str(e)}")
-
-if GPIO:
-    GPIO.add_event_detect(TOUCH_PIN, GPIO.RISING, callback=lambda x: touch_detected(), bouncetime=300)
+            while True:
+                # 開発環境でのテスト用
+                user_input = input("タッチセンサーをシミュレートするには Enter キーを押してください（終了するには 'q' を入力）: ")
+                if user_input.lower() == 'q':
+                    break
+                on_touch(broadcaster, 'simulated')
+    except KeyboardInterrupt:
+        logger.info("プログラムを終了します。")
+    finally:
+        broadcaster.close()
+        if use_gpio:
+            GPIO.cleanup()
 
-try:
-    logger.info("タッチセンサーの入力待機中...")
-    while True:
-        if not GPIO:
-            # 開発環境でのテスト用
-            user_input = input("タッチセンサーをシミュレートするには Enter キーを押してください（終了するには 'q' を入力）: ")
-            if user_input.lower() == 'q':
-                break
-            touch_detected()
-        time.sleep(0.1)
-except KeyboardInterrupt:
-    logger.info("プログラムを終了します。")
-finally:
-    if GPIO:
-        GPIO.cleanup()
 
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ import pyaudio
 import wave
 import requests
 import json
+import sys
 
 def record_audio(filename, duration=5, sample_rate=44100, chunk=1024):
     audio = pyaudio.PyAudio()
@@ -44,10 +45,44 @@ def send_audio_to_server(filename, url):
         print(f"Error: {response.status_code}")
         print(response.text)
 
+def stream_audio_to_server(url, duration=5, sample_rate=44100, chunk=1024):
+    # 録音しながら生PCMをチャンク転送で送信し、録音終了と同時にサーバー側の変換を終わらせる
+    audio = pyaudio.PyAudio()
+    stream = audio.open(format=pyaudio.paInt16,
+                        channels=1,
+                        rate=sample_rate,
+                        input=True,
+                        frames_per_buffer=chunk)
+
+    def generate():
+        print("Recording (streaming)...")
+        try:
+            for i in range(0, int(sample_rate / chunk * duration)):
+                yield stream.read(chunk)
+        finally:
+            print("Finished recording.")
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
+
+    # PyAudioのPCMはリトルエンディアンのため、audio/l16 の既定（ビッグエンディアン）ではないことを明示する
+    headers = {'Content-Type': f'audio/l16; rate={sample_rate}; channels=1; endian=little'}
+    response = requests.post(url, data=generate(), headers=headers)
+
+    if response.status_code == 200:
+        result = json.loads(response.text)
+        print(f"Recognized text: {result['text']}")
+    else:
+        print(f"Error: {response.status_code}")
+        print(response.text)
+
 if __name__ == "__main__":
     audio_file = "recorded_audio.wav"
     server_url = "http://localhost:5000/api/speech-to-text"
 
-    record_audio(audio_file)
-    send_audio_to_server(audio_file, server_url)
+    if '--stream' in sys.argv:
+        stream_audio_to_server(server_url)
+    else:
+        record_audio(audio_file)
+        send_audio_to_server(audio_file, server_url)
 